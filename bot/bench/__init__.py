@@ -0,0 +1 @@
+"""Нагрузочные тесты и бенчмарки (запускаются как python -m bot.bench.<модуль>)."""
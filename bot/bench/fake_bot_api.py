@@ -0,0 +1,361 @@
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Промежуточные статусы конвейера; всё остальное - итог обработки
+STATUS_PREFIXES = (
+    "⏳ Обрабатываю",
+    "⏳ Распознаю речь",
+    "⏳ Продолжаю обработку",
+    "⏳ Восстанавливаю",
+    "📝 Текст слишком длинный",
+)
+
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_REJECTED = "rejected"
+
+# Описание медиа в сообщении по типу обновления
+MEDIA_TYPES = {
+    "voice": ("voice", "audio/ogg"),
+    "audio": ("audio", "audio/mpeg"),
+    "video": ("video", "video/mp4"),
+    "video_note": ("video_note", None),
+    "document": ("document", None),
+}
+
+
+@dataclass
+class Exchange:
+    """Одно отправленное боту сообщение с медиа и реакция на него."""
+    chat_id: int
+    kind: str
+    duration: float
+    injected_at: float
+    first_reply_at: Optional[float] = None
+    done_at: Optional[float] = None
+    outcome: Optional[str] = None
+    replies: List[str] = field(default_factory=list)
+
+
+class FakeBotApi:
+    """
+    Локальная замена Telegram Bot API для нагрузочных тестов.
+
+    Отдаёт обновления через ``getUpdates``, файлы - через ``getFile`` и
+    ``/file/bot<token>/...`` (с поддержкой Range), принимает ``sendMessage``,
+    ``editMessageText`` и ``sendDocument`` и по ним определяет, когда и
+    с каким итогом обработано каждое сообщение. Остальные методы
+    отвечают успехом без действий.
+
+    Каждое сообщение приходит из отдельного чата, поэтому ответы
+    однозначно сопоставляются с отправленным медиа.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        flood_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            host: Адрес сервера
+            port: Порт (0 - любой свободный)
+            flood_rate: Доля ответов 429 на отправку сообщений
+            retry_after: Значение retry_after в ответах 429
+            seed: Зерно генератора случайных чисел
+        """
+        self.host = host
+        self.port = port
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+
+        self.exchanges: Dict[int, Exchange] = {}
+        self.calls: Counter = Counter()
+        self.flood_responses = 0
+
+        self._files: Dict[str, Path] = {}
+        self._file_paths: Dict[str, Path] = {}
+        self._updates: List[dict] = []
+        self._new_updates = asyncio.Event()
+        self._done = asyncio.Event()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._chat_ids = itertools.count(100001)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def api_url(self) -> str:
+        """Базовый адрес для TELEGRAM_API_BASE_URL."""
+        return f"http://{self.host}:{self.port}/bot"
+
+    @property
+    def file_url(self) -> str:
+        """Базовый адрес для TELEGRAM_FILE_BASE_URL."""
+        return f"http://{self.host}:{self.port}/file/bot"
+
+    async def start(self) -> None:
+        """Запуск сервера."""
+        app = web.Application(client_max_size=512 * 1024 * 1024)
+        app.router.add_get("/file/bot{token}/{path:.+}", self._download)
+        app.router.add_route("*", "/bot{token}/{method}", self._method)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Фактический порт, если был запрошен любой свободный
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"Тестовый Bot API запущен: {self.api_url}")
+
+    async def stop(self) -> None:
+        """Остановка сервера."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def inject(self, kind: str, path: Path, duration: float) -> Exchange:
+        """
+        Отправка боту сообщения с медиафайлом.
+
+        Args:
+            kind: Тип медиа (voice, audio, video, video_note, document)
+            path: Локальный файл, который будет отдан при скачивании
+            duration: Длительность записи в секундах
+
+        Returns:
+            Запись о сообщении
+        """
+        if kind not in MEDIA_TYPES:
+            raise ValueError(f"Неизвестный тип медиа: {kind}")
+
+        chat_id = next(self._chat_ids)
+        message_id = next(self._message_ids)
+        file_id = f"{kind}_{chat_id}_{path.name}"
+        self._files[file_id] = path
+
+        field_name, mime_type = MEDIA_TYPES[kind]
+        media = {
+            "file_id": file_id,
+            "file_unique_id": file_id,
+            "file_size": path.stat().st_size,
+        }
+        if kind in ("voice", "audio", "video", "video_note"):
+            media["duration"] = int(duration)
+        if kind == "video_note":
+            media["length"] = 240
+        if kind == "video":
+            media.update({"width": 320, "height": 240})
+        if kind in ("audio", "video", "document"):
+            media["file_name"] = path.name
+        if kind == "document":
+            mime_type = "video/mp4" if path.suffix == ".mp4" else None
+        if mime_type:
+            media["mime_type"] = mime_type
+
+        user = {"id": chat_id, "is_bot": False, "first_name": f"Load {chat_id}"}
+        self._updates.append({
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": user,
+                field_name: media,
+            },
+        })
+
+        exchange = Exchange(chat_id, kind, duration, time.perf_counter())
+        self.exchanges[chat_id] = exchange
+        self._done.clear()
+        self._new_updates.set()
+        return exchange
+
+    @property
+    def pending(self) -> int:
+        """Количество сообщений без итога."""
+        return sum(1 for exchange in self.exchanges.values() if exchange.outcome is None)
+
+    async def wait_done(self, timeout: float) -> bool:
+        """Ожидание итога по всем сообщениям; False при истечении таймаута."""
+        if not self.pending:
+            return True
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _method(self, request: web.Request) -> web.Response:
+        """Вызов метода Bot API."""
+        method = request.match_info["method"]
+        params = await self._params(request)
+        self.calls[method] += 1
+
+        if method in ("sendMessage", "editMessageText", "sendDocument") and self._flood():
+            self.flood_responses += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, status=429)
+
+        handler = getattr(self, f"_api_{method}", None)
+        result = await handler(params) if handler is not None else True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _params(self, request: web.Request) -> dict:
+        """Параметры вызова из JSON, формы или multipart."""
+        if request.content_type == "application/json":
+            return await request.json()
+
+        params = {}
+        if request.content_type == "multipart/form-data":
+            reader = await request.multipart()
+            async for part in reader:
+                if part.filename:
+                    params[part.name] = await part.read()
+                else:
+                    params[part.name] = await part.text()
+        elif request.can_read_body:
+            params = dict(await request.post())
+        else:
+            params = dict(request.query)
+
+        # PTB передаёт сложные значения в форме как JSON-строки
+        for key, value in params.items():
+            if isinstance(value, str):
+                try:
+                    params[key] = json.loads(value)
+                except ValueError:
+                    pass
+        return params
+
+    def _flood(self) -> bool:
+        return self.flood_rate > 0 and self._random.random() < self.flood_rate
+
+    def _message(self, chat_id: int, message_id: Optional[int] = None, text: Optional[str] = None) -> dict:
+        message = {
+            "message_id": message_id or next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+        }
+        if text is not None:
+            message["text"] = text
+        return message
+
+    def _record(self, chat_id: int, text: Optional[str], document: bool = False) -> None:
+        """Учёт ответа бота и определение итога обработки."""
+        exchange = self.exchanges.get(chat_id)
+        if exchange is None or exchange.outcome is not None:
+            return
+
+        now = time.perf_counter()
+        if exchange.first_reply_at is None:
+            exchange.first_reply_at = now
+        if text is not None:
+            exchange.replies.append(text)
+
+        if document:
+            outcome = OUTCOME_OK
+        elif text is None or text.startswith(STATUS_PREFIXES):
+            return
+        elif text.startswith("📝"):
+            outcome = OUTCOME_OK
+        elif text.startswith("⏳"):
+            outcome = OUTCOME_REJECTED
+        else:
+            outcome = OUTCOME_ERROR
+
+        exchange.outcome = outcome
+        exchange.done_at = now
+        if not self.pending:
+            self._done.set()
+
+    async def _api_getMe(self, params: dict) -> dict:
+        return {
+            "id": 1,
+            "is_bot": True,
+            "first_name": "Load Test",
+            "username": "load_test_bot",
+            "can_join_groups": False,
+            "can_read_all_group_messages": False,
+            "supports_inline_queries": False,
+        }
+
+    async def _api_getUpdates(self, params: dict) -> list:
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        limit = int(params.get("limit") or 100)
+
+        if offset:
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout > 0:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:limit]
+
+    async def _api_getFile(self, params: dict) -> dict:
+        file_id = params.get("file_id")
+        path = self._files.get(file_id)
+        if path is None:
+            raise web.HTTPBadRequest(
+                text=json.dumps({"ok": False, "error_code": 400, "description": "Bad Request: invalid file_id"}),
+                content_type="application/json"
+            )
+
+        file_path = f"media/{file_id}"
+        self._file_paths[file_path] = path
+        return {
+            "file_id": file_id,
+            "file_unique_id": file_id,
+            "file_size": path.stat().st_size,
+            "file_path": file_path,
+        }
+
+    async def _api_sendMessage(self, params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        text = str(params.get("text", ""))
+        self._record(chat_id, text)
+        return self._message(chat_id, text=text)
+
+    async def _api_editMessageText(self, params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        text = str(params.get("text", ""))
+        self._record(chat_id, text)
+        return self._message(chat_id, int(params.get("message_id") or 0), text)
+
+    async def _api_sendDocument(self, params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        self._record(chat_id, None, document=True)
+        message = self._message(chat_id)
+        message["document"] = {"file_id": f"result_{chat_id}", "file_unique_id": f"result_{chat_id}"}
+        return message
+
+    async def _download(self, request: web.Request) -> web.StreamResponse:
+        """Скачивание файла (поддерживает Range и HEAD)."""
+        path = self._file_paths.get(request.match_info["path"])
+        if path is None:
+            raise web.HTTPNotFound()
+        if request.method == "GET":
+            self.calls["download"] += 1
+        return web.FileResponse(path)
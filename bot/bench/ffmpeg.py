@@ -0,0 +1,362 @@
+import argparse
+import asyncio
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bot.config import Config
+from bot.utils import (
+    setup_logger,
+    ensure_ffmpeg,
+    convert_audio,
+    get_audio_duration,
+    extract_audio_from_video,
+    split_audio,
+)
+from .media import AUDIO_CODECS, VIDEO_CODECS, generate_media
+from .stats import compare_with_baseline, load_baseline, machine_info, percentiles
+
+
+logger = setup_logger(
+    name="bot",
+    log_dir=Config.LOG_DIR,
+    level=Config.LOG_LEVEL,
+    retention_days=Config.LOG_RETENTION_DAYS
+)
+
+DEFAULT_FORMATS = "ogg,mp3,m4a,wav,mp4,webm"
+
+BASELINE_METRICS = ("latency_sec.p50", "latency_sec.p95")
+
+# Операция над входным файлом и директорией для результатов
+Operation = Callable[[Path, Path], Awaitable[object]]
+
+
+async def _spawn(*cmd: str) -> None:
+    """Запуск процесса без полезной работы (для оценки накладных расходов)."""
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    await process.wait()
+
+
+def _wave_duration(path: Path) -> float:
+    """Длительность WAV через стандартную библиотеку."""
+    with wave.open(str(path), "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+
+def _optional_backends() -> Dict[str, Dict[str, Callable[[Path, Path], object]]]:
+    """
+    Альтернативные реализации, доступные в окружении.
+
+    Returns:
+        Словарь {утилита: {имя реализации: синхронная функция}}
+    """
+    backends: Dict[str, Dict[str, Callable[[Path, Path], object]]] = {
+        "get_audio_duration": {},
+        "convert_audio": {},
+    }
+
+    try:
+        import soundfile
+
+        backends["get_audio_duration"]["soundfile"] = lambda path, _: soundfile.info(str(path)).duration
+    except ImportError:
+        pass
+
+    try:
+        import mutagen
+
+        backends["get_audio_duration"]["mutagen"] = lambda path, _: mutagen.File(str(path)).info.length
+    except ImportError:
+        pass
+
+    try:
+        import torchaudio
+
+        def torchaudio_convert(path: Path, out_dir: Path) -> Path:
+            waveform, sample_rate = torchaudio.load(str(path))
+            waveform = waveform.mean(dim=0, keepdim=True)
+            if sample_rate != 16000:
+                waveform = torchaudio.functional.resample(waveform, sample_rate, 16000)
+            output = out_dir / f"{path.stem}_torchaudio.wav"
+            torchaudio.save(str(output), waveform, 16000)
+            return output
+
+        backends["convert_audio"]["torchaudio"] = torchaudio_convert
+    except ImportError:
+        pass
+
+    return backends
+
+
+def operations(fmt: str) -> Dict[Tuple[str, str], Operation]:
+    """
+    Операции, применимые к файлу заданного формата.
+
+    Args:
+        fmt: Расширение входного файла
+
+    Returns:
+        Словарь {(утилита, реализация): операция}
+    """
+    is_video = fmt in VIDEO_CODECS
+    ops: Dict[Tuple[str, str], Operation] = {
+        ("get_audio_duration", "ffprobe"): lambda path, _: get_audio_duration(path),
+    }
+
+    if is_video:
+        ops[("extract_audio_from_video", "ffmpeg")] = (
+            lambda path, out: extract_audio_from_video(path, out / "extracted.wav")
+        )
+    else:
+        ops[("convert_audio", "ffmpeg")] = lambda path, out: convert_audio(path, out / "converted.wav")
+
+    if fmt == "wav":
+        # Нарезка применяется к уже сконвертированному WAV
+        ops[("split_audio", "ffmpeg")] = lambda path, out: split_audio(path, out / "chunks")
+        ops[("get_audio_duration", "wave")] = lambda path, _: asyncio.to_thread(_wave_duration, path)
+
+    for utility, backends in _optional_backends().items():
+        if utility == "convert_audio" and is_video:
+            continue
+        for name, func in backends.items():
+            ops[(utility, name)] = lambda path, out, func=func: asyncio.to_thread(func, path, out)
+
+    return ops
+
+
+async def measure(operation: Operation, path: Path, work_dir: Path, repeat: int, warmup: int) -> List[float]:
+    """
+    Замер времени операции.
+
+    Args:
+        operation: Операция
+        path: Входной файл
+        work_dir: Директория для результатов (очищается после каждого вызова)
+        repeat: Замеров
+        warmup: Прогревочных вызовов (не учитываются)
+
+    Returns:
+        Время каждого замера в секундах
+    """
+    timings = []
+    for index in range(warmup + repeat):
+        out_dir = work_dir / f"run_{index}"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        await operation(path, out_dir)
+        elapsed = time.perf_counter() - started
+        shutil.rmtree(out_dir, ignore_errors=True)
+        if index >= warmup:
+            timings.append(elapsed)
+    return timings
+
+
+def fit_cost(points: List[Tuple[float, float]]) -> Optional[dict]:
+    """
+    Линейная модель времени от длительности входа: время = фикс. + наклон * длительность.
+
+    Args:
+        points: Пары (длительность входа, медианное время)
+
+    Returns:
+        Фиксированная часть, затраты на секунду медиа и доля фиксированной
+        части при самом коротком входе; None, если точек меньше двух
+    """
+    if len({duration for duration, _ in points}) < 2:
+        return None
+    slope, intercept = statistics.linear_regression(
+        [duration for duration, _ in points],
+        [elapsed for _, elapsed in points]
+    )
+    shortest = min(points)
+    return {
+        "fixed_sec": round(intercept, 6),
+        "per_media_sec": round(slope, 6),
+        "fixed_share_shortest": round(max(intercept, 0.0) / shortest[1], 4) if shortest[1] else None,
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    """Замер всех утилит на всех форматах и длительностях."""
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="bench_ffmpeg_") as tmp:
+        work_dir = Path(tmp)
+
+        # Стоимость запуска процесса без работы: нижняя граница любого вызова
+        overhead = {
+            "ffmpeg -version": percentiles(await measure(
+                lambda *_: _spawn("ffmpeg", "-version"), work_dir, work_dir, args.repeat, args.warmup
+            )),
+            "ffprobe -version": percentiles(await measure(
+                lambda *_: _spawn("ffprobe", "-version"), work_dir, work_dir, args.repeat, args.warmup
+            )),
+            "ffmpeg null decode": percentiles(await measure(
+                lambda *_: _spawn(
+                    "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "anullsrc", "-t", "0.01", "-f", "null", "-"
+                ),
+                work_dir, work_dir, args.repeat, args.warmup
+            )),
+        }
+
+        for fmt in args.formats:
+            for duration in args.durations:
+                source = await generate_media(args.media_dir, fmt, duration)
+                if fmt == "wav":
+                    # Вход для нарезки и WAV-реализаций - как после конвертации в конвейере
+                    prepared = work_dir / f"prepared_{duration:g}s.wav"
+                    await convert_audio(source, prepared)
+                    source = prepared
+
+                for (utility, backend), operation in operations(fmt).items():
+                    key = f"{utility}/{backend}/{fmt}/{duration:g}s"
+                    try:
+                        timings = await measure(operation, source, work_dir, args.repeat, args.warmup)
+                    except Exception as e:
+                        logger.warning(f"{key}: {e}")
+                        results.append({"key": key, "utility": utility, "backend": backend,
+                                        "format": fmt, "duration": duration, "error": str(e)})
+                        continue
+
+                    latency = percentiles(timings)
+                    results.append({
+                        "key": key,
+                        "utility": utility,
+                        "backend": backend,
+                        "format": fmt,
+                        "duration": duration,
+                        "input_bytes": source.stat().st_size,
+                        "latency_sec": latency,
+                        "speed": round(duration / latency["p50"], 1) if latency["p50"] else None,
+                    })
+                    logger.info(f"{key}: p50={latency['p50'] * 1000:.1f}мс")
+
+    scaling = {}
+    for item in results:
+        if "error" in item:
+            continue
+        group = f"{item['utility']}/{item['backend']}/{item['format']}"
+        scaling.setdefault(group, []).append((item["duration"], item["latency_sec"]["p50"]))
+
+    return {
+        "machine": {**machine_info(), "ffmpeg": await _ffmpeg_version()},
+        "repeat": args.repeat,
+        "spawn_overhead_sec": overhead,
+        "results": results,
+        "scaling": {group: fit_cost(points) for group, points in scaling.items()},
+    }
+
+
+async def _ffmpeg_version() -> str:
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-version",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    stdout, _ = await process.communicate()
+    return stdout.decode("utf-8", errors="ignore").splitlines()[0] if stdout else ""
+
+
+def format_report(report: dict) -> str:
+    """Краткая текстовая сводка отчёта."""
+    lines = ["Запуск процесса без работы:"]
+    for name, summary in report["spawn_overhead_sec"].items():
+        lines.append(f"  {name:<20} p50={summary['p50'] * 1000:.1f}мс")
+
+    lines.append(f"{'замер':<48} {'p50 мс':>9} {'p95 мс':>9} {'x реал.':>9}")
+    for item in report["results"]:
+        if "error" in item:
+            lines.append(f"{item['key']:<48} ошибка: {item['error'][:60]}")
+            continue
+        latency = item["latency_sec"]
+        lines.append(
+            f"{item['key']:<48} {latency['p50'] * 1000:>9.1f} {latency['p95'] * 1000:>9.1f} "
+            f"{item['speed'] or 0:>9.0f}"
+        )
+
+    lines.append("Фиксированная часть и затраты на секунду медиа:")
+    for group, fit in report["scaling"].items():
+        if fit is not None:
+            lines.append(
+                f"  {group:<40} {fit['fixed_sec'] * 1000:>8.1f}мс + {fit['per_media_sec'] * 1000:.2f}мс/с"
+            )
+
+    for comparison in report.get("baseline", []):
+        mark = "РЕГРЕССИЯ" if comparison["regression"] else ""
+        lines.append(
+            f"  {comparison['key']} {comparison['metric']}: {comparison['baseline']} → "
+            f"{comparison['current']} ({comparison['change_pct']:+.1f}%) {mark}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        prog="python -m bot.bench.ffmpeg",
+        description="Микробенчмарки утилит предобработки аудио (bot/utils/ffmpeg.py)"
+    )
+    parser.add_argument("--formats", default=DEFAULT_FORMATS, help="Форматы входа через запятую")
+    parser.add_argument("--durations", default="5,60,600",
+                        help="Длительности входа в секундах через запятую")
+    parser.add_argument("--media-dir", type=Path, default=Config.TEMP_DIR / "bench_media",
+                        help="Кэш синтетических файлов")
+    parser.add_argument("--repeat", type=int, default=5, help="Замеров каждой операции")
+    parser.add_argument("--warmup", type=int, default=1, help="Прогревочных вызовов")
+    parser.add_argument("-o", "--output", type=Path, help="Файл для отчёта в JSON")
+    parser.add_argument("--baseline", type=Path, help="Отчёт базового прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Допустимое ухудшение относительно базового прогона (доля)")
+
+    args = parser.parse_args(argv)
+    args.formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in args.formats if fmt not in AUDIO_CODECS and fmt not in VIDEO_CODECS]
+    if unknown:
+        parser.error(f"--formats: неподдерживаемые форматы: {', '.join(unknown)}")
+    try:
+        args.durations = sorted({float(value) for value in args.durations.split(",") if value.strip()})
+    except ValueError:
+        parser.error("--durations: ожидаются числа через запятую")
+    args.repeat = max(1, args.repeat)
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    """Точка входа."""
+    args = parse_args(argv)
+    Config.validate(require_token=False)
+    ensure_ffmpeg()
+
+    report = asyncio.run(run_benchmark(args))
+
+    regressions = []
+    if args.baseline is not None:
+        report["baseline"] = compare_with_baseline(
+            [item for item in report["results"] if "error" not in item],
+            load_baseline(args.baseline),
+            BASELINE_METRICS,
+            args.tolerance
+        )
+        regressions = [item for item in report["baseline"] if item["regression"]]
+
+    print(format_report(report))
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Отчёт: {args.output}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
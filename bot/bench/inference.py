@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from bot.config import Config
+from bot.services import TranscribeService
+from bot.utils import setup_logger, ensure_ffmpeg, convert_audio, get_audio_duration
+from bot.utils.validators import validate_audio_format, validate_video_format
+from .media import generate_media
+from .stats import PeakRssSampler, compare_with_baseline, load_baseline, machine_info, percentiles
+
+
+logger = setup_logger(
+    name="bot",
+    log_dir=Config.LOG_DIR,
+    level=Config.LOG_LEVEL,
+    retention_days=Config.LOG_RETENTION_DAYS
+)
+
+# Метрики для сравнения с базовым прогоном (меньше - лучше)
+BASELINE_METRICS = ("rtf.p50", "rtf.p95", "latency_sec.p95", "peak_rss_mb")
+
+Reference = Tuple[Path, float]
+
+
+async def prepare_corpus(args: argparse.Namespace, work_dir: Path) -> List[Reference]:
+    """
+    Эталонный набор записей в формате, который получает модель (WAV 16 кГц моно).
+
+    Args:
+        args: Аргументы командной строки
+        work_dir: Директория для сконвертированных файлов
+
+    Returns:
+        Список (путь, длительность), по возрастанию длительности
+    """
+    if args.corpus is not None:
+        sources = [
+            path for path in sorted(args.corpus.rglob("*"))
+            if path.is_file() and (validate_audio_format(path) or validate_video_format(path))
+        ]
+        if not sources:
+            raise SystemExit(f"В {args.corpus} нет аудио- или видеофайлов")
+    else:
+        sources = [await generate_media(args.media_dir, "wav", duration) for duration in args.durations]
+
+    corpus = []
+    for index, source in enumerate(sources):
+        wav_path = work_dir / f"ref_{index:03d}.wav"
+        await convert_audio(source, wav_path, sample_rate=16000, channels=1)
+        corpus.append((wav_path, await get_audio_duration(wav_path)))
+    return sorted(corpus, key=lambda item: item[1])
+
+
+async def bench_config(
+    service: TranscribeService,
+    corpus: List[Reference],
+    concurrency: int,
+    repeat: int
+) -> dict:
+    """
+    Прогон эталонного набора при заданной параллельности вызовов модели.
+
+    Args:
+        service: Сервис с загруженной моделью
+        corpus: Эталонный набор
+        concurrency: Одновременных вызовов модели (как PIPELINE_INFER_CONCURRENCY)
+        repeat: Повторов каждой записи
+
+    Returns:
+        Метрики прогона
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    calls = []
+
+    async def call(path: Path, duration: float) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            result = await service.transcribe(path, duration=duration)
+            calls.append((duration, time.perf_counter() - started, result.is_success))
+
+    with PeakRssSampler() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            call(path, duration)
+            for _ in range(repeat)
+            for path, duration in corpus
+        ))
+        wall_sec = time.perf_counter() - started
+
+    succeeded = [(duration, latency) for duration, latency, ok in calls if ok]
+    audio_sec = sum(duration for duration, _ in succeeded)
+
+    by_duration = {}
+    for duration in sorted({duration for duration, _ in succeeded}):
+        by_duration[f"{duration:.0f}s"] = percentiles(
+            latency for d, latency in succeeded if d == duration
+        )
+
+    return {
+        "calls": len(calls),
+        "errors": len(calls) - len(succeeded),
+        "audio_sec": round(audio_sec, 3),
+        "wall_sec": round(wall_sec, 3),
+        "throughput_audio_sec_per_sec": round(audio_sec / wall_sec, 3) if wall_sec else 0.0,
+        "files_per_min": round(len(succeeded) / wall_sec * 60, 3) if wall_sec else 0.0,
+        "rtf": percentiles(latency / duration for duration, latency in succeeded if duration),
+        "latency_sec": percentiles(latency for _, latency in succeeded),
+        "latency_by_duration": by_duration,
+        "peak_rss_mb": rss.peak_mb,
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    """Прогон всех сочетаний движка, модели, числа потоков и параллельности."""
+    import torch
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_inference_") as work_dir:
+        corpus = await prepare_corpus(args, Path(work_dir))
+        logger.info(
+            f"Эталонный набор: {len(corpus)} записей, "
+            f"{sum(duration for _, duration in corpus):.1f}с"
+        )
+
+        for backend, model_name in ((b, m) for b in args.backends for m in args.models):
+            with PeakRssSampler() as load_rss:
+                started = time.perf_counter()
+                service = TranscribeService(
+                    model_name=model_name,
+                    device=args.device,
+                    scratch_dir=Path(work_dir),
+                    backend=backend,
+                    onnx_dir=Config.ONNX_DIR,
+                    onnx_threads=Config.ONNX_THREADS
+                )
+                load_sec = time.perf_counter() - started
+
+            for threads in args.threads:
+                torch.set_num_threads(threads)
+                # Прогрев: первые вызовы включают ленивую инициализацию
+                for _ in range(args.warmup):
+                    await service.transcribe(corpus[0][0], duration=corpus[0][1])
+
+                for concurrency in args.concurrency:
+                    key = f"{backend}/{model_name}/{service.device}/threads={threads}/concurrency={concurrency}"
+                    logger.info(f"Бенчмарк: {key}")
+                    metrics = await bench_config(service, corpus, concurrency, args.repeat)
+                    results.append({
+                        "key": key,
+                        "backend": backend,
+                        "model": model_name,
+                        "device": service.device,
+                        "threads": threads,
+                        "concurrency": concurrency,
+                        "load_sec": round(load_sec, 3),
+                        "load_rss_mb": load_rss.peak_mb,
+                        **metrics,
+                    })
+
+            # Освобождаем память перед загрузкой следующей модели
+            del service
+            gc.collect()
+
+    return {
+        "machine": {**machine_info(), "torch": torch.__version__},
+        "corpus": [{"duration": round(duration, 3)} for _, duration in corpus],
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+
+def format_report(report: dict) -> str:
+    """Краткая текстовая сводка отчёта."""
+    lines = [f"{'конфигурация':<58} {'RTF p50':>8} {'RTF p95':>8} {'аудио/с':>8} {'RSS МБ':>8} {'ошибок':>6}"]
+    for item in report["results"]:
+        rtf = item["rtf"]
+        lines.append(
+            f"{item['key']:<58} {rtf.get('p50', 0):>8.3f} {rtf.get('p95', 0):>8.3f} "
+            f"{item['throughput_audio_sec_per_sec']:>8.2f} {item['peak_rss_mb'] or 0:>8.0f} {item['errors']:>6}"
+        )
+    for comparison in report.get("baseline", []):
+        mark = "РЕГРЕССИЯ" if comparison["regression"] else ""
+        lines.append(
+            f"  {comparison['key']} {comparison['metric']}: {comparison['baseline']} → "
+            f"{comparison['current']} ({comparison['change_pct']:+.1f}%) {mark}"
+        )
+    return "\n".join(lines)
+
+
+def _int_list(value: str) -> List[int]:
+    return sorted({int(item) for item in value.split(",") if item.strip()})
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки."""
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(
+        prog="python -m bot.bench.inference",
+        description="Бенчмарк распознавания: RTF, пропускная способность и память по конфигурациям"
+    )
+    parser.add_argument("--models", default=Config.GIGAAM_MODEL, help="Модели GigaAM через запятую")
+    parser.add_argument("--backends", default=Config.ASR_BACKEND,
+                        help="Движки распознавания через запятую (torch, onnx)")
+    parser.add_argument("--threads", type=_int_list, default=_int_list(f"1,{cpu_count}"),
+                        help="Значения torch.set_num_threads через запятую")
+    parser.add_argument("--concurrency", type=_int_list, default=[1],
+                        help="Одновременных вызовов модели через запятую")
+    parser.add_argument("--durations", default="5,15,60",
+                        help="Длительности синтетических записей в секундах через запятую")
+    parser.add_argument("--corpus", type=Path, help="Директория с эталонными записями вместо синтетических")
+    parser.add_argument("--media-dir", type=Path, default=Config.TEMP_DIR / "bench_media",
+                        help="Кэш синтетических файлов")
+    parser.add_argument("--device", default="cpu", help="Устройство модели (cpu, cuda, auto)")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов каждой записи")
+    parser.add_argument("--warmup", type=int, default=1, help="Прогревочных вызовов")
+    parser.add_argument("-o", "--output", type=Path, help="Файл для отчёта в JSON")
+    parser.add_argument("--baseline", type=Path, help="Отчёт базового прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Допустимое ухудшение метрик относительно базового прогона (доля)")
+
+    args = parser.parse_args(argv)
+    args.models = [model.strip() for model in args.models.split(",") if model.strip()]
+    args.backends = [backend.strip() for backend in args.backends.split(",") if backend.strip()]
+    try:
+        args.durations = [float(value) for value in args.durations.split(",") if value.strip()]
+    except ValueError:
+        parser.error("--durations: ожидаются числа через запятую")
+    if not args.models:
+        parser.error("--models: не указаны модели")
+    if not args.backends or set(args.backends) - {"torch", "onnx"}:
+        parser.error("--backends: ожидаются torch и/или onnx")
+    if min(args.threads + args.concurrency) < 1:
+        parser.error("--threads и --concurrency должны быть положительными")
+    args.repeat = max(1, args.repeat)
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    """Точка входа."""
+    args = parse_args(argv)
+    Config.validate(require_token=False)
+    ensure_ffmpeg()
+
+    report = asyncio.run(run_benchmark(args))
+
+    regressions = []
+    if args.baseline is not None:
+        report["baseline"] = compare_with_baseline(
+            report["results"], load_baseline(args.baseline), BASELINE_METRICS, args.tolerance
+        )
+        regressions = [item for item in report["baseline"] if item["regression"]]
+
+    print(format_report(report))
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Отчёт: {args.output}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from bot.config import Config
+from bot.utils import ensure_ffmpeg, get_audio_duration
+from bot.utils.validators import validate_audio_format, validate_video_format
+from .fake_bot_api import FakeBotApi, MEDIA_TYPES, OUTCOME_OK, OUTCOME_ERROR, OUTCOME_REJECTED
+from .media import generate_media
+from .stats import percentiles
+
+# Формат синтетического файла для каждого типа медиа
+KIND_EXTENSIONS = {
+    "voice": "ogg",
+    "audio": "mp3",
+    "video": "mp4",
+    "video_note": "mp4",
+    "document": "m4a",
+}
+
+DEFAULT_MIX = "voice=5,audio=2,video=1,video_note=1,document=1"
+
+Sample = Tuple[Path, float]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """Разбор смеси типов медиа вида ``voice=5,audio=2``."""
+    mix = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in MEDIA_TYPES:
+            raise argparse.ArgumentTypeError(f"неизвестный тип медиа: {kind}")
+        mix[kind] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("пустая смесь типов медиа")
+    return mix
+
+
+async def prepare_samples(args: argparse.Namespace) -> Dict[str, List[Sample]]:
+    """
+    Файлы для каждого типа медиа.
+
+    Если задан ``--samples``, берутся реальные записи из директории
+    (видео - для video/video_note, аудио - для остальных типов),
+    иначе генерируются синтетические файлы заданных длительностей.
+
+    Returns:
+        Словарь {тип медиа: [(путь, длительность), ...]}
+    """
+    samples: Dict[str, List[Sample]] = {}
+
+    if args.samples is not None:
+        audio, video = [], []
+        for path in sorted(args.samples.rglob("*")):
+            if not path.is_file():
+                continue
+            if validate_video_format(path):
+                video.append((path, await get_audio_duration(path)))
+            elif validate_audio_format(path):
+                audio.append((path, await get_audio_duration(path)))
+        for kind in args.mix:
+            pool = video if kind in ("video", "video_note") else audio
+            if not pool:
+                raise SystemExit(f"В {args.samples} нет файлов для типа {kind}")
+            samples[kind] = pool
+        return samples
+
+    for kind in args.mix:
+        samples[kind] = [
+            (await generate_media(args.media_dir, KIND_EXTENSIONS[kind], duration), duration)
+            for duration in args.durations
+        ]
+    return samples
+
+
+def configure(api: FakeBotApi) -> None:
+    """Настройка бота на работу с тестовым Bot API."""
+    Config.TELEGRAM_BOT_TOKEN = Config.TELEGRAM_BOT_TOKEN or "123456:LOADTEST"
+    Config.TELEGRAM_API_BASE_URL = api.api_url
+    Config.TELEGRAM_FILE_BASE_URL = api.file_url
+    Config.BOT_MODE = "polling"
+    Config.PROCESSING_MODE = "local"
+    Config.DROP_PENDING_UPDATES = False
+    Config.API_ENABLED = False
+    # Журнал задач от прошлых прогонов исказил бы результаты
+    Config.JOB_STORE_PATH = ""
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    """
+    Нагрузочный прогон: запуск бота против тестового Bot API,
+    отправка сообщений с заданной частотой и сбор статистики.
+
+    Returns:
+        Отчёт
+    """
+    samples = await prepare_samples(args)
+    rng = random.Random(args.seed)
+
+    api = FakeBotApi(flood_rate=args.flood_rate, seed=args.seed)
+    await api.start()
+    configure(api)
+
+    # Импорт здесь: модуль бота настраивает логирование при импорте
+    from bot.main import TelegramGigaAMBot
+
+    bot = TelegramGigaAMBot()
+    # Сообщения приходят от случайных пользователей
+    Config._allowed_users = []
+    bot_task = asyncio.create_task(bot._run())
+
+    try:
+        # Ожидание начала опроса обновлений
+        while not api.calls["getUpdates"]:
+            if bot_task.done():
+                bot_task.result()
+                raise RuntimeError("Бот остановился до начала опроса обновлений")
+            await asyncio.sleep(0.05)
+
+        kinds = list(args.mix)
+        weights = [args.mix[kind] for kind in kinds]
+        interval = 1.0 / args.rate if args.rate > 0 else 0.0
+
+        started_at = time.perf_counter()
+        for index in range(args.updates):
+            kind = rng.choices(kinds, weights)[0]
+            path, duration = rng.choice(samples[kind])
+            api.inject(kind, path, duration)
+            # Отправка по расписанию, а не с паузой после каждой отправки
+            delay = started_at + (index + 1) * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        injected_sec = time.perf_counter() - started_at
+
+        completed = await api.wait_done(args.timeout)
+        wall_sec = time.perf_counter() - started_at
+        stages = bot.pipeline.stages
+    finally:
+        bot.stop()
+        await asyncio.gather(bot_task, return_exceptions=True)
+        await api.stop()
+
+    return build_report(args, api, stages, injected_sec, wall_sec, completed)
+
+
+def build_report(args, api: FakeBotApi, stages, injected_sec: float, wall_sec: float, completed: bool) -> dict:
+    """Сводка по прогону."""
+    exchanges = list(api.exchanges.values())
+    outcomes = {
+        outcome: [e for e in exchanges if e.outcome == outcome]
+        for outcome in (OUTCOME_OK, OUTCOME_ERROR, OUTCOME_REJECTED)
+    }
+    ok = outcomes[OUTCOME_OK]
+    timeouts = [e for e in exchanges if e.outcome is None]
+    total = len(exchanges) or 1
+
+    by_kind = {}
+    for kind in sorted({e.kind for e in exchanges}):
+        done = [e for e in ok if e.kind == kind]
+        by_kind[kind] = {
+            "sent": sum(1 for e in exchanges if e.kind == kind),
+            "ok": len(done),
+            "latency_sec": percentiles(e.done_at - e.injected_at for e in done),
+        }
+
+    return {
+        "config": {
+            "updates": args.updates,
+            "rate": args.rate,
+            "mix": args.mix,
+            "durations": args.durations,
+            "samples": str(args.samples) if args.samples is not None else None,
+            "flood_rate": args.flood_rate,
+            "max_jobs": Config.MAX_CONCURRENT_TASKS,
+            "max_queue": Config.PIPELINE_MAX_QUEUE,
+            "device": Config.get_device(),
+        },
+        "completed": completed,
+        "injected_sec": round(injected_sec, 3),
+        "wall_sec": round(wall_sec, 3),
+        "ok": len(ok),
+        "errors": len(outcomes[OUTCOME_ERROR]),
+        "rejected": len(outcomes[OUTCOME_REJECTED]),
+        "timeouts": len(timeouts),
+        "error_rate": round(len(outcomes[OUTCOME_ERROR]) / total, 4),
+        "reject_rate": round(len(outcomes[OUTCOME_REJECTED]) / total, 4),
+        "throughput_per_min": round(len(ok) / wall_sec * 60, 3) if wall_sec else 0.0,
+        "audio_sec_per_sec": round(sum(e.duration for e in ok) / wall_sec, 3) if wall_sec else 0.0,
+        "latency_sec": percentiles(e.done_at - e.injected_at for e in ok),
+        "first_reply_sec": percentiles(
+            e.first_reply_at - e.injected_at for e in exchanges if e.first_reply_at is not None
+        ),
+        "by_kind": by_kind,
+        "stages": {
+            name: {
+                "concurrency": stage.concurrency,
+                "processed": stage.processed,
+                "failed": stage.failed,
+                "wait_sec": percentiles(stage.wait_times),
+                "run_sec": percentiles(stage.run_times),
+            }
+            for name, stage in stages.items()
+        },
+        "api_calls": dict(api.calls),
+        "flood_responses": api.flood_responses,
+        "error_samples": [e.replies[-1] for e in outcomes[OUTCOME_ERROR][:5] if e.replies],
+    }
+
+
+def format_report(report: dict) -> str:
+    """Краткая текстовая сводка отчёта."""
+    def line(summary: dict) -> str:
+        if not summary.get("count"):
+            return "-"
+        return "p50={p50:.2f}с p95={p95:.2f}с p99={p99:.2f}с max={max:.2f}с".format(**summary)
+
+    lines = [
+        f"Отправлено: {report['config']['updates']} за {report['injected_sec']:.1f}с, "
+        f"всего {report['wall_sec']:.1f}с",
+        f"Успешно: {report['ok']}, ошибок: {report['errors']}, отклонено: {report['rejected']}, "
+        f"без ответа: {report['timeouts']}",
+        f"Пропускная способность: {report['throughput_per_min']:.1f} файлов/мин, "
+        f"аудио x{report['audio_sec_per_sec']:.2f}",
+        f"Время до результата: {line(report['latency_sec'])}",
+        f"Время до первого ответа: {line(report['first_reply_sec'])}",
+    ]
+    for name, stage in report["stages"].items():
+        lines.append(f"  {name:<8} ожидание {line(stage['wait_sec'])}; работа {line(stage['run_sec'])}")
+    lines.append(f"Вызовы API: {report['api_calls']}")
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        prog="python -m bot.bench.loadtest",
+        description="Нагрузочный тест бота с локальной заменой Telegram Bot API"
+    )
+    parser.add_argument("-n", "--updates", type=int, default=50, help="Сообщений с медиа")
+    parser.add_argument("-r", "--rate", type=float, default=2.0, help="Сообщений в секунду (0 - все сразу)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Смесь типов медиа с весами (по умолчанию {DEFAULT_MIX})")
+    parser.add_argument("--durations", default="5,30",
+                        help="Длительности синтетических записей в секундах через запятую")
+    parser.add_argument("--samples", type=Path, help="Директория с реальными записями вместо синтетических")
+    parser.add_argument("--media-dir", type=Path, default=Config.TEMP_DIR / "bench_media",
+                        help="Кэш синтетических файлов")
+    parser.add_argument("--flood-rate", type=float, default=0.0,
+                        help="Доля ответов 429 на отправку сообщений")
+    parser.add_argument("--timeout", type=float, default=600.0,
+                        help="Ожидание ответов после отправки последнего сообщения, с")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно генератора случайных чисел")
+    parser.add_argument("-o", "--output", type=Path, help="Файл для отчёта в JSON")
+
+    args = parser.parse_args(argv)
+    try:
+        args.durations = [float(value) for value in args.durations.split(",") if value.strip()]
+    except ValueError:
+        parser.error("--durations: ожидаются числа через запятую")
+    if not args.durations or min(args.durations) <= 0:
+        parser.error("--durations: длительности должны быть положительными")
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    """Точка входа."""
+    args = parse_args(argv)
+    ensure_ffmpeg()
+
+    report = asyncio.run(run_load(args))
+    print(format_report(report))
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Отчёт: {args.output}")
+    sys.exit(0 if report["completed"] and not report["errors"] else 1)
+
+
+if __name__ == "__main__":
+    main()
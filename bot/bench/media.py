@@ -0,0 +1,69 @@
+import asyncio
+from pathlib import Path
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Параметры кодирования синтетических файлов по расширению
+AUDIO_CODECS: Dict[str, List[str]] = {
+    "ogg": ["-c:a", "libopus", "-b:a", "32k"],
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "64k"],
+    "m4a": ["-c:a", "aac", "-b:a", "64k"],
+    "wav": ["-c:a", "pcm_s16le"],
+    "flac": ["-c:a", "flac"],
+}
+VIDEO_CODECS: Dict[str, List[str]] = {
+    "mp4": ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-c:a", "aac", "-b:a", "64k"],
+    "webm": ["-c:v", "libvpx", "-deadline", "realtime", "-c:a", "libopus", "-b:a", "32k"],
+}
+
+
+async def generate_media(directory: Path, extension: str, duration_sec: float) -> Path:
+    """
+    Генерация синтетического медиафайла средствами ffmpeg (с кэшированием).
+
+    Звук - смесь тона и шума с частотой 48 кГц (как у реальных записей),
+    видео - тестовая таблица 320x240.
+
+    Args:
+        directory: Директория кэша
+        extension: Расширение (ogg, mp3, m4a, wav, flac, mp4, webm)
+        duration_sec: Длительность в секундах
+
+    Returns:
+        Путь к файлу
+    """
+    if extension not in AUDIO_CODECS and extension not in VIDEO_CODECS:
+        raise ValueError(f"Неподдерживаемый формат: {extension}")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"synthetic_{duration_sec:g}s.{extension}"
+    if path.exists() and path.stat().st_size > 0:
+        return path
+
+    audio_source = (
+        f"sine=frequency=220:sample_rate=48000:duration={duration_sec},"
+        f"volume=0.5[tone];anoisesrc=color=pink:sample_rate=48000:amplitude=0.05:duration={duration_sec}[noise];"
+        f"[tone][noise]amix=inputs=2"
+    )
+    cmd = ["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", audio_source]
+    if extension in VIDEO_CODECS:
+        cmd += ["-f", "lavfi", "-i", f"testsrc=size=320x240:rate=15:duration={duration_sec}"]
+        cmd += VIDEO_CODECS[extension] + ["-shortest"]
+    else:
+        cmd += AUDIO_CODECS[extension]
+    cmd.append(str(path))
+
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        path.unlink(missing_ok=True)
+        raise RuntimeError(f"Ошибка генерации {path.name}: {stderr.decode('utf-8', errors='ignore')}")
+
+    logger.info(f"Сгенерирован тестовый файл: {path}")
+    return path
@@ -0,0 +1,156 @@
+import json
+import os
+import platform
+import statistics
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from bot.utils.memory import get_rss_bytes
+
+
+def percentiles(values: Iterable[float], points: Sequence[float] = (50, 90, 95, 99)) -> Dict[str, float]:
+    """
+    Сводка распределения: количество, среднее, минимум, максимум и перцентили.
+
+    Перцентили считаются линейной интерполяцией между соседними значениями.
+
+    Args:
+        values: Измерения
+        points: Перцентили (0-100)
+
+    Returns:
+        Словарь вида {"count": 10, "mean": ..., "p50": ..., "max": ...}
+    """
+    data = sorted(values)
+    if not data:
+        return {"count": 0}
+
+    summary = {
+        "count": len(data),
+        "mean": round(statistics.fmean(data), 6),
+        "min": round(data[0], 6),
+    }
+    for point in points:
+        rank = (len(data) - 1) * point / 100
+        low = int(rank)
+        high = min(low + 1, len(data) - 1)
+        value = data[low] + (data[high] - data[low]) * (rank - low)
+        summary[f"p{point:g}"] = round(value, 6)
+    summary["max"] = round(data[-1], 6)
+    return summary
+
+
+class PeakRssSampler:
+    """
+    Пиковый RSS процесса за время блока ``with``.
+
+    Фоновый поток опрашивает RSS с заданным интервалом: ru_maxrss
+    монотонен за всю жизнь процесса и не подходит для сравнения
+    нескольких конфигураций в одном прогоне.
+    """
+
+    def __init__(self, interval_sec: float = 0.02):
+        self.interval_sec = interval_sec
+        self.start_bytes: Optional[int] = None
+        self.peak_bytes: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "PeakRssSampler":
+        self.start_bytes = self.peak_bytes = get_rss_bytes()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._update()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_sec):
+            self._update()
+
+    def _update(self) -> None:
+        rss = get_rss_bytes()
+        if rss is not None and (self.peak_bytes is None or rss > self.peak_bytes):
+            self.peak_bytes = rss
+
+    @property
+    def peak_mb(self) -> Optional[float]:
+        """Пиковый RSS в МБ."""
+        return round(self.peak_bytes / 1024 / 1024, 1) if self.peak_bytes is not None else None
+
+
+def compare_with_baseline(
+    results: List[dict],
+    baseline: List[dict],
+    metrics: Sequence[str],
+    tolerance: float = 0.1
+) -> List[dict]:
+    """
+    Сравнение результатов с сохранённым базовым прогоном.
+
+    Записи сопоставляются по полю ``key``; все метрики считаются
+    «меньше - лучше». Вложенные метрики задаются через точку
+    (например ``rtf.p50``).
+
+    Args:
+        results: Текущие результаты
+        baseline: Результаты базового прогона
+        metrics: Сравниваемые метрики
+        tolerance: Допустимое ухудшение (0.1 - на 10%)
+
+    Returns:
+        Список сравнений; ``regression`` = True при ухудшении сверх допуска
+    """
+    baseline_by_key = {item["key"]: item for item in baseline}
+    comparisons = []
+    for item in results:
+        reference = baseline_by_key.get(item["key"])
+        if reference is None:
+            continue
+        for metric in metrics:
+            current, previous = _lookup(item, metric), _lookup(reference, metric)
+            if current is None or not previous:
+                continue
+            change = (current - previous) / previous
+            comparisons.append({
+                "key": item["key"],
+                "metric": metric,
+                "baseline": previous,
+                "current": current,
+                "change_pct": round(change * 100, 2),
+                "regression": change > tolerance,
+            })
+    return comparisons
+
+
+def load_baseline(path: Path) -> List[dict]:
+    """Результаты из сохранённого отчёта (пустой список, если файла нет)."""
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", [])
+
+
+def machine_info() -> dict:
+    """Описание машины для отчёта: сравнивать имеет смысл только одинаковые."""
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def _lookup(item: dict, metric: str) -> Optional[float]:
+    value = item
+    for part in metric.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value if isinstance(value, (int, float)) else None
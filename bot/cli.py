@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, TextIO
+
+from bot.config import Config
+from bot.models import MediaJob, TranscriptionResult
+from bot.services import (
+    FileService,
+    AudioService,
+    TranscribeService,
+    WorkspaceManager,
+    MediaPipeline,
+)
+from bot.services.pipeline_service import result_segments, result_text
+from bot.utils import setup_logger, ensure_ffmpeg, format_srt
+from bot.utils.validators import validate_audio_format, validate_video_format
+
+
+# Настройка логирования
+logger = setup_logger(
+    name="bot",
+    log_dir=Config.LOG_DIR,
+    level=Config.LOG_LEVEL,
+    retention_days=Config.LOG_RETENTION_DAYS
+)
+
+
+@dataclass
+class RunStats:
+    """Итоги пакетного прогона."""
+    processed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    audio_sec: float = 0.0
+    processing_sec: float = 0.0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def report(self) -> str:
+        """Сводка: пропускная способность и коэффициент реального времени."""
+        wall = time.perf_counter() - self.started_at
+        lines = [
+            f"Файлов обработано: {self.processed}, с ошибкой: {self.failed}, пропущено: {self.skipped}",
+            f"Аудио: {self.audio_sec:.1f}с, время работы: {wall:.1f}с",
+        ]
+        if wall > 0:
+            lines.append(f"Пропускная способность: {self.processed / wall * 60:.1f} файлов/мин")
+        if self.audio_sec > 0:
+            lines.append(
+                f"RTF: {wall / self.audio_sec:.3f} (по времени работы), "
+                f"{self.processing_sec / self.audio_sec:.3f} (суммарно по файлам); "
+                f"скорость: x{self.audio_sec / max(wall, 1e-9):.1f}"
+            )
+        return "\n".join(lines)
+
+
+def iter_inputs(paths: List[Path], manifest: Optional[Path]) -> Iterator[Path]:
+    """
+    Перечисление входных файлов.
+
+    Args:
+        paths: Файлы и директории (директории обходятся рекурсивно)
+        manifest: Файл со списком путей: по одному в строке или JSONL с полем "path"
+
+    Yields:
+        Пути к медиафайлам
+    """
+    if manifest is not None:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("{"):
+                    line = json.loads(line)["path"]
+                yield Path(line)
+
+    for path in paths:
+        if path.is_dir():
+            for child in sorted(path.rglob("*")):
+                if child.is_file() and (validate_audio_format(child) or validate_video_format(child)):
+                    yield child
+        else:
+            yield path
+
+
+def load_completed(output: Path) -> Set[str]:
+    """Файлы, уже успешно обработанные в предыдущем прогоне."""
+    completed = set()
+    if not output.exists():
+        return completed
+
+    with open(output, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Последняя строка могла оборваться при аварийной остановке
+                continue
+            if not record.get("error"):
+                completed.add(record["path"])
+    return completed
+
+
+class BulkTranscriber:
+    """
+    Пакетная транскрибация локальных файлов.
+
+    Использует тот же конвейер (MediaPipeline.execute), что и бот:
+    рабочие директории, стадии decode/infer и их лимиты параллельности.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+
+        workspaces = WorkspaceManager(
+            Config.TEMP_DIR,
+            budget_mb=Config.TEMP_DISK_BUDGET_MB,
+            min_free_mb=Config.TEMP_MIN_FREE_MB,
+            policy="wait",
+            wait_timeout_sec=Config.TEMP_BUDGET_WAIT_SEC
+        )
+        file_service = FileService(Config.TEMP_DIR, workspaces=workspaces)
+        audio_service = AudioService(file_service, Config.TEMP_DIR, args.max_file_size_mb)
+        transcribe_service = TranscribeService(
+            model_name=Config.GIGAAM_MODEL,
+            device=Config.get_device(),
+            scratch_dir=Config.get_scratch_dir(),
+            model_cache=Config.get_model_cache(),
+            backend=Config.ASR_BACKEND,
+            onnx_dir=Config.ONNX_DIR,
+            onnx_threads=Config.ONNX_THREADS,
+            batch_size=args.batch_size,
+            batch_wait_ms=Config.ASR_BATCH_WAIT_MS,
+            batch_concurrency=args.infer_workers
+        )
+        self.pipeline = MediaPipeline(
+            audio_service,
+            transcribe_service,
+            hf_token=Config.HF_TOKEN if args.longform else None,
+            max_jobs=args.jobs,
+            max_queue=0,
+            decode_concurrency=args.decode_workers,
+            infer_concurrency=args.infer_workers
+        )
+        self.stats = RunStats()
+
+    async def run(self) -> RunStats:
+        """Обработка всех входных файлов."""
+        args = self.args
+        completed = set() if args.no_resume else load_completed(args.output)
+        if completed:
+            logger.info(f"Продолжение прогона: {len(completed)} файлов уже обработано")
+
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        if args.srt_dir is not None:
+            args.srt_dir.mkdir(parents=True, exist_ok=True)
+
+        mode = "w" if args.no_resume else "a"
+        with open(args.output, mode, encoding="utf-8") as output:
+            # Ограниченная очередь: список файлов читается не дальше
+            # queue_size вперёд, а медленный файл не задерживает остальные
+            queue: asyncio.Queue = asyncio.Queue(maxsize=args.queue_size)
+            consumers = [asyncio.create_task(self._consume(queue, output)) for _ in range(args.jobs)]
+            try:
+                for index, path in enumerate(iter_inputs(args.inputs, args.manifest)):
+                    if str(path) in completed:
+                        self.stats.skipped += 1
+                        continue
+                    await queue.put((index, path))
+                for _ in consumers:
+                    await queue.put(None)
+                await asyncio.gather(*consumers)
+            finally:
+                for consumer in consumers:
+                    consumer.cancel()
+
+        return self.stats
+
+    async def _consume(self, queue: asyncio.Queue, output: TextIO) -> None:
+        """Обработка файлов из очереди до метки конца (None)."""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            await self._process(*item, output)
+
+    async def _process(self, index: int, path: Path, output: TextIO) -> None:
+        """Обработка одного файла и запись результата."""
+        is_video = validate_video_format(path)
+        job = MediaJob(
+            job_id=MediaJob.new_id(0, index),
+            kind="file",
+            label="видеофайл" if is_video else "аудиофайл",
+            chat_id=0,
+            user_id=0,
+            message_id=index,
+            file_id=str(path),
+            file_name=path.name,
+            file_size=path.stat().st_size if path.exists() else None,
+            is_video=is_video,
+            source_path=str(path)
+        )
+
+        record = {"path": str(path)}
+        started = time.perf_counter()
+        try:
+            async with self.pipeline.admit.slot():
+                result = await self.pipeline.execute(job)
+            elapsed = time.perf_counter() - started
+            duration = job.duration or 0.0
+
+            if isinstance(result, TranscriptionResult) and not result.is_success:
+                raise RuntimeError(result.error)
+
+            segments = result_segments(result, duration)
+            record.update({
+                "text": result_text(result),
+                "duration": round(duration, 3),
+                "processing_time": round(elapsed, 3),
+                "rtf": round(elapsed / duration, 4) if duration else None,
+                "stages": result.trace.stage_totals() if result.trace is not None else None,
+                "segments": [
+                    {"start": round(s.start_time, 3), "end": round(s.end_time, 3), "text": s.text}
+                    for s in segments
+                ],
+                "error": None,
+            })
+            if self.args.srt_dir is not None:
+                # Имя из полного пути, чтобы одноимённые файлы из разных папок не совпали
+                parts = [part for part in path.with_suffix(".srt").parts if part not in (path.anchor, "..", ".")]
+                srt_path = self.args.srt_dir / "__".join(parts)
+                srt_path.write_text(format_srt(segments), encoding="utf-8")
+
+            self.stats.processed += 1
+            self.stats.audio_sec += duration
+            self.stats.processing_sec += elapsed
+            logger.info(f"[{index + 1}] {path}: {duration:.1f}с за {elapsed:.1f}с")
+
+        except Exception as e:
+            record["error"] = str(e)
+            self.stats.failed += 1
+            logger.error(f"[{index + 1}] {path}: {e}")
+
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        prog="python -m bot.cli",
+        description="Пакетная транскрибация аудио- и видеофайлов моделью GigaAM"
+    )
+    parser.add_argument("inputs", nargs="*", type=Path, help="Файлы или директории")
+    parser.add_argument("-m", "--manifest", type=Path, help="Список файлов (строки или JSONL с полем path)")
+    parser.add_argument("-o", "--output", type=Path, default=Path("transcripts.jsonl"), help="Выходной JSONL")
+    parser.add_argument("--srt-dir", type=Path, help="Директория для субтитров SRT")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="Файлов в работе одновременно")
+    parser.add_argument("--decode-workers", type=int, default=Config.PIPELINE_DECODE_CONCURRENCY,
+                        help="Параллельных процессов ffmpeg")
+    parser.add_argument("--infer-workers", type=int, default=Config.PIPELINE_INFER_CONCURRENCY,
+                        help="Параллельных вызовов модели")
+    parser.add_argument("--batch-size", type=int, default=Config.ASR_BATCH_SIZE,
+                        help="Записей в одном вызове модели")
+    parser.add_argument("--queue-size", type=int, default=64, help="Файлов в очереди на обработку")
+    parser.add_argument("--max-file-size-mb", type=int, default=2048, help="Максимальный размер файла")
+    parser.add_argument("--longform", action="store_true", help="Длинные записи через VAD (нужен HF_TOKEN)")
+    parser.add_argument("--no-resume", action="store_true", help="Начать заново, перезаписав выходной файл")
+
+    args = parser.parse_args(argv)
+    if not args.inputs and args.manifest is None:
+        parser.error("укажите файлы, директории или --manifest")
+    args.jobs = max(1, args.jobs)
+    args.batch_size = max(1, args.batch_size)
+    args.queue_size = max(1, args.queue_size)
+    return args
+
+
+def main(argv: Optional[List[str]] = None):
+    """Точка входа."""
+    args = parse_args(argv)
+    Config.validate(require_token=False)
+    ensure_ffmpeg()
+
+    stats = asyncio.run(BulkTranscriber(args).run())
+    print(stats.report())
+    sys.exit(1 if stats.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
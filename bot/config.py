@@ -12,20 +12,91 @@ class Config:
 
     # ========== Telegram ==========
     TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN", "")
+    # Адреса Bot API (локальный Bot API сервер или нагрузочный стенд)
+    TELEGRAM_API_BASE_URL: str = os.getenv("TELEGRAM_API_BASE_URL", "https://api.telegram.org/bot")
+    TELEGRAM_FILE_BASE_URL: str = os.getenv("TELEGRAM_FILE_BASE_URL", "https://api.telegram.org/file/bot")
+
+    # ========== Получение обновлений ==========
+    # polling - long polling, webhook - встроенный HTTP-сервер
+    BOT_MODE: str = os.getenv("BOT_MODE", "polling")
+    WEBHOOK_URL: str = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+    # Сбрасывать накопившиеся обновления при запуске
+    DROP_PENDING_UPDATES: bool = os.getenv("DROP_PENDING_UPDATES", "true").lower() in ("1", "true", "yes")
+
+    # ========== Встроенный HTTP-сервер ==========
+    HTTP_HOST: str = os.getenv("HTTP_HOST", "127.0.0.1")
+    HTTP_PORT: int = int(os.getenv("HTTP_PORT", "8080"))
+    # Метрики в формате Prometheus (GET METRICS_PATH)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+    METRICS_PATH: str = os.getenv("METRICS_PATH", "/metrics")
+    # Проверки для супервизора: liveness и readiness (готов после загрузки и прогрева модели)
+    HEALTH_ENABLED: bool = os.getenv("HEALTH_ENABLED", "false").lower() in ("1", "true", "yes")
+    HEALTH_LIVE_PATH: str = os.getenv("HEALTH_LIVE_PATH", "/healthz")
+    HEALTH_READY_PATH: str = os.getenv("HEALTH_READY_PATH", "/readyz")
+
+    # ========== HTTP API распознавания ==========
+    # OpenAI-совместимый POST /v1/audio/transcriptions на встроенном HTTP-сервере
+    API_ENABLED: bool = os.getenv("API_ENABLED", "false").lower() in ("1", "true", "yes")
+    API_TOKEN: str = os.getenv("API_TOKEN", "")
+    API_MAX_UPLOAD_MB: int = int(os.getenv("API_MAX_UPLOAD_MB", os.getenv("MAX_FILE_SIZE_MB", "100")))
 
     # ========== GigaAM ==========
     GIGAAM_MODEL: str = os.getenv("GIGAAM_MODEL", "rnnt")
     GIGAAM_DEVICE: str = os.getenv("GIGAAM_DEVICE", "auto")
     HF_TOKEN: Optional[str] = os.getenv("HF_TOKEN")
+    # Движок распознавания: torch (CPU/CUDA) или onnx (энкодер в ONNX Runtime на CPU)
+    ASR_BACKEND: str = os.getenv("ASR_BACKEND", "torch")
+    # Директория экспортированных графов ONNX (создаются при первом запуске)
+    ONNX_DIR: Path = Path(os.getenv("ONNX_DIR", "data/onnx"))
+    # Потоков ONNX Runtime на один вызов (0 - по числу ядер)
+    ONNX_THREADS: int = int(os.getenv("ONNX_THREADS", "0"))
+    # Записей в одном вызове модели (1 - без батчей)
+    ASR_BATCH_SIZE: int = int(os.getenv("ASR_BATCH_SIZE", "1"))
+    # Сколько ждать остальные записи батча после первой
+    ASR_BATCH_WAIT_MS: float = float(os.getenv("ASR_BATCH_WAIT_MS", "20"))
+    # Кэш собранной модели для быстрого запуска без сети (пусто - без кэша)
+    MODEL_CACHE_DIR: str = os.getenv("MODEL_CACHE_DIR", "")
+    # Пересчитывать контрольную сумму кэша при каждой загрузке
+    # (иначе - только если размер или время изменения файла не совпали с манифестом)
+    MODEL_CACHE_VERIFY: bool = os.getenv("MODEL_CACHE_VERIFY", "false").lower() in ("1", "true", "yes")
+    # Выгружать модель после стольких секунд без задач (0 - держать всегда)
+    MODEL_IDLE_UNLOAD_SEC: float = float(os.getenv("MODEL_IDLE_UNLOAD_SEC", "0"))
+    # Прогрев модели синтетической записью после загрузки (0 - без прогрева)
+    WARMUP_RUNS: int = int(os.getenv("WARMUP_RUNS", "1"))
+    WARMUP_AUDIO_SEC: float = float(os.getenv("WARMUP_AUDIO_SEC", "3"))
 
     # ========== Логирование ==========
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_DIR: Path = Path(os.getenv("LOG_DIR", "logs"))
     LOG_RETENTION_DAYS: int = int(os.getenv("LOG_RETENTION_DAYS", "30"))
+    # text или json (одна запись - одна строка JSON с job_id)
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    # Запись логов в отдельном потоке, чтобы медленный диск не задерживал event loop
+    LOG_QUEUE: bool = os.getenv("LOG_QUEUE", "true").lower() in ("1", "true", "yes")
+    # Доля входящих обновлений, которые пишутся в лог на уровне DEBUG
+    LOG_UPDATES_SAMPLE_RATE: float = float(os.getenv("LOG_UPDATES_SAMPLE_RATE", "0"))
 
     # ========== Временные файлы ==========
     TEMP_DIR: Path = Path(os.getenv("TEMP_DIR", "temp"))
     MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "100"))
+    TEMP_DISK_BUDGET_MB: int = int(os.getenv("TEMP_DISK_BUDGET_MB", "2048"))
+    TEMP_MIN_FREE_MB: int = int(os.getenv("TEMP_MIN_FREE_MB", "500"))
+    TEMP_BUDGET_POLICY: str = os.getenv("TEMP_BUDGET_POLICY", "wait")
+    TEMP_BUDGET_WAIT_SEC: int = int(os.getenv("TEMP_BUDGET_WAIT_SEC", "60"))
+    # Хранилище промежуточных файлов: disk (TEMP_DIR), tmpfs (SCRATCH_DIR)
+    # или memory (SCRATCH_DIR в RAM с бюджетом SCRATCH_MEMORY_BUDGET_MB и откатом на диск)
+    SCRATCH_BACKEND: str = os.getenv("SCRATCH_BACKEND", "disk")
+    SCRATCH_DIR: Path = Path(os.getenv("SCRATCH_DIR", "/dev/shm/gigaam-bot"))
+    SCRATCH_MEMORY_BUDGET_MB: int = int(os.getenv("SCRATCH_MEMORY_BUDGET_MB", "512"))
+    CLEANUP_INTERVAL_SEC: int = int(os.getenv("CLEANUP_INTERVAL_SEC", "3600"))
+    CLEANUP_BATCH_SIZE: int = int(os.getenv("CLEANUP_BATCH_SIZE", "500"))
+
+    # ========== Скачивание ==========
+    DOWNLOAD_CONNECTIONS: int = int(os.getenv("DOWNLOAD_CONNECTIONS", "4"))
+    DOWNLOAD_PARALLEL_MIN_MB: int = int(os.getenv("DOWNLOAD_PARALLEL_MIN_MB", "8"))
+    DOWNLOAD_BLOCK_SIZE_KB: int = int(os.getenv("DOWNLOAD_BLOCK_SIZE_KB", "1024"))
 
     # ========== Настройки обработки ==========
     MAX_AUDIO_DURATION_SEC: int = int(os.getenv("MAX_AUDIO_DURATION_SEC", "300"))
@@ -35,8 +106,63 @@ class Config:
     MAX_CONCURRENT_TASKS: int = int(os.getenv("MAX_CONCURRENT_TASKS", "3"))
     TASK_TIMEOUT_SEC: int = int(os.getenv("TASK_TIMEOUT_SEC", "300"))
 
+    # ========== Конвейер обработки ==========
+    PIPELINE_MAX_QUEUE: int = int(os.getenv("PIPELINE_MAX_QUEUE", "50"))
+    PIPELINE_FETCH_CONCURRENCY: int = int(os.getenv("PIPELINE_FETCH_CONCURRENCY", "4"))
+    PIPELINE_DECODE_CONCURRENCY: int = int(os.getenv("PIPELINE_DECODE_CONCURRENCY", "2"))
+    PIPELINE_INFER_CONCURRENCY: int = int(os.getenv("PIPELINE_INFER_CONCURRENCY", "1"))
+    PIPELINE_DELIVER_CONCURRENCY: int = int(os.getenv("PIPELINE_DELIVER_CONCURRENCY", "8"))
+
+    # ========== Память ==========
+    # При RSS выше MEMORY_HIGH_WATER_MB новые задачи ждут (wait) или отклоняются (reject);
+    # 0 - без порога, только метрики
+    MEMORY_HIGH_WATER_MB: int = int(os.getenv("MEMORY_HIGH_WATER_MB", "0"))
+    MEMORY_POLICY: str = os.getenv("MEMORY_POLICY", "wait")
+    MEMORY_WAIT_SEC: int = int(os.getenv("MEMORY_WAIT_SEC", "60"))
+    MEMORY_SAMPLE_INTERVAL_SEC: float = float(os.getenv("MEMORY_SAMPLE_INTERVAL_SEC", "5"))
+    # Число крупнейших мест выделения памяти по tracemalloc (0 - выключено, замедляет работу)
+    MEMORY_TRACEMALLOC_TOP: int = int(os.getenv("MEMORY_TRACEMALLOC_TOP", "0"))
+
+    # ========== Журнал задач ==========
+    # SQLite-журнал принятых задач; пустое значение отключает журнал
+    JOB_STORE_PATH: str = os.getenv("JOB_STORE_PATH", "data/jobs.sqlite3")
+    JOB_RETENTION_DAYS: int = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+    # ========== Распределённая обработка ==========
+    # local - всё в одном процессе; frontend - только Telegram и приём задач,
+    # распознавание выполняют воркеры (python -m bot.worker)
+    PROCESSING_MODE: str = os.getenv("PROCESSING_MODE", "local")
+    # sqlite:///путь - общий файл на одной машине; http(s)://фронтенд/broker - для воркеров
+    BROKER_URL: str = os.getenv("BROKER_URL", "sqlite:///data/broker.sqlite3")
+    # Токен HTTP-доступа к брокеру; если задан, фронтенд открывает BROKER_HTTP_PATH
+    BROKER_TOKEN: str = os.getenv("BROKER_TOKEN", "")
+    BROKER_HTTP_PATH: str = os.getenv("BROKER_HTTP_PATH", "/broker")
+    BROKER_LEASE_SEC: int = int(os.getenv("BROKER_LEASE_SEC", "60"))
+    BROKER_POLL_INTERVAL_SEC: float = float(os.getenv("BROKER_POLL_INTERVAL_SEC", "0.5"))
+    WORKER_ID: str = os.getenv("WORKER_ID", "")
+    WORKER_CONCURRENCY: int = int(os.getenv("WORKER_CONCURRENCY", "2"))
+
+    # ========== Отправка сообщений ==========
+    DELIVERY_GLOBAL_RATE: float = float(os.getenv("DELIVERY_GLOBAL_RATE", "25"))
+    DELIVERY_CHAT_INTERVAL_SEC: float = float(os.getenv("DELIVERY_CHAT_INTERVAL_SEC", "1.0"))
+    DELIVERY_GROUP_INTERVAL_SEC: float = float(os.getenv("DELIVERY_GROUP_INTERVAL_SEC", "3.0"))
+    DELIVERY_MAX_RETRIES: int = int(os.getenv("DELIVERY_MAX_RETRIES", "5"))
+    DELIVERY_MAX_PARTS: int = int(os.getenv("DELIVERY_MAX_PARTS", "5"))
+
+    # ========== Профилирование ==========
+    # Команда /profile (только администраторы) и сигнал SIGUSR1;
+    # профили сохраняются в LOG_DIR/profiles
+    PROFILE_MAX_SEC: int = int(os.getenv("PROFILE_MAX_SEC", "120"))
+    PROFILE_SIGNAL_SEC: int = int(os.getenv("PROFILE_SIGNAL_SEC", "30"))
+    # Сколько следующих вызовов модели профилировать torch.profiler по сигналу
+    PROFILE_SIGNAL_INFERENCES: int = int(os.getenv("PROFILE_SIGNAL_INFERENCES", "0"))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_TOP_N: int = int(os.getenv("PROFILE_TOP_N", "15"))
+
     # ========== Разрешённые пользователи ==========
     _allowed_users: List[int] = []
+    _admin_users: List[int] = []
 
     @classmethod
     def _load_allowed_users(cls) -> None:
@@ -47,13 +173,19 @@ class Config:
                 with open(config_file, "r", encoding="utf-8") as f:
                     data = json.load(f)
                     cls._allowed_users = data.get("allowed_users", [])
-                print(f"[OK] Загружено {len(cls._allowed_users)} разрешённых пользователей")
+                    cls._admin_users = data.get("admin_users", [])
+                print(
+                    f"[OK] Загружено {len(cls._allowed_users)} разрешённых пользователей, "
+                    f"{len(cls._admin_users)} администраторов"
+                )
             else:
                 cls._allowed_users = []
+                cls._admin_users = []
                 print(f"[WARNING] Файл {config_file} не найден, доступ разрешён всем")
         except Exception as e:
             print(f"[ERROR] Ошибка загрузки allowed_users.json: {e}")
             cls._allowed_users = []
+            cls._admin_users = []
 
     @classmethod
     def is_user_allowed(cls, user_id: int) -> bool:
@@ -64,9 +196,19 @@ class Config:
         return user_id in cls._allowed_users
 
     @classmethod
-    def validate(cls) -> None:
-        """Валидация конфигурации."""
-        if not cls.TELEGRAM_BOT_TOKEN:
+    def is_user_admin(cls, user_id: int) -> bool:
+        """Проверка прав администратора (пустой список - администраторов нет)."""
+        return user_id in cls._admin_users
+
+    @classmethod
+    def validate(cls, require_token: bool = True) -> None:
+        """
+        Валидация конфигурации.
+
+        Args:
+            require_token: Требовать токен бота (не нужен офлайн-режиму CLI)
+        """
+        if require_token and not cls.TELEGRAM_BOT_TOKEN:
             raise ValueError("TELEGRAM_BOT_TOKEN не установлен в .env файле")
 
         # Загружаем список разрешённых пользователей
@@ -80,9 +222,100 @@ class Config:
         if cls.GIGAAM_DEVICE not in ("auto", "cuda", "cpu"):
             raise ValueError(f"Неверное значение GIGAAM_DEVICE: {cls.GIGAAM_DEVICE}")
 
+        if cls.TEMP_BUDGET_POLICY not in ("wait", "reject"):
+            raise ValueError(f"Неверное значение TEMP_BUDGET_POLICY: {cls.TEMP_BUDGET_POLICY}")
+
+        if cls.LOG_FORMAT not in ("text", "json"):
+            raise ValueError(f"Неверное значение LOG_FORMAT: {cls.LOG_FORMAT}")
+
+        if cls.ASR_BACKEND not in ("torch", "onnx"):
+            raise ValueError(f"Неверное значение ASR_BACKEND: {cls.ASR_BACKEND}")
+
+        if cls.MEMORY_POLICY not in ("wait", "reject"):
+            raise ValueError(f"Неверное значение MEMORY_POLICY: {cls.MEMORY_POLICY}")
+
+        if cls.BOT_MODE not in ("polling", "webhook"):
+            raise ValueError(f"Неверное значение BOT_MODE: {cls.BOT_MODE}")
+
+        if not cls.WEBHOOK_PATH.startswith("/"):
+            raise ValueError(f"WEBHOOK_PATH должен начинаться с '/': {cls.WEBHOOK_PATH}")
+
+        if cls.PROCESSING_MODE not in ("local", "frontend"):
+            raise ValueError(f"Неверное значение PROCESSING_MODE: {cls.PROCESSING_MODE}")
+
+        if cls.API_ENABLED and cls.PROCESSING_MODE != "local":
+            raise ValueError("HTTP API распознавания доступен только при PROCESSING_MODE=local")
+
+        if cls.PROCESSING_MODE == "frontend" and not cls.BROKER_URL.startswith("sqlite:///"):
+            raise ValueError("Во frontend-режиме BROKER_URL должен быть sqlite:///...")
+
+        if cls.SCRATCH_BACKEND not in ("disk", "tmpfs", "memory"):
+            raise ValueError(f"Неверное значение SCRATCH_BACKEND: {cls.SCRATCH_BACKEND}")
+
+        if cls.SCRATCH_BACKEND != "disk":
+            try:
+                cls.SCRATCH_DIR.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                print(f"[WARNING] SCRATCH_DIR {cls.SCRATCH_DIR} недоступна ({e}), используется TEMP_DIR")
+                cls.SCRATCH_BACKEND = "disk"
+
+    @classmethod
+    def get_model_cache(cls):
+        """Кэш модели или None, если MODEL_CACHE_DIR не задан."""
+        if not cls.MODEL_CACHE_DIR:
+            return None
+        from bot.services.model_cache_service import ModelCache
+
+        return ModelCache(Path(cls.MODEL_CACHE_DIR), verify=cls.MODEL_CACHE_VERIFY)
+
+    @classmethod
+    def get_workspace_manager(cls):
+        """Рабочие директории задач в соответствии с SCRATCH_BACKEND."""
+        from bot.services.workspace_service import WorkspaceManager
+
+        disk_workspaces = WorkspaceManager(
+            cls.TEMP_DIR,
+            budget_mb=cls.TEMP_DISK_BUDGET_MB,
+            min_free_mb=cls.TEMP_MIN_FREE_MB,
+            policy=cls.TEMP_BUDGET_POLICY,
+            wait_timeout_sec=cls.TEMP_BUDGET_WAIT_SEC
+        )
+
+        if cls.SCRATCH_BACKEND == "tmpfs":
+            return WorkspaceManager(
+                cls.SCRATCH_DIR,
+                budget_mb=cls.TEMP_DISK_BUDGET_MB,
+                min_free_mb=cls.TEMP_MIN_FREE_MB,
+                policy=cls.TEMP_BUDGET_POLICY,
+                wait_timeout_sec=cls.TEMP_BUDGET_WAIT_SEC
+            )
+        if cls.SCRATCH_BACKEND == "memory":
+            # RAM-диск с жёстким бюджетом; не поместившиеся задачи идут на диск
+            return WorkspaceManager(
+                cls.SCRATCH_DIR,
+                budget_mb=cls.SCRATCH_MEMORY_BUDGET_MB,
+                fallback=disk_workspaces
+            )
+        return disk_workspaces
+
+    @classmethod
+    def get_profile_dir(cls) -> Path:
+        """Директория для профилей производительности."""
+        return cls.LOG_DIR / "profiles"
+
+    @classmethod
+    def get_scratch_dir(cls) -> Path:
+        """Директория для промежуточных файлов с учётом SCRATCH_BACKEND."""
+        if cls.SCRATCH_BACKEND == "disk":
+            return cls.TEMP_DIR
+        return cls.SCRATCH_DIR
+
     @classmethod
     def get_device(cls) -> str:
         """Получить устройство для модели."""
+        if cls.ASR_BACKEND == "onnx":
+            return "cpu"
+
         import torch
 
         if cls.GIGAAM_DEVICE == "auto":
@@ -2,6 +2,7 @@ import logging
 from typing import Optional
 
 from bot.config import Config
+from bot.models.job import MediaJob
 
 logger = logging.getLogger(__name__)
 
@@ -9,28 +10,92 @@ logger = logging.getLogger(__name__)
 class BaseHandler:
     """Базовый класс для обработчиков."""
 
-    def __init__(self, audio_service, transcribe_service, logger=None):
+    def __init__(self, audio_service, transcribe_service, pipeline=None, logger=None):
         self.audio_service = audio_service
         self.transcribe_service = transcribe_service
+        self.pipeline = pipeline
         self.logger = logger or logging.getLogger(self.__class__.__name__)
 
     def check_access(self, user_id: int) -> bool:
         """Проверка доступа пользователя."""
         return Config.is_user_allowed(user_id)
 
-    async def process(
+    def describe(self, update) -> Optional[MediaJob]:
+        """
+        Описание медиа из сообщения в виде задачи для конвейера.
+
+        Args:
+            update: Объект обновления Telegram
+
+        Returns:
+            Задача или None, если сообщение не нужно обрабатывать
+        """
+        raise NotImplementedError("Метод describe должен быть переопределен")
+
+    def create_job(
         self,
         update,
-        context
-    ) -> Optional[str]:
+        media,
+        kind: str,
+        label: str,
+        is_video: bool = False,
+        extension: Optional[str] = None,
+        file_name: Optional[str] = None
+    ) -> MediaJob:
         """
-        Обработка сообщения.
+        Создание задачи по медиа-объекту Telegram.
 
         Args:
             update: Объект обновления Telegram
-            context: Контекст бота
+            media: Voice, Audio, Video, VideoNote или Document
+            kind: Тип медиа
+            label: Название медиа для сообщений пользователю
+            is_video: Нужно ли извлекать аудиодорожку
+            extension: Расширение для сохранения (если None - из file_path)
+            file_name: Имя файла для ответа
 
         Returns:
-            Текст ответа или None
+            Задача для конвейера
         """
-        raise NotImplementedError("Метод process должен быть переопределен")
+        user_id = update.effective_user.id
+        message_id = update.message.message_id
+
+        duration = getattr(media, "duration", None)
+        if hasattr(duration, "total_seconds"):
+            duration = duration.total_seconds()
+
+        return MediaJob(
+            job_id=MediaJob.new_id(user_id, message_id),
+            kind=kind,
+            label=label,
+            chat_id=update.effective_chat.id,
+            user_id=user_id,
+            message_id=message_id,
+            file_id=media.file_id,
+            file_name=file_name,
+            file_size=media.file_size,
+            duration=duration,
+            is_video=is_video,
+            extension=extension
+        )
+
+    async def handle(self, update, context) -> None:
+        """Обработка сообщения с медиа через конвейер."""
+        user_id = update.effective_user.id
+
+        # Проверка доступа
+        if not self.check_access(user_id):
+            logger.warning(f"Доступ запрещён: user_id={user_id}")
+            return
+
+        job = self.describe(update)
+        if job is None:
+            return
+
+        logger.info(
+            f"Новая задача ({job.label}): job={job.job_id}, user_id={user_id}, "
+            f"msg_id={job.message_id}, name={job.file_name}, size={job.file_size}, "
+            f"duration={job.duration}"
+        )
+
+        await self.pipeline.submit(job)
@@ -1,10 +1,12 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 import logging
+import shutil
 from pathlib import Path
 
 from .base import BaseHandler
 from bot.config import Config
+from bot.services.profiler_service import ProfilerBusyError
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +14,11 @@ logger = logging.getLogger(__name__)
 class CommandHandler(BaseHandler):
     """Обработчик команд бота."""
 
+    def __init__(self, *args, profiler=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Профайлер потоков для команды /profile
+        self.profiler = profiler
+
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Команда /start."""
         user_id = update.effective_user.id
@@ -72,7 +79,11 @@ class CommandHandler(BaseHandler):
 
         from bot.config import Config
 
-        device = Config.get_device()
+        # Без импорта torch: устройство уже определено при загрузке модели
+        if self.transcribe_service is not None:
+            device = self.transcribe_service.device
+        else:
+            device = "воркеры"
 
         about_text = (
             "ℹ️ *О боте*\n\n"
@@ -114,23 +125,29 @@ class CommandHandler(BaseHandler):
         if not self.check_access(user_id):
             return
 
-        from bot.utils.helpers import cleanup_old_files
-
         logger.info(f"Команда /cleanup от пользователя {user_id}")
 
-        # Очищаем все временные файлы (независимо от возраста)
+        # Очищаем все временные файлы (независимо от возраста),
+        # кроме рабочих директорий задач, которые сейчас обрабатываются
         temp_dir = Config.TEMP_DIR
+        workspaces = self.audio_service.file_service.workspaces
         deleted_count = 0
 
-        if temp_dir.exists():
+        for directory in {temp_dir, Config.get_scratch_dir()}:
+            if not directory.exists():
+                continue
             try:
-                for file_path in temp_dir.glob("*"):
-                    if file_path.is_file():
-                        try:
+                for file_path in directory.glob("*"):
+                    if workspaces.is_live(file_path):
+                        continue
+                    try:
+                        if file_path.is_dir():
+                            shutil.rmtree(file_path)
+                        else:
                             file_path.unlink()
-                            deleted_count += 1
-                        except Exception as e:
-                            logger.warning(f"Ошибка удаления {file_path}: {e}")
+                        deleted_count += 1
+                    except Exception as e:
+                        logger.warning(f"Ошибка удаления {file_path}: {e}")
             except Exception as e:
                 logger.error(f"Ошибка очистки temp директории: {e}")
 
@@ -142,3 +159,54 @@ class CommandHandler(BaseHandler):
 
         await update.message.reply_text(response_text)
         logger.info(f"Очистка завершена: удалено {deleted_count} файлов")
+
+    async def profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Команда /profile <секунды> [вызовов модели] - профилирование (только администраторы)."""
+        user_id = update.effective_user.id
+
+        # Проверка доступа
+        if not self.check_access(user_id):
+            return
+        if not Config.is_user_admin(user_id):
+            logger.warning(f"Команда /profile от пользователя без прав администратора: {user_id}")
+            return
+        if self.profiler is None:
+            await update.message.reply_text("❌ Профилирование недоступно")
+            return
+
+        try:
+            seconds = float(context.args[0]) if context.args else float(Config.PROFILE_SIGNAL_SEC)
+            inferences = int(context.args[1]) if len(context.args or []) > 1 else 0
+        except ValueError:
+            await update.message.reply_text("Использование: /profile <секунды> [вызовов модели]")
+            return
+        seconds = min(max(seconds, 1.0), Config.PROFILE_MAX_SEC)
+
+        torch_profiler = getattr(self.transcribe_service, "torch_profiler", None)
+        if inferences > 0 and torch_profiler is not None:
+            torch_profiler.arm(inferences)
+
+        logger.info(f"Команда /profile от пользователя {user_id}: {seconds:.0f}с, вызовов модели: {inferences}")
+        await update.message.reply_text(f"⏱ Профилирование {seconds:.0f}с...")
+
+        try:
+            report = await self.profiler.capture(seconds)
+        except ProfilerBusyError:
+            await update.message.reply_text("⏳ Профилирование уже выполняется")
+            return
+        except Exception as e:
+            logger.error(f"Ошибка профилирования: {e}", exc_info=True)
+            await update.message.reply_text(f"❌ Ошибка профилирования: {e}")
+            return
+
+        files = "\n".join(str(path) for path in report.files)
+        footer = f"\n\nФайлы:\n{files}"
+        if inferences > 0:
+            if torch_profiler is None:
+                footer += "\nПрофиль модели недоступен: распознавание выполняют воркеры"
+            else:
+                footer += f"\nПрофили torch (следующие {inferences} вызовов модели): {self.profiler.output_dir}"
+
+        # Ограничение длины сообщения Telegram
+        summary = report.summary[:4000 - len(footer)]
+        await update.message.reply_text(summary + footer)
@@ -1,93 +1,20 @@
+from typing import Optional
+
 from telegram import Update
-from telegram.ext import ContextTypes
-import logging
 
 from .base import BaseHandler
-
-logger = logging.getLogger(__name__)
+from bot.models.job import MediaJob
 
 
 class VideoNoteHandler(BaseHandler):
     """Обработчик видеосообщений (кружочков)."""
-    
-    async def handle(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        """Обработка видеосообщения."""
-        user_id = update.effective_user.id
-        message_id = update.message.message_id
-        duration = update.message.video_note.duration
 
-        # Проверка доступа
-        if not self.check_access(user_id):
-            logger.warning(f"Доступ запрещён: user_id={user_id}")
-            return
-
-        logger.info(
-            f"Получено видеосообщение: user_id={user_id}, msg_id={message_id}, "
-            f"duration={duration}с"
+    def describe(self, update: Update) -> Optional[MediaJob]:
+        """Видеосообщение (кружочек)."""
+        return self.create_job(
+            update,
+            update.message.video_note,
+            kind="video_note",
+            label="видеосообщение",
+            is_video=True
         )
-        
-        # Отправляем уведомление
-        status_message = await update.message.reply_text("⏳ Обрабатываю видеосообщение...")
-
-        wav_path = None
-
-        try:
-            # Получаем файл
-            video_file = await update.message.video_note.get_file()
-            
-            # Скачиваем
-            from bot.services.file_service import FileService
-            from bot.config import Config
-            file_service = FileService(self.audio_service.file_service.temp_dir)
-
-            video_path = await file_service.download_file(
-                video_file.file_path,
-                bot_token=Config.TELEGRAM_BOT_TOKEN
-            )
-            
-            # Подготавливаем (извлекаем аудио)
-            wav_path, audio_duration = await self.audio_service.prepare_video_note(
-                video_path,
-                user_id,
-                message_id
-            )
-            
-            # Обновляем статус
-            await status_message.edit_text(f"⏳ Распознаю речь ({audio_duration:.1f}с)...")
-            
-            # Транскрибация
-            from bot.config import Config
-            result = await self.transcribe_service.transcribe_auto(
-                wav_path,
-                hf_token=Config.HF_TOKEN
-            )
-
-            # Ответ
-            from bot.models.audio import TranscriptionResult
-            
-            if isinstance(result, TranscriptionResult):
-                if result.is_success:
-                    response_text = (
-                        f"📝 *Распознанный текст:*\n\n"
-                        f"{result.text}\n\n"
-                        f"⏱ Время обработки: {result.processing_time_sec:.2f}с"
-                    )
-                else:
-                    response_text = f"❌ Ошибка распознавания: {result.error}"
-            else:
-                response_text = "📝 *Распознанный текст:*\n\n"
-                for utterance in result.utterances:
-                    response_text += f"{utterance}\n"
-            
-            await status_message.edit_text(response_text, parse_mode="Markdown")
-            logger.info(f"Транскрибация видеосообщения завершена: user_id={user_id}")
-            
-        except Exception as e:
-            logger.error(f"Ошибка обработки видеосообщения: {e}", exc_info=True)
-            await status_message.edit_text(
-                f"❌ Произошла ошибка: {str(e)}"
-            )
-        finally:
-            # Гарантированная очистка временных файлов
-            if wav_path is not None:
-                await self.audio_service.cleanup(wav_path)
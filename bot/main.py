@@ -1,17 +1,35 @@
+import time
+
+# Начало запуска: время импортов входит в отчёт о запуске
+_started_at = time.perf_counter()
+
 import asyncio
 import logging
-import os
+import random
 import signal
 import sys
 from pathlib import Path
+from typing import Dict, Optional
 
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters
 
 from bot.config import Config
-from bot.services import FileService, AudioService, TranscribeService
+from bot.services import (
+    FileService,
+    AudioService,
+    TranscribeService,
+    MediaPipeline,
+    DeliveryService,
+    RateLimiter,
+    JobStore,
+    create_local_broker,
+    StackProfiler,
+    TorchProfiler,
+    MemoryMonitor,
+)
 from bot.handlers import VoiceHandler, AudioHandler, VideoNoteHandler, VideoHandler, DocumentHandler, CommandHandler as CmdHandler
-from bot.utils import setup_logger, periodic_cleanup
+from bot.utils import setup_logger, periodic_cleanup, ensure_ffmpeg, metrics, StartupTimer
 
 
 # Настройка логирования
@@ -19,7 +37,9 @@ logger = setup_logger(
     name="bot",
     log_dir=Config.LOG_DIR,
     level=Config.LOG_LEVEL,
-    retention_days=Config.LOG_RETENTION_DAYS
+    retention_days=Config.LOG_RETENTION_DAYS,
+    json_format=Config.LOG_FORMAT == "json",
+    use_queue=Config.LOG_QUEUE
 )
 
 
@@ -27,130 +47,153 @@ class TelegramGigaAMBot:
     """Главный класс бота."""
     
     def __init__(self):
+        self.startup = StartupTimer(_started_at)
+        self.startup.record("imports", self.startup.elapsed_sec)
+
         # Валидируем конфигурацию
-        Config.validate()
+        with self.startup.phase("config"):
+            Config.validate()
 
         # Проверяем наличие ffmpeg
-        self._check_ffmpeg()
+        with self.startup.phase("ffmpeg"):
+            self._check_ffmpeg()
 
-        # Инициализируем сервисы
-        self._initialize_services()
+        # Инициализируем сервисы (модель загружается в фоне после запуска)
+        with self.startup.phase("services"):
+            self._initialize_services()
 
     def _check_ffmpeg(self):
         """Проверка наличия ffmpeg."""
-        import shutil
-        import sys
-
-        # Сначала проверяем портативную версию в папке tools/
-        project_root = Path(__file__).parent.parent.resolve()
-        tools_dir = project_root / "tools"
-
-        # Проверяем подпапки для Windows
-        if sys.platform == "win32":
-            ffmpeg_paths = [
-                tools_dir / "ffmpeg.exe",
-                tools_dir / "windows" / "ffmpeg.exe",
-            ]
-            ffprobe_paths = [
-                tools_dir / "ffprobe.exe",
-                tools_dir / "windows" / "ffprobe.exe",
-            ]
-        else:
-            ffmpeg_paths = [
-                tools_dir / "ffmpeg",
-                tools_dir / "linux" / "ffmpeg",
-            ]
-            ffprobe_paths = [
-                tools_dir / "ffprobe",
-                tools_dir / "linux" / "ffprobe",
-            ]
-
-        ffmpeg_portable = None
-        ffprobe_portable = None
-
-        for path in ffmpeg_paths:
-            if path.exists():
-                ffmpeg_portable = path
-                break
-
-        for path in ffprobe_paths:
-            if path.exists():
-                ffprobe_portable = path
-                break
-
-        if ffmpeg_portable:
-            # Добавляем папку с бинарниками в PATH
-            bin_dir = ffmpeg_portable.parent
-            os.environ["PATH"] = str(bin_dir) + os.pathsep + os.environ.get("PATH", "")
-            # На Linux/macOS делаем бинарники исполняемыми
-            if sys.platform != "win32":
-                try:
-                    os.chmod(ffmpeg_portable, 0o755)
-                    if ffprobe_portable:
-                        os.chmod(ffprobe_portable, 0o755)
-                except Exception:
-                    pass
-            logger.info(f"[OK] Используется ffmpeg из {bin_dir}")
-        else:
-            # Проверяем ffmpeg в системном PATH
-            ffmpeg_path = shutil.which("ffmpeg")
-            if not ffmpeg_path:
-                logger.error(
-                    "ffmpeg не найден! Установите ffmpeg или поместите "
-                    "бинарники ffmpeg и ffprobe в папку tools/. "
-                    "Подробнее: docs/02-environment-setup.md"
-                )
-                raise RuntimeError("ffmpeg не найден")
-
-            logger.info(f"[OK] ffmpeg найден: {ffmpeg_path}")
+        ensure_ffmpeg()
 
     def _initialize_services(self):
         """Инициализация сервисов бота."""
         # Инициализируем сервисы
-        self.file_service = FileService(Config.TEMP_DIR)
+        self.workspace_manager = Config.get_workspace_manager()
+        self.file_service = FileService(
+            Config.TEMP_DIR,
+            connections=Config.DOWNLOAD_CONNECTIONS,
+            parallel_min_mb=Config.DOWNLOAD_PARALLEL_MIN_MB,
+            block_size_kb=Config.DOWNLOAD_BLOCK_SIZE_KB,
+            workspaces=self.workspace_manager,
+            file_base_url=Config.TELEGRAM_FILE_BASE_URL
+        )
         self.audio_service = AudioService(
             self.file_service,
             Config.TEMP_DIR,
             Config.MAX_FILE_SIZE_MB
         )
-        self.transcribe_service = TranscribeService(
-            model_name=Config.GIGAAM_MODEL,
-            device=Config.get_device()
+        # Во frontend-режиме модель загружают только воркеры
+        self.transcribe_service = None
+        if Config.PROCESSING_MODE == "local":
+            self.transcribe_service = TranscribeService(
+                model_name=Config.GIGAAM_MODEL,
+                device=Config.GIGAAM_DEVICE,
+                scratch_dir=Config.get_scratch_dir(),
+                load=False,
+                model_cache=Config.get_model_cache(),
+                idle_unload_sec=Config.MODEL_IDLE_UNLOAD_SEC,
+                backend=Config.ASR_BACKEND,
+                onnx_dir=Config.ONNX_DIR,
+                onnx_threads=Config.ONNX_THREADS,
+                batch_size=Config.ASR_BATCH_SIZE,
+                batch_wait_ms=Config.ASR_BATCH_WAIT_MS,
+                batch_concurrency=Config.PIPELINE_INFER_CONCURRENCY
+            )
+
+        # Профилирование по команде /profile и сигналу SIGUSR1
+        self.stack_profiler = StackProfiler(
+            Config.get_profile_dir(),
+            interval_ms=Config.PROFILE_INTERVAL_MS,
+            top_n=Config.PROFILE_TOP_N
         )
+        if self.transcribe_service is not None:
+            self.transcribe_service.torch_profiler = TorchProfiler(
+                Config.get_profile_dir(),
+                top_n=Config.PROFILE_TOP_N
+            )
     
-        # Инициализируем обработчики
-        self.command_handler = CmdHandler(
-            self.audio_service,
-            self.transcribe_service
+        # Создаем приложение; обновления обрабатываются параллельно,
+        # а нагрузку ограничивают стадии конвейера
+        self.application = (
+            Application.builder()
+            .token(Config.TELEGRAM_BOT_TOKEN)
+            .base_url(Config.TELEGRAM_API_BASE_URL)
+            .base_file_url(Config.TELEGRAM_FILE_BASE_URL)
+            .concurrent_updates(True)
+            .build()
         )
-        self.voice_handler = VoiceHandler(
-            self.audio_service,
-            self.transcribe_service
-        )
-        self.audio_handler = AudioHandler(
-            self.audio_service,
-            self.transcribe_service
-        )
-        self.video_note_handler = VideoNoteHandler(
-            self.audio_service,
-            self.transcribe_service
+
+        # Отправка сообщений с учётом лимитов Telegram
+        self.delivery_service = DeliveryService(
+            self.application.bot,
+            limiter=RateLimiter(
+                global_rate=Config.DELIVERY_GLOBAL_RATE,
+                chat_interval_sec=Config.DELIVERY_CHAT_INTERVAL_SEC,
+                group_interval_sec=Config.DELIVERY_GROUP_INTERVAL_SEC
+            ),
+            max_retries=Config.DELIVERY_MAX_RETRIES,
+            max_parts=Config.DELIVERY_MAX_PARTS
         )
-        self.video_handler = VideoHandler(
-            self.audio_service,
-            self.transcribe_service
+
+        # Журнал задач
+        self.job_store = JobStore(Path(Config.JOB_STORE_PATH)) if Config.JOB_STORE_PATH else None
+
+        # Брокер задач для воркеров
+        self.broker = None
+        if Config.PROCESSING_MODE == "frontend":
+            self.broker = create_local_broker(
+                Config.BROKER_URL,
+                lease_sec=Config.BROKER_LEASE_SEC,
+                max_attempts=Config.JOB_MAX_ATTEMPTS
+            )
+
+        # Замер памяти и защита от OOM
+        self.memory_monitor = MemoryMonitor(
+            high_water_mb=Config.MEMORY_HIGH_WATER_MB,
+            policy=Config.MEMORY_POLICY,
+            wait_timeout_sec=Config.MEMORY_WAIT_SEC,
+            interval_sec=Config.MEMORY_SAMPLE_INTERVAL_SEC,
+            tracemalloc_top=Config.MEMORY_TRACEMALLOC_TOP
         )
-        self.document_handler = DocumentHandler(
+
+        # Конвейер обработки медиа
+        self.pipeline = MediaPipeline(
             self.audio_service,
-            self.transcribe_service
+            self.transcribe_service,
+            bot=self.application.bot,
+            delivery=self.delivery_service,
+            bot_token=Config.TELEGRAM_BOT_TOKEN,
+            hf_token=Config.HF_TOKEN,
+            max_jobs=Config.MAX_CONCURRENT_TASKS,
+            max_queue=Config.PIPELINE_MAX_QUEUE,
+            fetch_concurrency=Config.PIPELINE_FETCH_CONCURRENCY,
+            decode_concurrency=Config.PIPELINE_DECODE_CONCURRENCY,
+            infer_concurrency=Config.PIPELINE_INFER_CONCURRENCY,
+            deliver_concurrency=Config.PIPELINE_DELIVER_CONCURRENCY,
+            job_store=self.job_store,
+            max_attempts=Config.JOB_MAX_ATTEMPTS,
+            broker=self.broker,
+            memory=self.memory_monitor
         )
-        
-        # Создаем приложение
-        self.application = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).build()
+
+        # Инициализируем обработчики
+        handler_args = (self.audio_service, self.transcribe_service, self.pipeline)
+        self.command_handler = CmdHandler(*handler_args, profiler=self.stack_profiler)
+        self.voice_handler = VoiceHandler(*handler_args)
+        self.audio_handler = AudioHandler(*handler_args)
+        self.video_note_handler = VideoNoteHandler(*handler_args)
+        self.video_handler = VideoHandler(*handler_args)
+        self.document_handler = DocumentHandler(*handler_args)
         
         # Регистрируем обработчики
         self._register_handlers()
         
         self._cleanup_task = None
+        self._results_task = None
+        self._model_task = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
     
     def _register_handlers(self):
         """Регистрация обработчиков команд."""
@@ -159,6 +202,7 @@ class TelegramGigaAMBot:
         self.application.add_handler(CommandHandler("help", self.command_handler.help))
         self.application.add_handler(CommandHandler("about", self.command_handler.about))
         self.application.add_handler(CommandHandler("cleanup", self.command_handler.cleanup))
+        self.application.add_handler(CommandHandler("profile", self.command_handler.profile))
         
         # Голосовые сообщения
         self.application.add_handler(
@@ -193,30 +237,46 @@ class TelegramGigaAMBot:
             )
         )
 
-        # Debug: логируем все обновления
+        # Debug: логируем выборку обновлений (LOG_UPDATES_SAMPLE_RATE, уровень DEBUG)
         async def debug_handler(update, context):
-            if update.message:
-                msg = update.message
-                logger.info(f"Message from {msg.from_user.id}: {msg.message_id}")
-                logger.info(f"Content: {list(msg.to_dict().keys())}")
-                if msg.document:
-                    logger.info(f"Document: {msg.document.file_name}, mime={msg.document.mime_type}")
-                elif msg.video:
-                    logger.info(f"Video: duration={msg.video.duration}")
-                elif msg.video_note:
-                    logger.info(f"Video note: duration={msg.video_note.duration}")
-                elif msg.voice:
-                    logger.info(f"Voice: duration={msg.voice.duration}")
-                elif msg.audio:
-                    logger.info(f"Audio: {msg.audio.file_name}")
+            msg = update.message
+            if msg is None or not logger.isEnabledFor(logging.DEBUG):
+                return
+            if random.random() >= Config.LOG_UPDATES_SAMPLE_RATE:
+                return
+            if msg.document:
+                details = f"document={msg.document.file_name}, mime={msg.document.mime_type}"
+            elif msg.video:
+                details = f"video, duration={msg.video.duration}"
+            elif msg.video_note:
+                details = f"video_note, duration={msg.video_note.duration}"
+            elif msg.voice:
+                details = f"voice, duration={msg.voice.duration}"
+            elif msg.audio:
+                details = f"audio={msg.audio.file_name}"
+            else:
+                details = f"content={list(msg.to_dict().keys())}"
+            logger.debug(f"Message from {msg.from_user.id}: {msg.message_id}, {details}")
 
         self.application.add_handler(MessageHandler(filters.ALL, debug_handler), group=-1)
     
     async def _startup_cleanup(self):
         """Очистка старых файлов при запуске."""
-        from bot.utils.helpers import cleanup_old_files, cleanup_old_logs
+        from bot.utils.helpers import cleanup_old_files_async, cleanup_old_logs
         logger.info("Очистка старых временных файлов...")
-        deleted = cleanup_old_files(Config.TEMP_DIR, max_age_hours=1)
+        deleted = await cleanup_old_files_async(
+            Config.TEMP_DIR,
+            max_age_hours=1,
+            include_dirs=True,
+            batch_size=Config.CLEANUP_BATCH_SIZE
+        )
+        if Config.get_scratch_dir() != Config.TEMP_DIR:
+            deleted += await cleanup_old_files_async(
+                Config.get_scratch_dir(),
+                max_age_hours=1,
+                include_dirs=True,
+                batch_size=Config.CLEANUP_BATCH_SIZE
+            )
         if deleted > 0:
             logger.info(f"Удалено {deleted} старых файлов из temp/")
         await cleanup_old_logs(Config.LOG_DIR, Config.LOG_RETENTION_DAYS)
@@ -227,8 +287,11 @@ class TelegramGigaAMBot:
             periodic_cleanup(
                 temp_dir=Config.TEMP_DIR,
                 log_dir=Config.LOG_DIR,
+                scratch_dir=Config.get_scratch_dir(),
                 retention_days=Config.LOG_RETENTION_DAYS,
-                check_interval=3600  # 1 час
+                check_interval=Config.CLEANUP_INTERVAL_SEC,
+                is_protected=self.workspace_manager.is_live,
+                batch_size=Config.CLEANUP_BATCH_SIZE
             )
         )
     
@@ -247,47 +310,204 @@ class TelegramGigaAMBot:
             logger.info(f"Получен сигнал {signum}, остановка...")
             self.stop()
         
+        def profile_handler(signum, frame):
+            if self._loop is None:
+                return
+            logger.info(f"Получен сигнал {signum}, профилирование {Config.PROFILE_SIGNAL_SEC}с")
+            if self.transcribe_service is not None and Config.PROFILE_SIGNAL_INFERENCES > 0:
+                self.transcribe_service.torch_profiler.arm(Config.PROFILE_SIGNAL_INFERENCES)
+            self.stack_profiler.schedule(self._loop, Config.PROFILE_SIGNAL_SEC)
+
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, profile_handler)
     
     async def _post_init(self, application):
         """Действия после инициализации приложения."""
         await self._startup_cleanup()
         await self.start_cleanup_task()
+        self.memory_monitor.start()
+        if self.transcribe_service is not None:
+            self.transcribe_service.start_idle_unload()
+
+    async def _load_model(self):
+        """Загрузка и прогрев модели в фоне: бот уже принимает сообщения, задачи ждут модель."""
+        try:
+            with self.startup.phase("model"):
+                await self.transcribe_service.load()
+            logger.info(f"Устройство модели: {self.transcribe_service.device}")
+            with self.startup.phase("warmup"):
+                await self.transcribe_service.warmup(
+                    runs=Config.WARMUP_RUNS,
+                    duration_sec=Config.WARMUP_AUDIO_SEC,
+                    concurrency=Config.PIPELINE_INFER_CONCURRENCY
+                )
+            logger.info(f"Модель готова через {self.startup.elapsed_sec:.1f}с после запуска")
+        except Exception as e:
+            logger.critical(f"Ошибка загрузки модели: {e}", exc_info=True)
+
+    def _readiness(self) -> Dict[str, bool]:
+        """Проверки готовности для /readyz."""
+        checks = {"telegram": self.application.running}
+        if self.transcribe_service is not None:
+            # Выгруженная по простою модель загрузится с первой задачей
+            checks["model"] = self.transcribe_service.is_available
+            checks["warmup"] = self.transcribe_service.is_warmed_up
+        return checks
+
+    def _create_http_server(self) -> Optional["HttpServer"]:
+        """Встроенный HTTP-сервер с маршрутами включённых компонентов."""
+        # aiohttp.web нужен только при включённых маршрутах
+        from bot.server import (
+            HttpServer, WebhookIngress, BrokerEndpoint, TranscriptionApi, MetricsEndpoint, HealthEndpoint
+        )
+
+        server = HttpServer(Config.HTTP_HOST, Config.HTTP_PORT)
+
+        if Config.BOT_MODE == "webhook":
+            WebhookIngress(
+                self.application,
+                Config.WEBHOOK_PATH,
+                secret_token=Config.WEBHOOK_SECRET or None
+            ).register(server)
+
+        if self.broker is not None and Config.BROKER_TOKEN:
+            BrokerEndpoint(
+                self.broker,
+                Config.BROKER_HTTP_PATH,
+                token=Config.BROKER_TOKEN
+            ).register(server)
+
+        if Config.API_ENABLED:
+            TranscriptionApi(
+                self.pipeline,
+                token=Config.API_TOKEN,
+                max_upload_mb=Config.API_MAX_UPLOAD_MB
+            ).register(server)
+
+        if Config.METRICS_ENABLED:
+            MetricsEndpoint(metrics, Config.METRICS_PATH).register(server)
+
+        if Config.HEALTH_ENABLED:
+            HealthEndpoint(
+                self._readiness,
+                live_path=Config.HEALTH_LIVE_PATH,
+                ready_path=Config.HEALTH_READY_PATH
+            ).register(server)
+
+        return server if server.has_routes else None
+
+    async def _start_webhook(self):
+        """Регистрация webhook в Telegram (если задан публичный URL)."""
+        if not Config.WEBHOOK_URL:
+            logger.info("WEBHOOK_URL не задан, webhook должен быть настроен внешне")
+            return
+
+        url = Config.WEBHOOK_URL.rstrip("/") + Config.WEBHOOK_PATH
+        await self.application.bot.set_webhook(
+            url=url,
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=Config.DROP_PENDING_UPDATES,
+            secret_token=Config.WEBHOOK_SECRET or None
+        )
+        logger.info(f"Webhook установлен: {url}")
+
+    async def _run(self):
+        """Жизненный цикл приложения внутри event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+
+        # Модель грузится параллельно с подключением к Telegram
+        if self.transcribe_service is not None:
+            self._model_task = asyncio.create_task(self._load_model())
+
+        application = self.application
+        with self.startup.phase("http"):
+            http_server = self._create_http_server()
+
+        with self.startup.phase("initialize"):
+            await application.initialize()
+        try:
+            with self.startup.phase("post_init"):
+                await self._post_init(application)
+
+            with self.startup.phase("updates"):
+                if Config.BOT_MODE == "webhook":
+                    await self._start_webhook()
+                else:
+                    await application.updater.start_polling(
+                        allowed_updates=Update.ALL_TYPES,
+                        drop_pending_updates=Config.DROP_PENDING_UPDATES
+                    )
+
+                await application.start()
+            with self.startup.phase("resume"):
+                await self.pipeline.resume_pending(Config.JOB_RETENTION_DAYS)
+            if self.broker is not None:
+                self._results_task = asyncio.create_task(
+                    self.pipeline.consume_results(Config.BROKER_POLL_INTERVAL_SEC)
+                )
+            if http_server is not None:
+                await http_server.start()
+
+            logger.info(f"Бот запущен (режим: {Config.BOT_MODE}): {self.startup.report()}")
+            await self._stop_event.wait()
+        finally:
+            if http_server is not None:
+                await http_server.stop()
+            if application.updater is not None and application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+            await self.stop_cleanup_task()
+            await self.memory_monitor.stop()
+            if self.transcribe_service is not None:
+                await self.transcribe_service.stop_idle_unload()
+            if self._model_task is not None and not self._model_task.done():
+                self._model_task.cancel()
+            if self._results_task is not None:
+                self._results_task.cancel()
+                try:
+                    await self._results_task
+                except asyncio.CancelledError:
+                    pass
+            await application.shutdown()
+            if self.broker is not None:
+                await self.broker.close()
+            if self.job_store is not None:
+                self.job_store.close()
 
     def run(self):
         """Запуск бота."""
         logger.info("=" * 50)
         logger.info("Запуск Telegram GigaAM бота")
         logger.info(f"Модель: {Config.GIGAAM_MODEL}")
-        logger.info(f"Устройство: {Config.get_device()}")
+        if Config.PROCESSING_MODE == "local":
+            logger.info(f"Устройство: {Config.GIGAAM_DEVICE}")
+        else:
+            logger.info(f"Распознавание: воркеры через {Config.BROKER_URL}")
         logger.info(f"Лог-директория: {Config.LOG_DIR}")
         logger.info(f"Временная директория: {Config.TEMP_DIR}")
+        logger.info(f"Промежуточные файлы: {Config.SCRATCH_BACKEND} ({Config.get_scratch_dir()})")
+        logger.info(f"Режим получения обновлений: {Config.BOT_MODE}")
         logger.info("=" * 50)
 
         self.setup_signal_handlers()
 
-        # Регистрируем post_init хук
-        self.application.post_init = self._post_init
-
         try:
-            # Запускаем бота
-            self.application.run_polling(
-                allowed_updates=Update.ALL_TYPES,
-                drop_pending_updates=True
-            )
+            asyncio.run(self._run())
         except KeyboardInterrupt:
             logger.info("Бот остановлен пользователем")
         except Exception as e:
             logger.error(f"Критическая ошибка: {e}", exc_info=True)
             raise
-        finally:
-            asyncio.run(self.stop_cleanup_task())
     
     def stop(self):
         """Остановка бота."""
         logger.info("Остановка бота...")
-        self.application.stop_running()
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
 
 
 def main():
@@ -1,4 +1,6 @@
 from .audio import AudioInfo, TranscriptionResult
 from .transcribe import LongTranscriptionResult, Utterance
+from .job import MediaJob
+from .trace import JobTrace, TraceSpan, trace_span
 
-__all__ = ["AudioInfo", "TranscriptionResult", "LongTranscriptionResult", "Utterance"]
+__all__ = ["AudioInfo", "TranscriptionResult", "LongTranscriptionResult", "Utterance", "MediaJob", "JobTrace", "TraceSpan", "trace_span"]
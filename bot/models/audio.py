@@ -1,7 +1,10 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
+from .trace import JobTrace
+from .transcribe import Utterance
+
 
 @dataclass
 class AudioInfo:
@@ -31,6 +34,10 @@ class TranscriptionResult:
     model_name: str
     confidence: Optional[float] = None
     error: Optional[str] = None
+    # Тексты частей с таймкодами (для длинного аудио, распознанного по частям)
+    segments: Optional[List[Utterance]] = None
+    # Этапы обработки задачи (скачивание, конвертация, распознавание...)
+    trace: Optional[JobTrace] = None
     
     @property
     def is_success(self) -> bool:
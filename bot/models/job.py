@@ -0,0 +1,43 @@
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class MediaJob:
+    """Задача на распознавание одного медиафайла из Telegram."""
+    job_id: str
+    kind: str
+    label: str
+    chat_id: int
+    user_id: int
+    message_id: int
+    file_id: str
+    file_name: Optional[str] = None
+    file_size: Optional[int] = None
+    duration: Optional[float] = None
+    is_video: bool = False
+    extension: Optional[str] = None
+    status_message_id: Optional[int] = None
+    # Локальный файл (CLI): не скачивается и не удаляется после конвертации
+    source_path: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+
+    @staticmethod
+    def new_id(user_id: int, message_id: int) -> str:
+        """Генерация уникального идентификатора задачи."""
+        return f"{user_id}_{message_id}_{os.urandom(3).hex()}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализация в словарь (для журнала задач)."""
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MediaJob":
+        """Восстановление задачи из словаря."""
+        data = dict(data)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
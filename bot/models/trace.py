@@ -0,0 +1,128 @@
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass
+class TraceSpan:
+    """Один этап обработки задачи."""
+    stage: str
+    # Секунды от начала трассировки
+    start: float
+    end: float
+    bytes: Optional[int] = None
+    audio_sec: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        """Длительность этапа в секундах."""
+        return self.end - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализация для лога."""
+        data = {
+            "stage": self.stage,
+            "start": round(self.start, 4),
+            "end": round(self.end, 4),
+            "duration": round(self.duration, 4),
+        }
+        if self.bytes is not None:
+            data["bytes"] = self.bytes
+        if self.audio_sec is not None:
+            data["audio_sec"] = round(self.audio_sec, 3)
+        return data
+
+
+@dataclass
+class JobTrace:
+    """
+    Трассировка задачи: этапы с временем начала и конца.
+
+    Заполняется сервисами по мере обработки и прикрепляется к результату.
+    """
+    job_id: str
+    started_at: float = field(default_factory=time.perf_counter)
+    spans: List[TraceSpan] = field(default_factory=list)
+
+    def _now(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @contextmanager
+    def span(
+        self,
+        stage: str,
+        bytes: Optional[int] = None,
+        audio_sec: Optional[float] = None
+    ) -> Iterator[TraceSpan]:
+        """
+        Этап на время блока ``with``.
+
+        Объём данных можно дописать в этап внутри блока, когда он станет известен.
+
+        Args:
+            stage: Название этапа
+            bytes: Объём обработанных данных
+            audio_sec: Длительность обработанного аудио
+        """
+        span = TraceSpan(stage, self._now(), self._now(), bytes, audio_sec)
+        try:
+            yield span
+        finally:
+            span.end = self._now()
+            self.spans.append(span)
+
+    def record(
+        self,
+        stage: str,
+        started: float,
+        ended: float,
+        bytes: Optional[int] = None,
+        audio_sec: Optional[float] = None
+    ) -> None:
+        """
+        Этап по отметкам ``time.perf_counter()``, снятым вызывающим кодом.
+
+        Args:
+            stage: Название этапа
+            started: Начало этапа
+            ended: Конец этапа
+            bytes: Объём обработанных данных
+            audio_sec: Длительность обработанного аудио
+        """
+        self.spans.append(TraceSpan(
+            stage, started - self.started_at, ended - self.started_at, bytes, audio_sec
+        ))
+
+    @property
+    def total_sec(self) -> float:
+        """Время от начала трассировки до конца последнего этапа."""
+        return max((span.end for span in self.spans), default=0.0)
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Суммарное время по этапам (повторные попытки складываются)."""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span.stage] = totals.get(span.stage, 0.0) + span.duration
+        return {stage: round(total, 4) for stage, total in totals.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализация для лога."""
+        return {
+            "job_id": self.job_id,
+            "total_sec": round(self.total_sec, 4),
+            "stages": self.stage_totals(),
+            "spans": [span.to_dict() for span in sorted(self.spans, key=lambda s: s.start)],
+        }
+
+
+def trace_span(
+    trace: Optional[JobTrace],
+    stage: str,
+    bytes: Optional[int] = None,
+    audio_sec: Optional[float] = None
+):
+    """Этап трассировки или пустой контекст, если трассировка не ведётся."""
+    if trace is None:
+        return nullcontext(TraceSpan(stage, 0.0, 0.0, bytes, audio_sec))
+    return trace.span(stage, bytes, audio_sec)
@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from .trace import JobTrace
 
 
 @dataclass
@@ -19,6 +21,8 @@ class LongTranscriptionResult:
     utterances: List[Utterance]
     total_duration: float
     full_text: str
+    # Этапы обработки задачи (скачивание, конвертация, распознавание...)
+    trace: Optional[JobTrace] = None
     
     @classmethod
     def from_dict(cls, data: List[Dict[str, Any]]) -> "LongTranscriptionResult":
@@ -0,0 +1,8 @@
+from .http import HttpServer
+from .webhook import WebhookIngress
+from .broker import BrokerEndpoint
+from .transcription_api import TranscriptionApi
+from .metrics import MetricsEndpoint
+from .health import HealthEndpoint
+
+__all__ = ["HttpServer", "WebhookIngress", "BrokerEndpoint", "TranscriptionApi", "MetricsEndpoint", "HealthEndpoint"]
@@ -0,0 +1,75 @@
+import json
+import logging
+
+from aiohttp import web
+
+from bot.services.broker_service import WorkerBroker
+from .http import HttpServer, secret_matches
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerEndpoint:
+    """
+    HTTP-доступ к брокеру задач для воркеров на других машинах.
+
+    Проксирует операции воркера (claim, heartbeat, complete) в локальный
+    брокер фронтенда. Запросы без верного токена отклоняются.
+    """
+
+    def __init__(self, broker: WorkerBroker, path: str = "/broker", token: str = ""):
+        self.broker = broker
+        self.path = path.rstrip("/")
+        self.token = token
+
+    def register(self, server: HttpServer) -> None:
+        """Регистрация маршрутов брокера на HTTP-сервере."""
+        server.add_route("POST", f"{self.path}/claim", self.claim)
+        server.add_route("POST", f"{self.path}/heartbeat", self.heartbeat)
+        server.add_route("POST", f"{self.path}/complete", self.complete)
+
+    async def claim(self, request: web.Request) -> web.Response:
+        """Выдача задачи воркеру."""
+        data = await self._read(request, "worker_id")
+        job = await self.broker.claim(data["worker_id"])
+        return web.json_response({"job": job.to_dict() if job else None})
+
+    async def heartbeat(self, request: web.Request) -> web.Response:
+        """Продление аренды задачи."""
+        data = await self._read(request, "job_id", "worker_id")
+        ok = await self.broker.heartbeat(data["job_id"], data["worker_id"])
+        return web.json_response({"ok": ok})
+
+    async def complete(self, request: web.Request) -> web.Response:
+        """Приём итога задачи."""
+        data = await self._read(request, "job_id", "worker_id", "state", "text")
+        ok = await self.broker.complete(data["job_id"], data["worker_id"], data["state"], data["text"])
+        return web.json_response({"ok": ok})
+
+    async def _read(self, request: web.Request, *fields: str) -> dict:
+        """
+        Проверка токена и разбор тела запроса.
+
+        Args:
+            request: Запрос
+            *fields: Обязательные строковые поля тела
+
+        Raises:
+            web.HTTPForbidden: Неверный токен
+            web.HTTPBadRequest: Тело не JSON-объект или нет обязательного поля
+        """
+        received = request.headers.get("Authorization", "")
+        if not self.token or not secret_matches(received, f"Bearer {self.token}"):
+            logger.warning(f"Брокер: неверный токен от {request.remote}")
+            raise web.HTTPForbidden(text="forbidden")
+
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="bad request")
+        if not isinstance(data, dict):
+            raise web.HTTPBadRequest(text="bad request")
+        for field in fields:
+            if not isinstance(data.get(field), str):
+                raise web.HTTPBadRequest(text=f"bad request: {field}")
+        return data
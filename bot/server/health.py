@@ -0,0 +1,58 @@
+import time
+from typing import Callable, Dict
+import logging
+
+from aiohttp import web
+
+from .http import HttpServer
+
+logger = logging.getLogger(__name__)
+
+ReadinessCheck = Callable[[], Dict[str, bool]]
+
+
+class HealthEndpoint:
+    """
+    Проверки для супервизора процессов.
+
+    ``GET /healthz`` (liveness) отвечает 200, пока event loop жив.
+    ``GET /readyz`` (readiness) отвечает 200, только когда все проверки
+    ``ready_check`` пройдены (модель загружена и прогрета), иначе 503.
+    """
+
+    def __init__(
+        self,
+        ready_check: ReadinessCheck,
+        live_path: str = "/healthz",
+        ready_path: str = "/readyz"
+    ):
+        self.ready_check = ready_check
+        self.live_path = live_path
+        self.ready_path = ready_path
+        self.started_at = time.monotonic()
+
+    def register(self, server: HttpServer) -> None:
+        """Регистрация маршрутов на HTTP-сервере."""
+        server.add_route("GET", self.live_path, self.live)
+        server.add_route("GET", self.ready_path, self.ready)
+
+    async def live(self, request: web.Request) -> web.Response:
+        """Процесс жив и обрабатывает запросы."""
+        return web.json_response({
+            "status": "ok",
+            "uptime_sec": round(time.monotonic() - self.started_at, 1),
+        })
+
+    async def ready(self, request: web.Request) -> web.Response:
+        """Процесс готов принимать задачи."""
+        try:
+            checks = self.ready_check()
+        except Exception as e:
+            logger.error(f"Ошибка проверки готовности: {e}")
+            return web.json_response({"status": "error", "error": str(e)}, status=503)
+
+        ready = all(checks.values())
+        return web.json_response(
+            {"status": "ready" if ready else "not_ready", "checks": checks},
+            status=200 if ready else 503
+        )
@@ -0,0 +1,70 @@
+import hmac
+from typing import Awaitable, Callable, Optional
+import logging
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+RouteHandler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+def secret_matches(received: str, expected: str) -> bool:
+    """
+    Сравнение секрета из заголовка за постоянное время.
+
+    ``hmac.compare_digest`` принимает строки только из ASCII, поэтому
+    сравниваются байты: заголовок с другими символами - просто неверный
+    секрет, а не ошибка сервера.
+    """
+    return hmac.compare_digest(
+        received.encode("utf-8", "surrogatepass"),
+        expected.encode("utf-8", "surrogatepass")
+    )
+
+
+class HttpServer:
+    """
+    Встроенный асинхронный HTTP-сервер (aiohttp).
+
+    Работает в том же event loop, что и бот. Компоненты (webhook,
+    служебные эндпоинты) регистрируют свои маршруты до запуска.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, client_max_size_mb: int = 1):
+        self.host = host
+        self.port = port
+        self.app = web.Application(client_max_size=client_max_size_mb * 1024 * 1024)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def has_routes(self) -> bool:
+        """Зарегистрирован ли хотя бы один маршрут."""
+        return len(self.app.router.routes()) > 0
+
+    def add_route(self, method: str, path: str, handler: RouteHandler) -> None:
+        """
+        Регистрация маршрута.
+
+        Args:
+            method: HTTP-метод
+            path: Путь
+            handler: Обработчик запроса
+        """
+        self.app.router.add_route(method, path, handler)
+        logger.debug(f"HTTP-маршрут: {method} {path}")
+
+    async def start(self) -> None:
+        """Запуск сервера."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info(f"HTTP-сервер запущен: http://{self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """Остановка сервера."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            logger.info("HTTP-сервер остановлен")
@@ -0,0 +1,27 @@
+import logging
+
+from aiohttp import web
+
+from bot.utils.metrics import MetricsRegistry
+from .http import HttpServer
+
+logger = logging.getLogger(__name__)
+
+# Content-Type текстового формата Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsEndpoint:
+    """Метрики процесса в текстовом формате Prometheus."""
+
+    def __init__(self, registry: MetricsRegistry, path: str = "/metrics"):
+        self.registry = registry
+        self.path = path
+
+    def register(self, server: HttpServer) -> None:
+        """Регистрация маршрута на HTTP-сервере."""
+        server.add_route("GET", self.path, self.metrics)
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        """Текущие значения всех метрик."""
+        return web.Response(body=self.registry.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
@@ -0,0 +1,236 @@
+import asyncio
+import itertools
+import json
+from pathlib import Path
+from typing import Optional, Set
+import logging
+
+from aiohttp import web
+
+from bot.models import MediaJob, TranscriptionResult, Utterance
+from bot.services.pipeline_service import MediaPipeline, StageBusyError, result_segments, result_text
+from bot.services.workspace_service import DiskBudgetExceededError
+from bot.utils import format_srt, format_vtt, log_context
+from bot.utils.metrics import JOBS_TOTAL
+from bot.utils.validators import validate_audio_format, validate_video_format
+from .http import HttpServer, secret_matches
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_FORMATS = ("json", "text", "srt", "vtt", "verbose_json")
+
+# Размер порции при чтении загружаемого файла
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class TranscriptionApi:
+    """
+    HTTP API распознавания в формате OpenAI ``/v1/audio/transcriptions``.
+
+    Принимает multipart с полем ``file`` и обрабатывает его тем же
+    конвейером и той же моделью, что и бот: задачи API и Telegram делят
+    общие лимиты стадий. Загрузка файла место в конвейере не занимает:
+    в стадию admit запрос входит только после неё. С ``stream=true``
+    текст отдаётся потоком событий (SSE) по мере распознавания частей
+    длинной записи.
+    """
+
+    def __init__(
+        self,
+        pipeline: MediaPipeline,
+        path: str = "/v1/audio/transcriptions",
+        token: str = "",
+        max_upload_mb: int = 100
+    ):
+        self.pipeline = pipeline
+        self.path = path
+        self.token = token
+        self.max_upload_bytes = max_upload_mb * 1024 * 1024
+        self._counter = itertools.count(1)
+
+    def register(self, server: HttpServer) -> None:
+        """Регистрация маршрута на HTTP-сервере."""
+        server.add_route("POST", self.path, self.transcriptions)
+
+    async def transcriptions(self, request: web.Request) -> web.StreamResponse:
+        """Распознавание загруженного файла."""
+        if self.token:
+            received = request.headers.get("Authorization", "")
+            if not secret_matches(received, f"Bearer {self.token}"):
+                return _error(401, "Неверный токен", "authentication_error")
+
+        if request.content_length and request.content_length > self.max_upload_bytes:
+            return _error(413, "Файл слишком большой")
+
+        request_id = next(self._counter)
+        workspaces = self.pipeline.file_service.workspaces
+        upload_id = MediaJob.new_id(0, request_id)
+        try:
+            with log_context(upload_id):
+                async with workspaces.job(f"{upload_id}_upload", request.content_length or 0) as upload:
+                    fields, file_path = await self._read_form(request, upload.path)
+                    if file_path is None:
+                        return _error(400, "Не передан файл (поле file)")
+
+                    response_format = fields.get("response_format", "json")
+                    if response_format not in RESPONSE_FORMATS:
+                        return _error(400, f"Неподдерживаемый response_format: {response_format}")
+
+                    is_video = validate_video_format(file_path)
+                    if not is_video and not validate_audio_format(file_path):
+                        return _error(400, "Неподдерживаемый формат файла")
+
+                    job = MediaJob(
+                        job_id=upload_id,
+                        kind="api",
+                        label="видеофайл" if is_video else "аудиофайл",
+                        chat_id=0,
+                        user_id=0,
+                        message_id=request_id,
+                        file_id=file_path.name,
+                        file_name=file_path.name,
+                        file_size=file_path.stat().st_size,
+                        is_video=is_video,
+                        source_path=str(file_path)
+                    )
+
+                    async with self.pipeline.admission(upload_id):
+                        if fields.get("stream", "").lower() == "true":
+                            return await self._stream(request, job)
+                        return await self._respond(job, response_format)
+
+        except StageBusyError:
+            JOBS_TOTAL.labels(kind="api", outcome="rejected").inc()
+            return _error(503, "Сервер перегружен, попробуйте позже", headers={"Retry-After": "5"})
+        except DiskBudgetExceededError as e:
+            return _error(503, str(e), headers={"Retry-After": "30"})
+        except _UploadTooLarge:
+            return _error(413, "Файл слишком большой")
+
+    async def _read_form(self, request: web.Request, directory: Path):
+        """Чтение multipart: текстовые поля и файл (потоково, на диск)."""
+        fields = {}
+        file_path: Optional[Path] = None
+
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == "file":
+                suffix = Path(part.filename or "").suffix.lower() or ".bin"
+                file_path = directory / f"upload{suffix}"
+                size = 0
+                # Запись на диск в потоке: медленный диск не держит цикл событий
+                f = await asyncio.to_thread(open, file_path, "wb")
+                try:
+                    while True:
+                        chunk = await part.read_chunk(UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        size += len(chunk)
+                        if size > self.max_upload_bytes:
+                            raise _UploadTooLarge()
+                        await asyncio.to_thread(f.write, chunk)
+                finally:
+                    await asyncio.to_thread(f.close)
+            elif part.name:
+                fields[part.name] = (await part.text()).strip()
+
+        return fields, file_path
+
+    async def _respond(self, job: MediaJob, response_format: str) -> web.Response:
+        """Обычный ответ после распознавания всего файла."""
+        try:
+            result = await self.pipeline.execute(job)
+        except DiskBudgetExceededError:
+            raise
+        except Exception as e:
+            logger.error(f"API: ошибка обработки {job.job_id}: {e}", exc_info=True)
+            JOBS_TOTAL.labels(kind=job.kind, outcome="failed").inc()
+            return _error(500, str(e), "server_error")
+
+        if isinstance(result, TranscriptionResult) and not result.is_success:
+            JOBS_TOTAL.labels(kind=job.kind, outcome="failed").inc()
+            return _error(500, result.error, "server_error")
+        JOBS_TOTAL.labels(kind=job.kind, outcome="done").inc()
+
+        duration = job.duration or 0.0
+        text = result_text(result)
+        segments = result_segments(result, duration)
+
+        if response_format == "text":
+            return web.Response(text=text)
+        if response_format == "srt":
+            return web.Response(text=format_srt(segments), content_type="application/x-subrip")
+        if response_format == "vtt":
+            return web.Response(text=format_vtt(segments), content_type="text/vtt")
+        if response_format == "verbose_json":
+            return web.json_response({
+                "task": "transcribe",
+                "language": "russian",
+                "duration": round(duration, 3),
+                "text": text,
+                "segments": [
+                    {"id": i, "start": s.start_time, "end": s.end_time, "text": s.text}
+                    for i, s in enumerate(segments)
+                ],
+            })
+        return web.json_response({"text": text})
+
+    async def _stream(self, request: web.Request, job: MediaJob) -> web.StreamResponse:
+        """Потоковый ответ (SSE): части текста по мере распознавания."""
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        })
+        await response.prepare(request)
+
+        sent: Set[float] = set()
+
+        async def on_segment(segment: Utterance) -> None:
+            # При повторной попытке уже отправленные части приходят снова
+            if segment.start_time in sent:
+                return
+            sent.add(segment.start_time)
+            await _send_event(response, {"type": "transcript.text.delta", "delta": segment.text + " "})
+
+        try:
+            result = await self.pipeline.execute(job, on_segment=on_segment)
+            if isinstance(result, TranscriptionResult) and not result.is_success:
+                raise RuntimeError(result.error)
+
+            text = result_text(result)
+            if not sent and text:
+                await _send_event(response, {"type": "transcript.text.delta", "delta": text})
+            await _send_event(response, {"type": "transcript.text.done", "text": text})
+            JOBS_TOTAL.labels(kind=job.kind, outcome="done").inc()
+        except (ConnectionResetError, web.HTTPException):
+            raise
+        except Exception as e:
+            logger.error(f"API: ошибка обработки {job.job_id}: {e}", exc_info=True)
+            JOBS_TOTAL.labels(kind=job.kind, outcome="failed").inc()
+            await _send_event(response, {"type": "error", "error": {"message": str(e)}})
+
+        await response.write_eof()
+        return response
+
+
+class _UploadTooLarge(Exception):
+    """Загружаемый файл превысил лимит."""
+
+
+async def _send_event(response: web.StreamResponse, data: dict) -> None:
+    """Отправка одного события SSE."""
+    await response.write(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+
+def _error(
+    status: int,
+    message: str,
+    error_type: str = "invalid_request_error",
+    headers: Optional[dict] = None
+) -> web.Response:
+    """Ответ с ошибкой в формате OpenAI API."""
+    return web.json_response(
+        {"error": {"message": message, "type": error_type}},
+        status=status,
+        headers=headers
+    )
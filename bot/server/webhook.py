@@ -0,0 +1,52 @@
+import json
+from typing import Optional
+import logging
+
+from aiohttp import web
+from telegram import Update
+
+from .http import HttpServer, secret_matches
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookIngress:
+    """
+    Приём обновлений Telegram через webhook.
+
+    Тело POST-запроса разбирается в Update и кладётся в очередь
+    обновлений приложения — дальше оно обрабатывается так же, как при
+    long polling.
+    """
+
+    def __init__(self, application, path: str, secret_token: Optional[str] = None):
+        self.application = application
+        self.path = path
+        self.secret_token = secret_token
+
+    def register(self, server: HttpServer) -> None:
+        """Регистрация маршрута webhook на HTTP-сервере."""
+        server.add_route("POST", self.path, self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Обработка входящего обновления."""
+        if self.secret_token:
+            received = request.headers.get(SECRET_HEADER, "")
+            if not secret_matches(received, self.secret_token):
+                logger.warning(f"Webhook: неверный секретный токен от {request.remote}")
+                return web.Response(status=403, text="forbidden")
+
+        try:
+            data = await request.json()
+            update = Update.de_json(data, self.application.bot)
+        except (json.JSONDecodeError, TypeError, ValueError, KeyError) as e:
+            logger.warning(f"Webhook: некорректное обновление: {e}")
+            return web.Response(status=400, text="bad update")
+
+        if update is None:
+            return web.Response(status=400, text="bad update")
+
+        await self.application.update_queue.put(update)
+        return web.Response(text="ok")
@@ -1,5 +1,60 @@
+from .workspace_service import WorkspaceManager, JobWorkspace, DiskBudgetExceededError
 from .file_service import FileService
 from .audio_service import AudioService
+from .model_cache_service import ModelCache
+from .asr_backend_service import (
+    AsrBackend,
+    BackendCapabilities,
+    GigaAMTorchBackend,
+    OnnxBackend,
+    create_backend,
+)
 from .transcribe_service import TranscribeService
+from .delivery_service import DeliveryService, RateLimiter
+from .job_store_service import JobStore
+from .broker_service import (
+    Broker,
+    WorkerBroker,
+    FrontendBroker,
+    SQLiteBroker,
+    HttpBroker,
+    create_broker,
+    create_local_broker,
+)
+from .pipeline_service import MediaPipeline, Stage, StageBusyError
+from .memory_service import MemoryMonitor, MemoryPressureError
+from .profiler_service import StackProfiler, TorchProfiler, ProfileReport, ProfilerBusyError
 
-__all__ = ["FileService", "AudioService", "TranscribeService"]
+__all__ = [
+    "WorkspaceManager",
+    "JobWorkspace",
+    "DiskBudgetExceededError",
+    "FileService",
+    "AudioService",
+    "ModelCache",
+    "AsrBackend",
+    "BackendCapabilities",
+    "GigaAMTorchBackend",
+    "OnnxBackend",
+    "create_backend",
+    "TranscribeService",
+    "DeliveryService",
+    "RateLimiter",
+    "JobStore",
+    "Broker",
+    "WorkerBroker",
+    "FrontendBroker",
+    "SQLiteBroker",
+    "HttpBroker",
+    "create_broker",
+    "create_local_broker",
+    "MediaPipeline",
+    "Stage",
+    "StageBusyError",
+    "MemoryMonitor",
+    "MemoryPressureError",
+    "StackProfiler",
+    "TorchProfiler",
+    "ProfileReport",
+    "ProfilerBusyError",
+]
@@ -0,0 +1,299 @@
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+import logging
+
+from bot.services.model_cache_service import ModelCache
+
+logger = logging.getLogger(__name__)
+
+# Частота дискретизации, с которой работают модели GigaAM
+SAMPLE_RATE = 16000
+# Максимальная длительность записи для одного вызова модели (как в gigaam)
+MAX_SHORT_AUDIO_SEC = 25
+
+
+@dataclass(frozen=True)
+class BackendCapabilities:
+    """Возможности движка распознавания."""
+    name: str
+    # Устройства, на которых работает движок
+    devices: Tuple[str, ...]
+    # Распознаёт несколько записей за один вызов модели
+    batch: bool
+    # Поддерживает transcribe_longform (VAD-сегментация)
+    longform: bool
+    # Максимальная длительность записи для transcribe
+    max_audio_sec: float = MAX_SHORT_AUDIO_SEC
+
+
+def resolve_device(device: str) -> str:
+    """Определение устройства для "auto"."""
+    if device == "auto":
+        import torch
+
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    return device
+
+
+def load_torch_model(model_name: str, device: str, model_cache: Optional[ModelCache] = None, **kwargs):
+    """
+    Загрузка модели GigaAM (из кэша, если он задан).
+
+    Args:
+        model_name: Имя модели GigaAM
+        device: Устройство
+        model_cache: Локальный кэш собранной модели
+        **kwargs: Дополнительные аргументы gigaam.load_model
+
+    Returns:
+        Модель GigaAM
+    """
+    import gigaam
+
+    model = None
+    if model_cache is not None:
+        # Параметры сборки входят в ключ кэша: модель с другими параметрами - другой файл
+        model = model_cache.load(model_name, device, options=kwargs)
+    if model is None:
+        logger.info(f"Загрузка модели GigaAM: {model_name} на {device}")
+        model = gigaam.load_model(model_name, device=device, **kwargs)
+        if model_cache is not None:
+            model_cache.save(model, model_name, device, options=kwargs)
+    return model
+
+
+def _pad_batch(waveforms: Sequence[Any], device: Any = "cpu", dtype: Any = None):
+    """Записи разной длины в один тензор [B, T] с нулями в конце и длинами [B]."""
+    import torch
+
+    lengths = torch.tensor([waveform.shape[-1] for waveform in waveforms], device=device)
+    batch = torch.zeros(len(waveforms), int(lengths.max()), device=device, dtype=dtype)
+    for index, waveform in enumerate(waveforms):
+        batch[index, :waveform.shape[-1]] = waveform
+    return batch, lengths
+
+
+def _check_length(waveforms: Sequence[Any], max_audio_sec: float) -> None:
+    for waveform in waveforms:
+        if waveform.shape[-1] > max_audio_sec * SAMPLE_RATE:
+            # Текст как у gigaam: TranscribeService по нему разбивает запись на части
+            raise ValueError("Too long wav file, use 'transcribe_longform' method.")
+
+
+class AsrBackend(ABC):
+    """
+    Движок распознавания речи.
+
+    ``load`` и все вызовы распознавания блокирующие: TranscribeService
+    выполняет их в пуле потоков. Записи - одномерные тензоры float32
+    с частотой 16 кГц (как возвращает ``gigaam.load_audio``).
+    """
+
+    def __init__(self, model_name: str, device: str = "auto"):
+        self.model_name = model_name
+        self.device = device
+
+    @property
+    @abstractmethod
+    def capabilities(self) -> BackendCapabilities:
+        """Возможности движка."""
+
+    @abstractmethod
+    def load(self) -> None:
+        """Загрузка модели; после неё ``device`` - конкретное устройство."""
+
+    @abstractmethod
+    def transcribe_batch(self, waveforms: Sequence[Any]) -> List[str]:
+        """
+        Распознавание нескольких записей.
+
+        Args:
+            waveforms: Записи 16 кГц не длиннее capabilities.max_audio_sec
+
+        Returns:
+            Тексты в порядке записей
+        """
+
+    def transcribe(self, audio_path: str) -> str:
+        """Распознавание одного файла."""
+        import gigaam
+
+        return self.transcribe_batch([gigaam.load_audio(audio_path)])[0]
+
+    def transcribe_files(self, audio_paths: Sequence[str]) -> List[str]:
+        """Распознавание нескольких файлов одним вызовом модели."""
+        import gigaam
+
+        return self.transcribe_batch([gigaam.load_audio(audio_path) for audio_path in audio_paths])
+
+    def transcribe_longform(self, audio_path: str) -> List[dict]:
+        """Распознавание длинной записи с VAD-сегментацией."""
+        raise NotImplementedError(f"Движок {self.capabilities.name} не поддерживает transcribe_longform")
+
+
+class GigaAMTorchBackend(AsrBackend):
+    """Модель GigaAM на PyTorch (CPU или CUDA)."""
+
+    def __init__(self, model_name: str, device: str = "auto", model_cache: Optional[ModelCache] = None):
+        super().__init__(model_name, device)
+        self.model_cache = model_cache
+        self.model = None
+
+    @property
+    def capabilities(self) -> BackendCapabilities:
+        return BackendCapabilities(name="torch", devices=("cpu", "cuda"), batch=True, longform=True)
+
+    def load(self) -> None:
+        self.device = resolve_device(self.device)
+        self.model = load_torch_model(self.model_name, self.device, self.model_cache)
+
+    def transcribe(self, audio_path: str) -> str:
+        # Собственный метод модели: чтение файла и проверка длины внутри gigaam
+        return self.model.transcribe(audio_path)
+
+    def transcribe_longform(self, audio_path: str) -> List[dict]:
+        return self.model.transcribe_longform(audio_path)
+
+    def transcribe_batch(self, waveforms: Sequence[Any]) -> List[str]:
+        import torch
+
+        _check_length(waveforms, self.capabilities.max_audio_sec)
+        parameter = next(self.model.parameters())
+        with torch.inference_mode():
+            batch, lengths = _pad_batch(waveforms, parameter.device, parameter.dtype)
+            encoded, encoded_len = self.model.forward(batch, lengths)
+            return self.model.decoding.decode(self.model.head, encoded, encoded_len)
+
+
+class OnnxBackend(AsrBackend):
+    """
+    Энкодер GigaAM в ONNX Runtime на CPU.
+
+    Основное время распознавания занимает conformer-энкодер: он
+    экспортируется в ONNX (один раз, в ``onnx_dir``) и выполняется
+    ONNX Runtime с оптимизацией графа. Извлечение мел-признаков и
+    декодирование (CTC или RNN-T) выполняет сама модель GigaAM, поэтому
+    поддерживаются все ASR-модели GigaAM; веса энкодера PyTorch после
+    загрузки освобождаются.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        onnx_dir: Path,
+        threads: int = 0,
+        model_cache: Optional[ModelCache] = None
+    ):
+        super().__init__(model_name, "cpu")
+        self.onnx_dir = onnx_dir
+        self.threads = threads
+        self.model_cache = model_cache
+        self.model = None
+        self.session = None
+
+    @property
+    def capabilities(self) -> BackendCapabilities:
+        return BackendCapabilities(name="onnx", devices=("cpu",), batch=True, longform=False)
+
+    @property
+    def encoder_path(self) -> Path:
+        return self.onnx_dir / f"{self.model_name}_encoder.onnx"
+
+    def load(self) -> None:
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("Для ASR_BACKEND=onnx установите onnxruntime: pip install onnxruntime")
+
+        model = load_torch_model(self.model_name, "cpu", self.model_cache, fp16_encoder=False)
+        if not self.encoder_path.exists():
+            self._export(model)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads > 0:
+            options.intra_op_num_threads = self.threads
+        self.session = onnxruntime.InferenceSession(
+            str(self.encoder_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        # Энкодер выполняет ONNX Runtime: веса PyTorch не нужны
+        del model.encoder
+        self.model = model
+        logger.info(f"Энкодер ONNX загружен: {self.encoder_path}")
+
+    def _export(self, model) -> None:
+        """Экспорт энкодера в ONNX (временный файл переименовывается после записи)."""
+        import torch
+
+        logger.info(f"Экспорт энкодера {self.model_name} в ONNX: {self.encoder_path}")
+        self.onnx_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.encoder_path.with_name(f".{self.encoder_path.name}.{os.getpid()}.tmp")
+        with torch.inference_mode():
+            features, lengths = model.preprocessor(torch.zeros(1, SAMPLE_RATE), torch.tensor([SAMPLE_RATE]))
+        try:
+            torch.onnx.export(
+                model.encoder,
+                (features, lengths),
+                str(tmp_path),
+                input_names=["features", "feature_lengths"],
+                output_names=["encoded", "encoded_len"],
+                dynamic_axes={
+                    "features": {0: "batch_size", 2: "seq_len"},
+                    "feature_lengths": {0: "batch_size"},
+                    "encoded": {0: "batch_size", 2: "seq_len"},
+                    "encoded_len": {0: "batch_size"},
+                },
+                opset_version=17,
+            )
+            os.replace(tmp_path, self.encoder_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def transcribe_batch(self, waveforms: Sequence[Any]) -> List[str]:
+        import torch
+
+        _check_length(waveforms, self.capabilities.max_audio_sec)
+        with torch.inference_mode():
+            batch, lengths = _pad_batch(waveforms, dtype=torch.float32)
+            features, feature_lengths = self.model.preprocessor(batch, lengths)
+            encoded, encoded_len = self.session.run(
+                None,
+                {"features": features.numpy(), "feature_lengths": feature_lengths.numpy()}
+            )
+            return self.model.decoding.decode(
+                self.model.head, torch.from_numpy(encoded), torch.from_numpy(encoded_len)
+            )
+
+
+def create_backend(
+    name: str,
+    model_name: str,
+    device: str = "auto",
+    model_cache: Optional[ModelCache] = None,
+    onnx_dir: Optional[Path] = None,
+    onnx_threads: int = 0
+) -> AsrBackend:
+    """
+    Создание движка распознавания по имени.
+
+    Args:
+        name: ``torch`` или ``onnx``
+        model_name: Имя модели GigaAM
+        device: Устройство (для onnx всегда CPU)
+        model_cache: Локальный кэш собранной модели
+        onnx_dir: Директория экспортированных графов ONNX
+        onnx_threads: Потоков ONNX Runtime (0 - по числу ядер)
+
+    Returns:
+        Движок (ещё не загруженный)
+    """
+    if name == "torch":
+        return GigaAMTorchBackend(model_name, device, model_cache=model_cache)
+    if name == "onnx":
+        if onnx_dir is None:
+            raise ValueError("Для движка onnx нужна директория графов ONNX")
+        return OnnxBackend(model_name, onnx_dir, threads=onnx_threads, model_cache=model_cache)
+    raise ValueError(f"Неизвестный движок распознавания: {name}")
@@ -1,9 +1,11 @@
 import asyncio
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 import logging
 
+from bot.models.trace import JobTrace, trace_span
 from .file_service import FileService
+from .workspace_service import JobWorkspace
 from ..utils import convert_audio, get_audio_duration, extract_audio_from_video
 from ..utils.validators import validate_file_size, validate_audio_format, validate_video_format
 
@@ -22,7 +24,8 @@ class AudioService:
         self,
         voice_file: bytes,
         user_id: int,
-        message_id: int
+        message_id: int,
+        workspace: Optional[JobWorkspace] = None
     ) -> Tuple[Path, float]:
         """
         Подготовка голосового сообщения для транскрибации.
@@ -31,6 +34,7 @@ class AudioService:
             voice_file: Байты голосового сообщения
             user_id: ID пользователя
             message_id: ID сообщения
+            workspace: Рабочая директория задачи (если None - общая временная)
 
         Returns:
             Кортеж (путь к WAV файлу, длительность)
@@ -38,7 +42,7 @@ class AudioService:
         from datetime import datetime
 
         # Сохраняем исходный файл
-        ogg_path = self.file_service.generate_temp_path(prefix=f"voice_{user_id}", extension="ogg")
+        ogg_path = self._paths(workspace).generate_temp_path(prefix=f"voice_{user_id}", extension="ogg")
         await self.file_service.save_bytes(voice_file, ogg_path)
 
         try:
@@ -49,7 +53,7 @@ class AudioService:
                 )
 
             # Конвертируем в WAV
-            wav_path = self.file_service.generate_temp_path(prefix=f"audio_{user_id}", extension="wav")
+            wav_path = self._paths(workspace).generate_temp_path(prefix=f"audio_{user_id}", extension="wav")
             await convert_audio(ogg_path, wav_path, sample_rate=16000, channels=1)
 
             # Получаем длительность
@@ -69,7 +73,10 @@ class AudioService:
         self,
         audio_file_path: Path,
         user_id: int,
-        message_id: int
+        message_id: int,
+        workspace: Optional[JobWorkspace] = None,
+        keep_source: bool = False,
+        trace: Optional[JobTrace] = None
     ) -> Tuple[Path, float]:
         """
         Подготовка аудиофайла для транскрибации.
@@ -78,6 +85,9 @@ class AudioService:
             audio_file_path: Путь к скачанному аудиофайлу
             user_id: ID пользователя
             message_id: ID сообщения
+            workspace: Рабочая директория задачи (если None - общая временная)
+            keep_source: Не удалять исходный файл (локальные файлы CLI)
+            trace: Трассировка задачи (этапы decode и probe)
 
         Returns:
             Кортеж (путь к WAV файлу, длительность)
@@ -94,11 +104,14 @@ class AudioService:
                 )
 
             # Конвертируем в WAV
-            wav_path = self.file_service.generate_temp_path(prefix=f"audio_{user_id}", extension="wav")
-            await convert_audio(audio_file_path, wav_path, sample_rate=16000, channels=1)
+            wav_path = self._paths(workspace).generate_temp_path(prefix=f"audio_{user_id}", extension="wav")
+            with trace_span(trace, "decode", bytes=audio_file_path.stat().st_size):
+                await convert_audio(audio_file_path, wav_path, sample_rate=16000, channels=1)
 
             # Получаем длительность
-            duration = await get_audio_duration(wav_path)
+            with trace_span(trace, "probe") as span:
+                duration = await get_audio_duration(wav_path)
+                span.audio_sec = duration
 
             logger.info(
                 f"Аудиофайл подготовлен: "
@@ -108,13 +121,17 @@ class AudioService:
             return wav_path, duration
         finally:
             # Гарантированно удаляем исходный файл
-            await self.file_service.delete_file(audio_file_path)
+            if not keep_source:
+                await self.file_service.delete_file(audio_file_path)
     
     async def prepare_video_note(
         self,
         video_file_path: Path,
         user_id: int,
-        message_id: int
+        message_id: int,
+        workspace: Optional[JobWorkspace] = None,
+        keep_source: bool = False,
+        trace: Optional[JobTrace] = None
     ) -> Tuple[Path, float]:
         """
         Подготовка видеосообщения для транскрибации.
@@ -123,6 +140,9 @@ class AudioService:
             video_file_path: Путь к скачанному видеофайлу
             user_id: ID пользователя
             message_id: ID сообщения
+            workspace: Рабочая директория задачи (если None - общая временная)
+            keep_source: Не удалять исходный файл (локальные файлы CLI)
+            trace: Трассировка задачи (этапы decode и probe)
 
         Returns:
             Кортеж (путь к WAV файлу, длительность)
@@ -139,11 +159,14 @@ class AudioService:
                 )
 
             # Извлекаем аудио и конвертируем в WAV
-            wav_path = self.file_service.generate_temp_path(prefix=f"audio_{user_id}", extension="wav")
-            await extract_audio_from_video(video_file_path, wav_path, sample_rate=16000, channels=1)
+            wav_path = self._paths(workspace).generate_temp_path(prefix=f"audio_{user_id}", extension="wav")
+            with trace_span(trace, "decode", bytes=video_file_path.stat().st_size):
+                await extract_audio_from_video(video_file_path, wav_path, sample_rate=16000, channels=1)
 
             # Получаем длительность
-            duration = await get_audio_duration(wav_path)
+            with trace_span(trace, "probe") as span:
+                duration = await get_audio_duration(wav_path)
+                span.audio_sec = duration
 
             logger.info(
                 f"Видеосообщение подготовлено: "
@@ -153,8 +176,13 @@ class AudioService:
             return wav_path, duration
         finally:
             # Гарантированно удаляем исходный видеофайл
-            await self.file_service.delete_file(video_file_path)
+            if not keep_source:
+                await self.file_service.delete_file(video_file_path)
     
+    def _paths(self, workspace: Optional[JobWorkspace]):
+        """Источник путей для промежуточных файлов."""
+        return workspace if workspace is not None else self.file_service
+
     async def cleanup(self, file_path: Path) -> None:
         """
         Очистка временных файлов.
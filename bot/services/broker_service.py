@@ -0,0 +1,325 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+import logging
+
+from bot.models.job import MediaJob
+from .job_store_service import STATE_FAILED
+
+logger = logging.getLogger(__name__)
+
+# Состояния задачи в брокере
+BROKER_QUEUED = "queued"
+BROKER_CLAIMED = "claimed"
+BROKER_FINISHED = "finished"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS broker_jobs (
+    job_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker_id TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result_state TEXT,
+    result_text TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_broker_state ON broker_jobs (state, created_at);
+"""
+
+
+class BrokerError(Exception):
+    """Ошибка обмена с брокером задач."""
+
+
+@dataclass
+class BrokerResult:
+    """Итог задачи, выполненной воркером."""
+    job: MediaJob
+    state: str
+    text: str
+
+
+class WorkerBroker(ABC):
+    """
+    Операции воркера: задача берётся через ``claim`` на время аренды,
+    аренда продлевается ``heartbeat``, итог сдаётся через ``complete``.
+    Задача, аренда которой истекла (воркер упал), выдаётся повторно.
+    """
+
+    @abstractmethod
+    async def claim(self, worker_id: str) -> Optional[MediaJob]:
+        """Получение следующей задачи воркером (None - очередь пуста)."""
+
+    @abstractmethod
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Продление аренды; False, если задача уже отдана другому воркеру."""
+
+    @abstractmethod
+    async def complete(self, job_id: str, worker_id: str, state: str, text: str) -> bool:
+        """Сдача итога задачи; False, если аренда задачи уже у другого воркера."""
+
+    async def close(self) -> None:
+        """Освобождение ресурсов."""
+
+
+class FrontendBroker(ABC):
+    """Операции фронтенда: ``put`` кладёт задачу, ``results``/``ack`` забирают итоги."""
+
+    @abstractmethod
+    async def put(self, job: MediaJob) -> None:
+        """Постановка задачи в очередь (повторная постановка игнорируется)."""
+
+    @abstractmethod
+    async def results(self, limit: int = 100) -> List[BrokerResult]:
+        """Итоги выполненных задач, ещё не подтверждённые фронтендом."""
+
+    @abstractmethod
+    async def ack(self, job_id: str) -> None:
+        """Подтверждение получения итога (задача удаляется из брокера)."""
+
+    async def close(self) -> None:
+        """Освобождение ресурсов."""
+
+
+class Broker(FrontendBroker, WorkerBroker):
+    """
+    Очередь задач между фронтендом (Telegram) и воркерами (распознавание)
+    с операциями обеих сторон.
+    """
+
+
+class SQLiteBroker(Broker):
+    """
+    Брокер на общем файле SQLite (WAL).
+
+    Не требует внешних сервисов: фронтенд и воркеры на одной машине
+    открывают один и тот же файл. Выдача задач сериализуется
+    транзакцией BEGIN IMMEDIATE.
+    """
+
+    def __init__(self, db_path: Path, lease_sec: int = 60, max_attempts: int = 3):
+        self.db_path = db_path
+        self.lease_sec = lease_sec
+        self.max_attempts = max(1, max_attempts)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(db_path), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    async def put(self, job: MediaJob) -> None:
+        now = time.time()
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR IGNORE INTO broker_jobs (job_id, payload, state, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (job.job_id, json.dumps(job.to_dict(), ensure_ascii=False), BROKER_QUEUED, now, now)
+        )
+
+    async def claim(self, worker_id: str) -> Optional[MediaJob]:
+        return await asyncio.to_thread(self._claim, worker_id)
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        updated = await asyncio.to_thread(
+            self._execute,
+            "UPDATE broker_jobs SET lease_until = ?, updated_at = ? "
+            "WHERE job_id = ? AND worker_id = ? AND state = ?",
+            (time.time() + self.lease_sec, time.time(), job_id, worker_id, BROKER_CLAIMED)
+        )
+        return updated > 0
+
+    async def complete(self, job_id: str, worker_id: str, state: str, text: str) -> bool:
+        # Итог принимается только от текущего арендатора: воркер с истёкшей
+        # арендой не перезапишет итог того, кто взял задачу после него
+        updated = await asyncio.to_thread(
+            self._execute,
+            "UPDATE broker_jobs SET state = ?, result_state = ?, result_text = ?, updated_at = ? "
+            "WHERE job_id = ? AND worker_id = ? AND state = ?",
+            (BROKER_FINISHED, state, text, time.time(), job_id, worker_id, BROKER_CLAIMED)
+        )
+        return updated > 0
+
+    async def results(self, limit: int = 100) -> List[BrokerResult]:
+        rows = await asyncio.to_thread(
+            self._fetch,
+            "SELECT payload, result_state, result_text FROM broker_jobs "
+            "WHERE state = ? ORDER BY updated_at LIMIT ?",
+            (BROKER_FINISHED, limit)
+        )
+        return [
+            BrokerResult(
+                job=MediaJob.from_dict(json.loads(row["payload"])),
+                state=row["result_state"],
+                text=row["result_text"]
+            )
+            for row in rows
+        ]
+
+    async def ack(self, job_id: str) -> None:
+        await asyncio.to_thread(
+            self._execute, "DELETE FROM broker_jobs WHERE job_id = ?", (job_id,)
+        )
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        """Изменяющий запрос; возвращает число затронутых строк."""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _fetch(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """Выборка."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _claim(self, worker_id: str) -> Optional[MediaJob]:
+        """Атомарная выдача задачи (выполняется в рабочем потоке)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._conn.execute(
+                        "SELECT job_id, payload, attempts FROM broker_jobs "
+                        "WHERE state = ? OR (state = ? AND lease_until < ?) "
+                        "ORDER BY created_at LIMIT 1",
+                        (BROKER_QUEUED, BROKER_CLAIMED, now)
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+
+                    if row["attempts"] >= self.max_attempts:
+                        # Задача уже роняла воркеры - больше не выдаём
+                        logger.warning(f"Задача {row['job_id']} не выполнена за {row['attempts']} попыток")
+                        self._conn.execute(
+                            "UPDATE broker_jobs SET state = ?, result_state = ?, result_text = ?, "
+                            "updated_at = ? WHERE job_id = ?",
+                            (
+                                BROKER_FINISHED, STATE_FAILED,
+                                "❌ Не удалось обработать файл, попробуйте отправить его ещё раз",
+                                now, row["job_id"]
+                            )
+                        )
+                        continue
+
+                    self._conn.execute(
+                        "UPDATE broker_jobs SET state = ?, worker_id = ?, lease_until = ?, "
+                        "attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                        (BROKER_CLAIMED, worker_id, now + self.lease_sec, now, row["job_id"])
+                    )
+                    self._conn.execute("COMMIT")
+                    return MediaJob.from_dict(json.loads(row["payload"]))
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+class HttpBroker(WorkerBroker):
+    """
+    Клиент брокера для воркеров на других машинах.
+
+    Ходит к эндпоинтам ``BrokerEndpoint`` на HTTP-сервере фронтенда,
+    который проксирует вызовы в свой локальный брокер.
+    """
+
+    def __init__(self, base_url: str, token: str = "", timeout_sec: int = 30):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout_sec = timeout_sec
+        self._session = None
+
+    async def claim(self, worker_id: str) -> Optional[MediaJob]:
+        data = await self._post("claim", {"worker_id": worker_id})
+        job = data.get("job")
+        return MediaJob.from_dict(job) if job else None
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        data = await self._post("heartbeat", {"job_id": job_id, "worker_id": worker_id})
+        return bool(data.get("ok"))
+
+    async def complete(self, job_id: str, worker_id: str, state: str, text: str) -> bool:
+        data = await self._post(
+            "complete",
+            {"job_id": job_id, "worker_id": worker_id, "state": state, "text": text}
+        )
+        return bool(data.get("ok"))
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _post(self, method: str, payload: dict) -> dict:
+        """POST-запрос к эндпоинту брокера."""
+        # aiohttp нужен только воркерам на других машинах
+        import aiohttp
+
+        if self._session is None:
+            headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout_sec),
+                headers=headers
+            )
+
+        url = f"{self.base_url}/{method}"
+        try:
+            async with self._session.post(url, json=payload) as response:
+                if response.status != 200:
+                    raise BrokerError(f"{url}: HTTP {response.status}")
+                return await response.json()
+        except aiohttp.ClientError as e:
+            raise BrokerError(f"{url}: {e}") from e
+
+
+def create_local_broker(url: str, lease_sec: int = 60, max_attempts: int = 3) -> Broker:
+    """
+    Брокер фронтенда (со всеми операциями) по URL.
+
+    Args:
+        url: ``sqlite:///путь/к/файлу``
+        lease_sec: Время аренды задачи воркером
+        max_attempts: Сколько раз задача может быть выдана
+
+    Returns:
+        Брокер
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteBroker(Path(url[len("sqlite:///"):]), lease_sec=lease_sec, max_attempts=max_attempts)
+    raise ValueError(f"Неподдерживаемый BROKER_URL для фронтенда: {url}")
+
+
+def create_broker(url: str, token: str = "", lease_sec: int = 60, max_attempts: int = 3) -> WorkerBroker:
+    """
+    Брокер воркера по URL.
+
+    Args:
+        url: ``sqlite:///путь/к/файлу`` или ``http(s)://фронтенд/broker``
+        token: Токен доступа для HTTP-брокера
+        lease_sec: Время аренды задачи воркером
+        max_attempts: Сколько раз задача может быть выдана
+
+    Returns:
+        Брокер
+    """
+    if url.startswith("sqlite:///"):
+        return create_local_broker(url, lease_sec=lease_sec, max_attempts=max_attempts)
+    if url.startswith(("http://", "https://")):
+        return HttpBroker(url, token=token)
+    raise ValueError(f"Неподдерживаемый BROKER_URL: {url}")
@@ -0,0 +1,347 @@
+import asyncio
+import itertools
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Лимит длины сообщения Telegram - 4096 символов; режем с запасом на разметку
+SPLIT_LIMIT = 4000
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов к Telegram API.
+
+    Соблюдает минимальный интервал между запросами в один чат (для групп
+    он больше) и общий лимит запросов в секунду на бота. RetryAfter от
+    Telegram приостанавливает все запросы на указанное время.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 25.0,
+        chat_interval_sec: float = 1.0,
+        group_interval_sec: float = 3.0
+    ):
+        self.global_interval = 1.0 / global_rate if global_rate > 0 else 0.0
+        self.chat_interval = chat_interval_sec
+        self.group_interval = group_interval_sec
+        self._next_global = 0.0
+        self._next_chat: Dict[int, float] = {}
+
+    async def acquire(self, chat_id: int) -> None:
+        """Дождаться разрешения на запрос в чат."""
+        loop = asyncio.get_running_loop()
+
+        # Сначала очередь чата, затем общий поток — чтобы ожидание
+        # одного чата не занимало общую пропускную способность
+        now = loop.time()
+        chat_slot = max(now, self._next_chat.get(chat_id, 0.0))
+        interval = self.group_interval if chat_id < 0 else self.chat_interval
+        self._next_chat[chat_id] = chat_slot + interval
+        if chat_slot > now:
+            await asyncio.sleep(chat_slot - now)
+
+        now = loop.time()
+        global_slot = max(now, self._next_global)
+        self._next_global = global_slot + self.global_interval
+        if global_slot > now:
+            await asyncio.sleep(global_slot - now)
+
+        if len(self._next_chat) > 10000:
+            self._prune(loop.time())
+
+    def pause(self, seconds: float) -> None:
+        """Приостановить все запросы (после RetryAfter)."""
+        now = asyncio.get_running_loop().time()
+        self._next_global = max(self._next_global, now + seconds)
+
+    def _prune(self, now: float) -> None:
+        """Удаление устаревших записей о чатах."""
+        self._next_chat = {
+            chat_id: slot for chat_id, slot in self._next_chat.items() if slot > now
+        }
+
+
+class _PendingEdit:
+    """Отложенное редактирование сообщения, которое ещё можно заменить."""
+
+    def __init__(self, text: str, parse_mode: Optional[str], seq: int):
+        self.text = text
+        self.parse_mode = parse_mode
+        # Номер последней правки, текст которой несёт этот запрос
+        self.seq = seq
+        self.future: Optional[asyncio.Future] = None
+
+
+class DeliveryService:
+    """
+    Отправка сообщений в Telegram с учётом лимитов.
+
+    - ограничивает частоту запросов на чат и на бота;
+    - выполняет RetryAfter и повторяет запрос при сетевых ошибках;
+    - схлопывает редактирования одного сообщения: если предыдущее
+      редактирование ещё ждёт своей очереди, отправится только последний текст;
+      повтор устаревшего редактирования отменяется, если после него
+      уже выдано более новое;
+    - длинный результат разбивает на несколько сообщений или отправляет файлом.
+    """
+
+    def __init__(
+        self,
+        bot,
+        limiter: Optional[RateLimiter] = None,
+        max_retries: int = 5,
+        max_parts: int = 5
+    ):
+        self.bot = bot
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max(1, max_retries)
+        self.max_parts = max(1, max_parts)
+        self._pending_edits: Dict[Tuple[int, int], _PendingEdit] = {}
+        # Номер последней выданной правки каждого сообщения
+        self._edit_seq: Dict[Tuple[int, int], int] = {}
+        self._edit_counter = itertools.count(1)
+
+    async def send(self, chat_id: int, text: str, parse_mode: Optional[str] = None):
+        """
+        Отправка нового сообщения.
+
+        Args:
+            chat_id: ID чата
+            text: Текст сообщения
+            parse_mode: Режим разметки
+
+        Returns:
+            Отправленное сообщение
+        """
+        return await self._with_markup_fallback(
+            chat_id,
+            lambda mode: self.bot.send_message(chat_id=chat_id, text=text, parse_mode=mode),
+            parse_mode
+        )
+
+    async def edit(
+        self,
+        chat_id: int,
+        message_id: int,
+        text: str,
+        parse_mode: Optional[str] = None
+    ) -> None:
+        """
+        Редактирование сообщения со схлопыванием устаревших версий.
+
+        Args:
+            chat_id: ID чата
+            message_id: ID сообщения
+            text: Новый текст
+            parse_mode: Режим разметки
+        """
+        key = (chat_id, message_id)
+        seq = next(self._edit_counter)
+        self._edit_seq[key] = seq
+        pending = self._pending_edits.get(key)
+        if pending is not None:
+            # Предыдущее редактирование ещё не ушло — просто подменяем текст
+            pending.text = text
+            pending.parse_mode = parse_mode
+            pending.seq = seq
+            await asyncio.shield(pending.future)
+            return
+
+        pending = _PendingEdit(text, parse_mode, seq)
+        pending.future = asyncio.get_running_loop().create_future()
+        self._pending_edits[key] = pending
+
+        try:
+            await self.limiter.acquire(chat_id)
+            # С этого момента текст фиксирован, новые правки пойдут отдельным запросом
+            self._pending_edits.pop(key, None)
+            await self._with_markup_fallback(
+                chat_id,
+                lambda mode: self.bot.edit_message_text(
+                    pending.text,
+                    chat_id=chat_id,
+                    message_id=message_id,
+                    parse_mode=mode
+                ),
+                pending.parse_mode,
+                rate_limited=True,
+                is_stale=lambda: self._edit_seq.get(key) != pending.seq
+            )
+        except BaseException as e:
+            if self._pending_edits.get(key) is pending:
+                self._pending_edits.pop(key, None)
+            if not pending.future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    pending.future.cancel()
+                else:
+                    pending.future.set_exception(e)
+                    # Исключение получит вызывающий; ожидающие копии - через future
+                    pending.future.exception()
+            raise
+        else:
+            pending.future.set_result(None)
+        finally:
+            if self._edit_seq.get(key) == pending.seq:
+                self._edit_seq.pop(key, None)
+
+    async def deliver_result(
+        self,
+        chat_id: int,
+        message_id: int,
+        text: str,
+        parse_mode: Optional[str] = None,
+        filename: str = "transcript.txt",
+        skip_parts: int = 0,
+        on_part: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> None:
+        """
+        Доставка итогового текста вместо статусного сообщения.
+
+        Короткий текст заменяет статус; длинный разбивается на части
+        (первая заменяет статус, остальные отправляются следом), а если
+        частей больше ``max_parts`` — текст отправляется файлом.
+
+        Args:
+            chat_id: ID чата
+            message_id: ID статусного сообщения
+            text: Итоговый текст
+            parse_mode: Режим разметки
+            filename: Имя файла, если текст отправляется документом
+            skip_parts: Сколько новых сообщений уже отправлено ранее
+                (при повторной доставке они не дублируются)
+            on_part: Колбэк с числом отправленных новых сообщений
+        """
+        parts = split_text(text, SPLIT_LIMIT)
+
+        if len(parts) <= self.max_parts:
+            await self.edit(chat_id, message_id, parts[0], parse_mode)
+            for index, part in enumerate(parts[1:], start=1):
+                if index <= skip_parts:
+                    continue
+                await self.send(chat_id, part, parse_mode)
+                if on_part is not None:
+                    await on_part(index)
+            return
+
+        await self.edit(
+            chat_id,
+            message_id,
+            f"📝 Текст слишком длинный ({len(text)} символов), отправляю файлом"
+        )
+        if skip_parts:
+            return
+        await self._call(
+            chat_id,
+            lambda: self.bot.send_document(
+                chat_id=chat_id,
+                document=text.encode("utf-8"),
+                filename=filename
+            )
+        )
+        if on_part is not None:
+            await on_part(1)
+
+    async def _with_markup_fallback(
+        self,
+        chat_id: int,
+        request: Callable[[Optional[str]], Awaitable[Any]],
+        parse_mode: Optional[str],
+        rate_limited: bool = False,
+        is_stale: Optional[Callable[[], bool]] = None
+    ):
+        """Выполнить запрос; при ошибке разбора разметки повторить без неё."""
+        try:
+            return await self._call(
+                chat_id, request, parse_mode, rate_limited=rate_limited, is_stale=is_stale
+            )
+        except BadRequest as e:
+            message = str(e).lower()
+            if "not modified" in message:
+                # Текст уже такой же (например, повторная доставка)
+                return None
+            if parse_mode and "parse entities" in message:
+                logger.warning(f"Ошибка разметки ({e}), отправляем без форматирования")
+                return await self._call(chat_id, request, None, is_stale=is_stale)
+            raise
+
+    async def _call(
+        self,
+        chat_id: int,
+        func: Callable[..., Awaitable],
+        *args,
+        rate_limited: bool = False,
+        is_stale: Optional[Callable[[], bool]] = None,
+        **kwargs
+    ):
+        """
+        Вызов метода Bot API с ограничением частоты и повторами.
+
+        Args:
+            chat_id: ID чата (для лимита на чат)
+            func: Метод бота
+            rate_limited: Первый слот лимита уже получен вызывающим
+            is_stale: Проверка перед повтором: запрос устарел и не нужен
+
+        Returns:
+            Результат вызова (None, если устаревший запрос отменён)
+        """
+        delay = 1.0
+        for attempt in range(1, self.max_retries + 1):
+            if not rate_limited or attempt > 1:
+                await self.limiter.acquire(chat_id)
+            if attempt > 1 and is_stale is not None and is_stale():
+                logger.debug("Повтор устаревшего запроса отменён: выдан более новый")
+                return None
+            try:
+                return await func(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if hasattr(retry_after, "total_seconds"):
+                    retry_after = retry_after.total_seconds()
+                logger.warning(
+                    f"Flood control: пауза {retry_after}с "
+                    f"(попытка {attempt}/{self.max_retries})"
+                )
+                self.limiter.pause(float(retry_after))
+                if attempt == self.max_retries:
+                    raise
+            except BadRequest:
+                raise
+            except NetworkError as e:
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"Сетевая ошибка Telegram: {e}, повтор через {delay:.1f}с")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+
+def split_text(text: str, limit: int = SPLIT_LIMIT) -> List[str]:
+    """
+    Разбиение текста на части не длиннее ``limit`` символов.
+
+    Режем по переводу строки, затем по пробелу, и только в крайнем
+    случае посреди слова.
+
+    Args:
+        text: Исходный текст
+        limit: Максимальная длина части
+
+    Returns:
+        Список частей (минимум одна)
+    """
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    parts.append(text)
+    return parts
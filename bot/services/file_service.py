@@ -1,32 +1,65 @@
+import asyncio
 import os
 import aiofiles
 from pathlib import Path
 from typing import Optional
 import logging
 
+from bot.models.trace import JobTrace, trace_span
+from .workspace_service import JobWorkspace, WorkspaceManager
+
 logger = logging.getLogger(__name__)
 
 
+class RangeNotSupportedError(Exception):
+    """Сервер не поддерживает частичное скачивание (HTTP Range)."""
+
+
 class FileService:
     """Сервис для работы с файлами."""
     
-    def __init__(self, temp_dir: Path):
+    def __init__(
+        self,
+        temp_dir: Path,
+        connections: int = 4,
+        parallel_min_mb: int = 8,
+        block_size_kb: int = 1024,
+        range_retries: int = 3,
+        workspaces: Optional[WorkspaceManager] = None,
+        file_base_url: str = "https://api.telegram.org/file/bot"
+    ):
         self.temp_dir = temp_dir
+        self.file_base_url = file_base_url
+        self.workspaces = workspaces or WorkspaceManager(temp_dir)
+        self.connections = max(1, connections)
+        self.parallel_min_bytes = parallel_min_mb * 1024 * 1024
+        self.block_size = block_size_kb * 1024
+        self.range_retries = max(1, range_retries)
         temp_dir.mkdir(parents=True, exist_ok=True)
     
     async def download_file(
         self,
         file_url: str,
         destination: Optional[Path] = None,
-        bot_token: Optional[str] = None
+        bot_token: Optional[str] = None,
+        expected_size: Optional[int] = None,
+        workspace: Optional[JobWorkspace] = None,
+        trace: Optional[JobTrace] = None
     ) -> Path:
         """
         Скачивание файла по URL или telegram file_path.
 
+        Крупные файлы (от ``parallel_min_bytes``) скачиваются несколькими
+        соединениями через HTTP Range в заранее выделенный файл. Если сервер
+        не поддерживает Range, используется обычное однопоточное скачивание.
+
         Args:
             file_url: URL файла или file_path от Telegram
             destination: Путь для сохранения (если None - создается автоматически)
             bot_token: Токен бота (если file_url - это file_path от Telegram)
+            expected_size: Ожидаемый размер файла в байтах (file_size от Telegram)
+            workspace: Рабочая директория задачи (для автоматического пути)
+            trace: Трассировка задачи (этап download)
 
         Returns:
             Путь к скачанному файлу
@@ -35,31 +68,179 @@ class FileService:
 
         # Если это file_path от Telegram (относительный путь), формируем полный URL
         if bot_token and not file_url.startswith('http'):
-            file_url = f"https://api.telegram.org/file/bot{bot_token}/{file_url}"
+            file_url = f"{self.file_base_url}{bot_token}/{file_url}"
 
         if destination is None:
             # Генерируем имя файла на основе URL
             filename = file_url.split('/')[-1]
-            destination = self.temp_dir / filename
+            destination = (workspace.path if workspace else self.temp_dir) / filename
 
         logger.debug(f"Скачивание файла: {file_url} → {destination}")
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(file_url) as response:
-                    response.raise_for_status()
+            with trace_span(trace, "download") as span:
+                async with aiohttp.ClientSession() as session:
+                    downloaded = False
+                    if (
+                        expected_size
+                        and self.connections > 1
+                        and expected_size >= self.parallel_min_bytes
+                    ):
+                        try:
+                            await self._download_ranged(session, file_url, destination, expected_size)
+                            downloaded = True
+                        except RangeNotSupportedError as e:
+                            logger.debug(f"Range-запросы недоступны ({e}), скачиваем одним потоком")
+
+                    if not downloaded:
+                        await self._download_single(session, file_url, destination)
 
-                    async with aiofiles.open(destination, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            await f.write(chunk)
+                self._verify_size(destination, expected_size)
+                span.bytes = destination.stat().st_size
 
             logger.info(f"Файл скачан: {destination}")
             return destination
 
         except Exception as e:
             logger.error(f"Ошибка скачивания файла: {e}")
+            await self.delete_file(destination)
             raise
-    
+
+    async def _download_single(
+        self,
+        session,
+        file_url: str,
+        destination: Path
+    ) -> None:
+        """Скачивание одним соединением с записью крупными блоками."""
+        async with session.get(file_url) as response:
+            response.raise_for_status()
+
+            async with aiofiles.open(destination, 'wb') as f:
+                buffer = bytearray()
+                async for chunk in response.content.iter_any():
+                    buffer += chunk
+                    if len(buffer) >= self.block_size:
+                        await f.write(bytes(buffer))
+                        buffer.clear()
+                if buffer:
+                    await f.write(bytes(buffer))
+
+    async def _download_ranged(
+        self,
+        session,
+        file_url: str,
+        destination: Path,
+        total_size: int
+    ) -> None:
+        """
+        Скачивание несколькими соединениями через HTTP Range.
+
+        Args:
+            session: Сессия aiohttp
+            file_url: URL файла
+            destination: Путь для сохранения
+            total_size: Полный размер файла в байтах
+
+        Raises:
+            RangeNotSupportedError: Сервер игнорирует заголовок Range
+        """
+        part_size = -(-total_size // self.connections)
+        ranges = [
+            (start, min(start + part_size, total_size) - 1)
+            for start in range(0, total_size, part_size)
+        ]
+
+        # Заранее выделяем файл полного размера, части пишутся по своим смещениям
+        async with aiofiles.open(destination, 'wb') as f:
+            await f.truncate(total_size)
+
+        tasks = [
+            asyncio.create_task(self._fetch_range(session, file_url, destination, start, end, total_size))
+            for start, end in ranges
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Ошибка одной части (в т.ч. отсутствие Range) отменяет остальные
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        logger.debug(f"Файл скачан в {len(ranges)} потоков: {destination}")
+
+    async def _fetch_range(
+        self,
+        session,
+        file_url: str,
+        destination: Path,
+        start: int,
+        end: int,
+        total_size: int
+    ) -> None:
+        """Скачивание одного диапазона байт с повторными попытками."""
+        last_error: Optional[Exception] = None
+        offset = start
+
+        for attempt in range(1, self.range_retries + 1):
+            try:
+                # При повторе продолжаем с места обрыва
+                async with session.get(file_url, headers={"Range": f"bytes={offset}-{end}"}) as response:
+                    response.raise_for_status()
+                    if response.status != 206:
+                        raise RangeNotSupportedError(f"HTTP {response.status}")
+
+                    content_range = response.headers.get("Content-Range", "")
+                    if not content_range.endswith(f"/{total_size}"):
+                        raise RangeNotSupportedError(f"Content-Range: {content_range!r}")
+
+                    async with aiofiles.open(destination, 'r+b') as f:
+                        await f.seek(offset)
+                        buffer = bytearray()
+                        async for chunk in response.content.iter_any():
+                            buffer += chunk
+                            if len(buffer) >= self.block_size:
+                                await f.write(bytes(buffer))
+                                offset += len(buffer)
+                                buffer.clear()
+                        if buffer:
+                            await f.write(bytes(buffer))
+                            offset += len(buffer)
+                            buffer.clear()
+
+                if offset != end + 1:
+                    raise IOError(
+                        f"Диапазон {start}-{end} скачан не полностью: "
+                        f"{offset - start} из {end - start + 1} байт"
+                    )
+                return
+
+            except RangeNotSupportedError:
+                raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last_error = e
+                logger.warning(
+                    f"Ошибка скачивания диапазона {start}-{end} "
+                    f"(попытка {attempt}/{self.range_retries}): {e}"
+                )
+
+        raise RuntimeError(f"Не удалось скачать диапазон {start}-{end}: {last_error}")
+
+    def _verify_size(self, file_path: Path, expected_size: Optional[int]) -> None:
+        """Проверка целостности скачанного файла по размеру."""
+        if not expected_size:
+            return
+
+        actual_size = file_path.stat().st_size
+        if actual_size != expected_size:
+            raise IOError(
+                f"Размер скачанного файла не совпадает: "
+                f"{actual_size} байт вместо {expected_size}"
+            )
+
     async def save_bytes(
         self,
         data: bytes,
@@ -111,9 +292,5 @@ class FileService:
         Returns:
             Путь к временному файлу
         """
-        import random
-        import string
-        
-        random_str = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
-        filename = f"{prefix}_{random_str}.{extension}"
+        filename = f"{prefix}_{os.urandom(8).hex()}.{extension}"
         return self.temp_dir / filename
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+from bot.models.job import MediaJob
+
+logger = logging.getLogger(__name__)
+
+# Состояния задачи в журнале
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result_text TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    delivered INTEGER NOT NULL DEFAULT 0,
+    delivered_parts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_message ON jobs (chat_id, message_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_pending ON jobs (delivered, state);
+CREATE TABLE IF NOT EXISTS chunks (
+    job_id TEXT NOT NULL,
+    offset_ms INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (job_id, offset_ms)
+);
+"""
+
+
+@dataclass
+class StoredJob:
+    """Запись журнала задач."""
+    job: MediaJob
+    state: str
+    result_text: Optional[str]
+    attempts: int
+    delivered_parts: int
+
+
+class ChunkCheckpoints:
+    """Результаты распознанных частей одной задачи."""
+
+    def __init__(self, store: "JobStore", job_id: str):
+        self.store = store
+        self.job_id = job_id
+
+    async def load(self) -> Dict[float, str]:
+        """Уже распознанные части: смещение в секундах → текст."""
+        return await self.store.load_chunks(self.job_id)
+
+    async def save(self, offset_sec: float, text: str) -> None:
+        """Сохранение результата распознанной части."""
+        await self.store.save_chunk(self.job_id, offset_sec, text)
+
+
+class JobStore:
+    """
+    Журнал задач в SQLite (WAL).
+
+    Принятая задача записывается до начала обработки и проходит
+    состояния queued → running → done/failed; отдельно отмечается факт
+    доставки ответа. При запуске незавершённые и недоставленные задачи
+    восстанавливаются из журнала.
+
+    Для длинных записей журнал хранит результаты отдельных частей
+    (ключ - задача и смещение части), чтобы повторная попытка
+    распознавала только недостающие части.
+
+    Доступ к SQLite синхронный, поэтому все операции выполняются
+    в рабочем потоке под общей блокировкой.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+    def _execute(self, sql: str, params: tuple = (), fetch: bool = False) -> Union[List[sqlite3.Row], int]:
+        """
+        Выполнение запроса под блокировкой (вызывается из рабочего потока).
+
+        Returns:
+            Строки результата (fetch=True) или количество изменённых строк
+        """
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            return cursor.fetchall() if fetch else cursor.rowcount
+
+    async def _run(self, sql: str, params: tuple = (), fetch: bool = False) -> Union[List[sqlite3.Row], int]:
+        """Асинхронное выполнение запроса."""
+        return await asyncio.to_thread(self._execute, sql, params, fetch)
+
+    async def add(self, job: MediaJob) -> bool:
+        """
+        Запись новой задачи в состоянии queued.
+
+        Args:
+            job: Задача на распознавание
+
+        Returns:
+            False, если задача для этого сообщения уже есть в журнале
+            (Telegram повторно прислал обновление после перезапуска)
+        """
+        now = time.time()
+        added = await self._run(
+            "INSERT OR IGNORE INTO jobs "
+            "(job_id, chat_id, message_id, state, payload, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                job.job_id, job.chat_id, job.message_id, STATE_QUEUED,
+                json.dumps(job.to_dict(), ensure_ascii=False), now, now
+            )
+        )
+        return added > 0
+
+    async def update_job(self, job: MediaJob) -> None:
+        """Сохранение изменившихся полей задачи (например, ID статусного сообщения)."""
+        await self._run(
+            "UPDATE jobs SET payload = ?, updated_at = ? WHERE job_id = ?",
+            (json.dumps(job.to_dict(), ensure_ascii=False), time.time(), job.job_id)
+        )
+
+    async def mark_running(self, job_id: str) -> None:
+        """Задача взята в обработку (увеличивает счётчик попыток)."""
+        await self._run(
+            "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+            (STATE_RUNNING, time.time(), job_id)
+        )
+
+    async def mark_finished(self, job_id: str, state: str, result_text: str) -> None:
+        """
+        Фиксация итога задачи до его доставки.
+
+        Args:
+            job_id: ID задачи
+            state: STATE_DONE или STATE_FAILED
+            result_text: Текст ответа пользователю
+        """
+        await self._run(
+            "UPDATE jobs SET state = ?, result_text = ?, updated_at = ? WHERE job_id = ?",
+            (state, result_text, time.time(), job_id)
+        )
+        if state == STATE_DONE:
+            await self.delete_chunks(job_id)
+
+    async def mark_part_delivered(self, job_id: str, parts: int) -> None:
+        """Учёт доставленных частей длинного ответа."""
+        await self._run(
+            "UPDATE jobs SET delivered_parts = ?, updated_at = ? WHERE job_id = ?",
+            (parts, time.time(), job_id)
+        )
+
+    async def mark_delivered(self, job_id: str) -> None:
+        """Ответ полностью доставлен пользователю."""
+        await self._run(
+            "UPDATE jobs SET delivered = 1, updated_at = ? WHERE job_id = ?",
+            (time.time(), job_id)
+        )
+
+    def checkpoints(self, job_id: str) -> ChunkCheckpoints:
+        """Чекпоинты частей для задачи."""
+        return ChunkCheckpoints(self, job_id)
+
+    async def save_chunk(self, job_id: str, offset_sec: float, text: str) -> None:
+        """Сохранение результата части длинной записи."""
+        await self._run(
+            "INSERT OR REPLACE INTO chunks (job_id, offset_ms, text) VALUES (?, ?, ?)",
+            (job_id, int(round(offset_sec * 1000)), text)
+        )
+
+    async def load_chunks(self, job_id: str) -> Dict[float, str]:
+        """Сохранённые части задачи: смещение в секундах → текст."""
+        rows = await self._run(
+            "SELECT offset_ms, text FROM chunks WHERE job_id = ?",
+            (job_id,),
+            fetch=True
+        )
+        return {row["offset_ms"] / 1000: row["text"] for row in rows}
+
+    async def delete_chunks(self, job_id: str) -> None:
+        """Удаление сохранённых частей задачи."""
+        await self._run("DELETE FROM chunks WHERE job_id = ?", (job_id,))
+
+    async def pending(self) -> List[StoredJob]:
+        """Задачи, ответ на которые ещё не доставлен."""
+        rows = await self._run(
+            "SELECT * FROM jobs WHERE delivered = 0 ORDER BY created_at",
+            fetch=True
+        )
+        return [self._to_stored(row) for row in rows]
+
+    async def purge(self, retention_days: int) -> int:
+        """
+        Удаление доставленных задач старше срока хранения.
+
+        Args:
+            retention_days: Срок хранения в днях
+
+        Returns:
+            Количество удалённых записей
+        """
+        cutoff = time.time() - retention_days * 86400
+        purged = await self._run(
+            "DELETE FROM jobs WHERE delivered = 1 AND updated_at < ?",
+            (cutoff,)
+        )
+        await self._run("DELETE FROM chunks WHERE job_id NOT IN (SELECT job_id FROM jobs)")
+        return purged
+
+    def close(self) -> None:
+        """Закрытие соединения."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_stored(row: Any) -> StoredJob:
+        """Преобразование строки таблицы в StoredJob."""
+        return StoredJob(
+            job=MediaJob.from_dict(json.loads(row["payload"])),
+            state=row["state"],
+            result_text=row["result_text"],
+            attempts=row["attempts"],
+            delivered_parts=row["delivered_parts"]
+        )
@@ -0,0 +1,234 @@
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from bot.utils.memory import get_rss_bytes, get_peak_rss_bytes
+from bot.utils.metrics import (
+    MEMORY_HIGH_WATER_BYTES,
+    MEMORY_PRESSURE,
+    MEMORY_SHED_TOTAL,
+    PROCESS_PEAK_RSS_BYTES,
+    PROCESS_RSS_BYTES,
+    TORCH_MEMORY_BYTES,
+    TRACEMALLOC_BYTES,
+)
+from .pipeline_service import StageBusyError
+
+logger = logging.getLogger(__name__)
+
+# Интервал повторной проверки памяти при ожидании
+WAIT_POLL_SEC = 0.5
+
+
+class MemoryPressureError(StageBusyError):
+    """Память процесса выше порога, новая задача не запускается."""
+
+
+class MemoryMonitor:
+    """
+    Периодический замер памяти процесса и защита от OOM.
+
+    Фоновая задача раз в ``interval_sec`` снимает RSS, статистику
+    аллокатора torch (CUDA) и, если включено, крупнейшие места
+    выделения памяти по tracemalloc, и публикует их в метриках.
+
+    Если задан ``high_water_mb``, новые задачи при RSS выше порога не
+    запускаются: ждут снижения (политика wait) или сразу отклоняются
+    (политика reject).
+    """
+
+    def __init__(
+        self,
+        high_water_mb: int = 0,
+        policy: str = "wait",
+        wait_timeout_sec: int = 60,
+        interval_sec: float = 5.0,
+        tracemalloc_top: int = 0
+    ):
+        if policy not in ("wait", "reject"):
+            raise ValueError(f"Неверная политика памяти: {policy}")
+
+        self.high_water_bytes = high_water_mb * 1024 * 1024
+        self.policy = policy
+        self.wait_timeout_sec = wait_timeout_sec
+        self.interval_sec = max(interval_sec, 0.1)
+        self.tracemalloc_top = tracemalloc_top
+
+        self.rss_bytes: Optional[int] = None
+        self.sampled_at = 0.0
+        self._pressure = False
+        self._task: Optional[asyncio.Task] = None
+        self._report_task: Optional[asyncio.Task] = None
+
+        MEMORY_HIGH_WATER_BYTES.set(self.high_water_bytes)
+        MEMORY_PRESSURE.set_function(lambda: 1 if self._pressure else 0)
+
+    def start(self) -> None:
+        """Запуск периодического замера."""
+        if self.tracemalloc_top > 0 and not tracemalloc.is_tracing():
+            # tracemalloc заметно замедляет выделение памяти: только для диагностики
+            tracemalloc.start(1)
+            logger.warning("tracemalloc включён: выделение памяти замедлено")
+        self.sample()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка периодического замера."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._report_task is not None:
+            self._report_task.cancel()
+            self._report_task = None
+        if self.tracemalloc_top > 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_sec)
+            try:
+                self.sample()
+                if self.tracemalloc_top > 0:
+                    await asyncio.to_thread(self._sample_tracemalloc)
+            except Exception as e:
+                logger.error(f"Ошибка замера памяти: {e}")
+
+    def sample(self) -> Optional[int]:
+        """
+        Замер памяти и обновление метрик.
+
+        Returns:
+            RSS в байтах или None, если определить не удалось
+        """
+        self.rss_bytes = get_rss_bytes()
+        self.sampled_at = time.monotonic()
+        if self.rss_bytes is not None:
+            PROCESS_RSS_BYTES.set(self.rss_bytes)
+        peak = get_peak_rss_bytes()
+        if peak is not None:
+            PROCESS_PEAK_RSS_BYTES.set(peak)
+        for (device, kind), value in self._torch_stats().items():
+            TORCH_MEMORY_BYTES.labels(device=device, kind=kind).set(value)
+
+        pressure = bool(
+            self.high_water_bytes
+            and self.rss_bytes is not None
+            and self.rss_bytes >= self.high_water_bytes
+        )
+        if pressure != self._pressure:
+            self._pressure = pressure
+            if pressure:
+                logger.warning(
+                    f"Память процесса выше порога: {self.rss_bytes / (1024 * 1024):.0f} МБ "
+                    f"(порог {self.high_water_bytes / (1024 * 1024):.0f} МБ), новые задачи не запускаются"
+                )
+                self._schedule_report()
+            else:
+                logger.info(f"Память процесса ниже порога: {self.rss_bytes / (1024 * 1024):.0f} МБ")
+        return self.rss_bytes
+
+    def _schedule_report(self) -> None:
+        """Вывод крупнейших мест выделения памяти в лог (снимок - в отдельном потоке)."""
+        if self.tracemalloc_top <= 0 or not tracemalloc.is_tracing():
+            return
+        if self._report_task is not None and not self._report_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._report_task = loop.create_task(self._report_top_allocations())
+
+    async def _report_top_allocations(self) -> None:
+        try:
+            top = await asyncio.to_thread(self.top_allocations)
+        except Exception as e:
+            logger.error(f"Ошибка снимка tracemalloc: {e}")
+            return
+        for location, size in top:
+            logger.warning(f"  {size / (1024 * 1024):8.1f} МБ  {location}")
+
+    @staticmethod
+    def _torch_stats() -> Dict[Tuple[str, str], int]:
+        """Статистика аллокатора CUDA (если torch уже загружен)."""
+        # Не импортируем torch ради метрик: во frontend-режиме он не нужен
+        torch = sys.modules.get("torch")
+        if torch is None or not torch.cuda.is_available():
+            return {}
+        stats = {}
+        for index in range(torch.cuda.device_count()):
+            device = f"cuda:{index}"
+            stats[(device, "allocated")] = torch.cuda.memory_allocated(index)
+            stats[(device, "reserved")] = torch.cuda.memory_reserved(index)
+            stats[(device, "max_allocated")] = torch.cuda.max_memory_allocated(index)
+        return stats
+
+    def top_allocations(self) -> List[Tuple[str, int]]:
+        """
+        Крупнейшие места выделения памяти по tracemalloc.
+
+        Returns:
+            Список (файл:строка, байт); пустой, если tracemalloc выключен
+        """
+        if self.tracemalloc_top <= 0 or not tracemalloc.is_tracing():
+            return []
+        statistics = tracemalloc.take_snapshot().statistics("lineno")
+        return [
+            (f"{Path(stat.traceback[0].filename).name}:{stat.traceback[0].lineno}", stat.size)
+            for stat in statistics[:self.tracemalloc_top]
+        ]
+
+    def _sample_tracemalloc(self) -> None:
+        """Обновление метрик tracemalloc (выполняется в отдельном потоке)."""
+        top = self.top_allocations()
+        # Набор мест меняется от замера к замеру: старые значения удаляем
+        TRACEMALLOC_BYTES.clear()
+        for location, size in top:
+            TRACEMALLOC_BYTES.labels(location=location).set(size)
+
+    @property
+    def under_pressure(self) -> bool:
+        """Превышен ли порог памяти (по последнему замеру)."""
+        return self._pressure
+
+    async def admit(self, job_id: str) -> None:
+        """
+        Проверка памяти перед запуском задачи.
+
+        Args:
+            job_id: Идентификатор задачи
+
+        Raises:
+            MemoryPressureError: Память не освободилась (или политика reject)
+        """
+        if not self.high_water_bytes:
+            return
+        # Между замерами могли стартовать другие задачи
+        if time.monotonic() - self.sampled_at > WAIT_POLL_SEC:
+            self.sample()
+        if not self._pressure:
+            return
+
+        if self.policy == "reject":
+            MEMORY_SHED_TOTAL.labels(action="rejected").inc()
+            raise MemoryPressureError("Недостаточно памяти для новой задачи")
+
+        logger.info(f"Задача {job_id} ждёт освобождения памяти")
+        MEMORY_SHED_TOTAL.labels(action="deferred").inc()
+        deadline = time.monotonic() + self.wait_timeout_sec
+        while time.monotonic() < deadline:
+            await asyncio.sleep(WAIT_POLL_SEC)
+            self.sample()
+            if not self._pressure:
+                return
+
+        MEMORY_SHED_TOTAL.labels(action="rejected").inc()
+        raise MemoryPressureError("Недостаточно памяти для новой задачи")
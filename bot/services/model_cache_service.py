@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Размер блока при подсчёте контрольной суммы
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def _package_version(name: str) -> Optional[str]:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def file_sha256(path: Path) -> str:
+    """Контрольная сумма SHA-256 файла."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """
+    Локальный кэш готовой к загрузке модели.
+
+    ``gigaam.load_model`` при каждом запуске разрешает имя модели,
+    при необходимости скачивает чекпоинт, собирает модель по конфигурации
+    и загружает в неё веса. Кэш сохраняет уже собранный модуль целиком
+    (``torch.save``) и при следующих запусках загружает его напрямую,
+    с отображением файла в память (``mmap``), без обращений к сети.
+
+    Рядом с файлом модели хранится манифест с размером, временем
+    изменения, контрольной суммой и версиями torch и gigaam; при
+    несовпадении кэш пересоздаётся. Контрольная сумма считается при
+    сохранении и при загрузке пересчитывается, только если файл менялся
+    после сохранения (размер и время изменения дешевле чтения всего
+    файла) или задан ``verify``.
+    """
+
+    def __init__(self, directory: Path, verify: bool = False):
+        self.directory = directory
+        self.verify = verify
+
+    def path_for(self, model_name: str, device: str, options: Optional[Dict[str, Any]] = None) -> Path:
+        """
+        Путь к файлу модели.
+
+        Отдельно для CPU и GPU (на GPU часть весов в fp16) и для каждого
+        набора параметров сборки ``gigaam.load_model``.
+        """
+        device_type = device.split(":")[0]
+        suffix = "".join(f"-{key}={value}" for key, value in sorted((options or {}).items()))
+        return self.directory / f"{model_name}-{device_type}{suffix}.pt"
+
+    @staticmethod
+    def _versions() -> dict:
+        return {"torch": _package_version("torch"), "gigaam": _package_version("gigaam")}
+
+    def load(self, model_name: str, device: str, options: Optional[Dict[str, Any]] = None):
+        """
+        Загрузка модели из кэша.
+
+        Args:
+            model_name: Имя модели GigaAM
+            device: Устройство
+            options: Параметры сборки, с которыми модель сохранялась
+
+        Returns:
+            Модель или None, если кэша нет или он не прошёл проверку
+        """
+        path = self.path_for(model_name, device, options)
+        manifest_path = path.with_suffix(".json")
+        if not path.exists() or not manifest_path.exists():
+            return None
+
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("versions") != self._versions():
+                logger.info(f"Кэш модели {path.name} создан другой версией torch/gigaam, пересоздаём")
+                return None
+            stat = path.stat()
+            if manifest.get("size") != stat.st_size:
+                logger.warning(f"Кэш модели {path.name} повреждён (размер), пересоздаём")
+                return None
+            touched = manifest.get("mtime_ns") != stat.st_mtime_ns
+            if self.verify or touched:
+                if manifest.get("sha256") != file_sha256(path):
+                    logger.warning(f"Кэш модели {path.name} повреждён (контрольная сумма), пересоздаём")
+                    return None
+                if touched:
+                    # Содержимое не изменилось: следующий запуск обойдётся без пересчёта
+                    manifest["mtime_ns"] = stat.st_mtime_ns
+                    self._write_manifest(manifest_path, manifest)
+
+            import torch
+
+            try:
+                # Веса отображаются в память и подгружаются по мере обращения
+                model = torch.load(path, map_location="cpu", mmap=True, weights_only=False)
+            except TypeError:
+                # torch < 2.1 не поддерживает mmap
+                model = torch.load(path, map_location="cpu")
+            model = model.to(device)
+            model.eval()
+            logger.info(f"Модель загружена из кэша: {path}")
+            return model
+        except Exception as e:
+            logger.warning(f"Ошибка загрузки модели из кэша {path}: {e}")
+            return None
+
+    @staticmethod
+    def _write_manifest(manifest_path: Path, manifest: dict) -> None:
+        """Перезапись манифеста через временный файл."""
+        tmp_manifest = manifest_path.with_name(f".{manifest_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_manifest.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+            os.replace(tmp_manifest, manifest_path)
+        except OSError as e:
+            logger.warning(f"Не удалось обновить манифест кэша {manifest_path}: {e}")
+            tmp_manifest.unlink(missing_ok=True)
+
+    def save(
+        self,
+        model,
+        model_name: str,
+        device: str,
+        options: Optional[Dict[str, Any]] = None
+    ) -> Optional[Path]:
+        """
+        Сохранение собранной модели в кэш.
+
+        Файлы пишутся во временные и переименовываются, поэтому
+        прерванная запись не оставляет битого кэша.
+
+        Args:
+            model: Модель GigaAM
+            model_name: Имя модели
+            device: Устройство, на котором модель загружена
+            options: Параметры сборки ``gigaam.load_model``
+
+        Returns:
+            Путь к файлу модели или None при ошибке
+        """
+        import torch
+
+        path = self.path_for(model_name, device, options)
+        manifest_path = path.with_suffix(".json")
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_manifest = manifest_path.with_name(f".{manifest_path.name}.{os.getpid()}.tmp")
+
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            torch.save(model, tmp_path)
+            manifest = {
+                "model": model_name,
+                "device": device,
+                "options": options or {},
+                "size": tmp_path.stat().st_size,
+                # Переименование время изменения не меняет
+                "mtime_ns": tmp_path.stat().st_mtime_ns,
+                "sha256": file_sha256(tmp_path),
+                "versions": self._versions(),
+            }
+            tmp_manifest.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+            # Манифест последним: без него файл модели не считается кэшем
+            manifest_path.unlink(missing_ok=True)
+            os.replace(tmp_path, path)
+            os.replace(tmp_manifest, manifest_path)
+            logger.info(f"Модель сохранена в кэш: {path} ({manifest['size'] / (1024 * 1024):.0f} МБ)")
+            return path
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить модель в кэш {path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            tmp_manifest.unlink(missing_ok=True)
+            return None
@@ -0,0 +1,656 @@
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
+import logging
+
+from bot.models.audio import TranscriptionResult
+from bot.models.job import MediaJob
+from bot.models.trace import JobTrace
+from bot.models.transcribe import LongTranscriptionResult, Utterance
+from .audio_service import AudioService
+from .broker_service import BrokerError, FrontendBroker
+from .delivery_service import DeliveryService
+from .job_store_service import STATE_DONE, STATE_FAILED, JobStore, StoredJob
+from .transcribe_service import SegmentCallback, TranscribeService
+from .workspace_service import DiskBudgetExceededError, JobWorkspace
+from ..utils.logger import log_context
+from ..utils.metrics import (
+    AUDIO_SECONDS,
+    DOWNLOAD_BYTES,
+    JOB_RTF,
+    JOBS_TOTAL,
+    STAGE_ACTIVE,
+    STAGE_CAPACITY,
+    STAGE_SECONDS,
+    STAGE_WAIT_SECONDS,
+    STAGE_WAITING,
+)
+
+logger = logging.getLogger(__name__)
+
+# Одна строка JSON с этапами на каждую задачу
+trace_logger = logging.getLogger("bot.trace")
+
+# Сколько последних измерений хранит каждая стадия
+STAGE_SAMPLES = 1000
+
+StatusCallback = Callable[[str], Awaitable[None]]
+
+
+class StageBusyError(Exception):
+    """Очередь стадии переполнена."""
+
+
+class Stage:
+    """
+    Стадия конвейера с собственным лимитом параллельности и очередью.
+
+    Задачи сверх ``concurrency`` ждут своей очереди на семафоре; если
+    ``max_queue`` > 0 и ожидающих уже столько, новая задача отклоняется.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int = 0):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        self.waiting = 0
+        self.active = 0
+        self.processed = 0
+        self.failed = 0
+        self.wait_times: deque = deque(maxlen=STAGE_SAMPLES)
+        self.run_times: deque = deque(maxlen=STAGE_SAMPLES)
+
+        STAGE_WAITING.labels(stage=name).set_function(lambda: self.waiting)
+        STAGE_ACTIVE.labels(stage=name).set_function(lambda: self.active)
+        STAGE_CAPACITY.labels(stage=name).set(self.concurrency)
+        self._wait_histogram = STAGE_WAIT_SECONDS.labels(stage=name)
+        self._run_histogram = STAGE_SECONDS.labels(stage=name)
+
+    @asynccontextmanager
+    async def slot(self, trace: Optional[JobTrace] = None) -> AsyncIterator[None]:
+        """
+        Занять место в стадии на время выполнения блока.
+
+        Args:
+            trace: Трассировка задачи (ожидание записывается этапом ``wait:<стадия>``)
+        """
+        if self.max_queue and self.waiting >= self.max_queue:
+            raise StageBusyError(f"Очередь стадии {self.name} переполнена")
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.wait_times.append(started_at - queued_at)
+        self._wait_histogram.observe(started_at - queued_at)
+        if trace is not None:
+            trace.record(f"wait:{self.name}", queued_at, started_at)
+        self.active += 1
+        try:
+            yield
+        except BaseException:
+            self.failed += 1
+            raise
+        else:
+            self.processed += 1
+        finally:
+            self.active -= 1
+            elapsed = time.perf_counter() - started_at
+            self.run_times.append(elapsed)
+            self._run_histogram.observe(elapsed)
+            self._semaphore.release()
+
+    async def run(self, func: Callable[..., Awaitable], *args, **kwargs):
+        """Выполнить корутину внутри стадии."""
+        async with self.slot():
+            return await func(*args, **kwargs)
+
+
+class MediaPipeline:
+    """
+    Конвейер обработки медиа: admit → fetch → decode → infer → deliver.
+
+    Каждая стадия ограничивает свой ресурс (слоты задач, сеть, ffmpeg,
+    модель, Telegram API) независимо от остальных. Обработчики только
+    описывают медиа в виде MediaJob и передают его в ``submit``.
+
+    Если задан ``job_store``, каждая принятая задача и её итог пишутся
+    в журнал, а ``resume_pending`` после перезапуска дорабатывает
+    незавершённые задачи и доставляет недоставленные ответы.
+
+    Если задан ``broker``, конвейер работает как фронтенд: рабочая часть
+    (``run``) выполняется воркерами, а здесь остаются приём задач,
+    статусы и доставка ответов. Место в стадии admit задача занимает
+    только до постановки в брокер: дальше параллельность ограничивают
+    сами воркеры.
+
+    Если задан ``memory`` (MemoryMonitor), принятая задача не запускается,
+    пока память процесса выше порога.
+    """
+
+    def __init__(
+        self,
+        audio_service: AudioService,
+        transcribe_service: TranscribeService,
+        bot=None,
+        delivery: Optional[DeliveryService] = None,
+        bot_token: Optional[str] = None,
+        hf_token: Optional[str] = None,
+        max_jobs: int = 3,
+        max_queue: int = 50,
+        fetch_concurrency: int = 4,
+        decode_concurrency: int = 2,
+        infer_concurrency: int = 1,
+        deliver_concurrency: int = 8,
+        job_store: Optional[JobStore] = None,
+        max_attempts: int = 3,
+        broker: Optional[FrontendBroker] = None,
+        memory=None
+    ):
+        self.audio_service = audio_service
+        self.transcribe_service = transcribe_service
+        self.file_service = audio_service.file_service
+        self.bot = bot
+        self.delivery = delivery or (DeliveryService(bot) if bot is not None else None)
+        self.bot_token = bot_token
+        self.hf_token = hf_token
+        self.job_store = job_store
+        self.max_attempts = max(1, max_attempts)
+        self.broker = broker
+        self.memory = memory
+        self._background: Set[asyncio.Task] = set()
+        self._remote_results: Dict[str, asyncio.Future] = {}
+
+        self.admit = Stage("admit", max_jobs, max_queue)
+        self.fetch_stage = Stage("fetch", fetch_concurrency)
+        self.decode_stage = Stage("decode", decode_concurrency)
+        # С батчами в стадии нужно место для записей всех одновременных батчей
+        batch_size = transcribe_service.batch_size if transcribe_service is not None else 1
+        self.infer_stage = Stage("infer", infer_concurrency * batch_size)
+        self.deliver_stage = Stage("deliver", deliver_concurrency)
+
+    @property
+    def stages(self) -> Dict[str, Stage]:
+        """Стадии конвейера по именам."""
+        return {
+            stage.name: stage
+            for stage in (
+                self.admit,
+                self.fetch_stage,
+                self.decode_stage,
+                self.infer_stage,
+                self.deliver_stage,
+            )
+        }
+
+    @asynccontextmanager
+    async def admission(self, job_id: str) -> AsyncIterator[None]:
+        """
+        Место в стадии admit с проверкой памяти процесса.
+
+        Args:
+            job_id: Идентификатор задачи
+
+        Raises:
+            StageBusyError: Очередь переполнена или не хватает памяти
+        """
+        async with self.admit.slot():
+            if self.memory is not None:
+                await self.memory.admit(job_id)
+            yield
+
+    async def submit(self, job: MediaJob, resumed: bool = False) -> None:
+        """
+        Полная обработка задачи: от приёма до ответа пользователю.
+
+        Args:
+            job: Задача на распознавание
+            resumed: Задача восстановлена из журнала после перезапуска
+        """
+        with log_context(job.job_id):
+            if self.job_store is not None and not resumed:
+                if not await self.job_store.add(job):
+                    logger.info(f"Задача для сообщения {job.chat_id}/{job.message_id} уже в журнале, пропускаем")
+                    return
+
+            try:
+                if self.broker is not None:
+                    await self._process_remote(job, resumed)
+                else:
+                    async with self.admission(job.job_id):
+                        await self._process(job, resumed)
+            except StageBusyError as e:
+                logger.warning(f"Задача {job.job_id} отклонена: {e}")
+                JOBS_TOTAL.labels(kind=job.kind, outcome="rejected").inc()
+                await self.deliver_stage.run(
+                    self._send, job, "⏳ Сервер перегружен, попробуйте позже"
+                )
+                if self.job_store is not None:
+                    await self.job_store.mark_delivered(job.job_id)
+
+    async def _start(self, job: MediaJob, resumed: bool = False) -> None:
+        """Статус «Обрабатываю» и отметка о запуске в журнале."""
+        if resumed and job.status_message_id is not None:
+            await self.deliver_stage.run(self._edit, job, "⏳ Продолжаю обработку после перезапуска...")
+        else:
+            if job.file_name:
+                status_text = f"⏳ Обрабатываю {job.label}: {job.file_name}..."
+            else:
+                status_text = f"⏳ Обрабатываю {job.label}..."
+            status = await self.deliver_stage.run(self._send, job, status_text)
+            job.status_message_id = status.message_id
+            if self.job_store is not None:
+                await self.job_store.update_job(job)
+
+        if self.job_store is not None:
+            await self.job_store.mark_running(job.job_id)
+
+    async def _process(self, job: MediaJob, resumed: bool = False) -> None:
+        """Обработка принятой задачи в этом процессе."""
+        await self._start(job, resumed)
+
+        # Промежуточные статусы не задерживают обработку: они уходят в фоне
+        # и схлопываются с итоговым ответом, если ещё не отправлены
+        status_tasks = set()
+
+        async def on_status(text: str) -> None:
+            task = asyncio.create_task(self.deliver_stage.run(self._edit, job, text))
+            status_tasks.add(task)
+            task.add_done_callback(status_tasks.discard)
+
+        try:
+            state, text = await self.run(job, on_status)
+            # Статус, застрявший в повторах, не должен затереть итоговый ответ
+            for task in tuple(status_tasks):
+                task.cancel()
+            if status_tasks:
+                await asyncio.gather(*status_tasks, return_exceptions=True)
+            await self._finish(job, state, text)
+        finally:
+            if status_tasks:
+                await asyncio.gather(*status_tasks, return_exceptions=True)
+
+    async def run(
+        self,
+        job: MediaJob,
+        on_status: Optional[StatusCallback] = None
+    ) -> Tuple[str, str]:
+        """
+        Выполнение задачи до готового текста ответа.
+
+        Args:
+            job: Задача на распознавание
+            on_status: Колбэк для промежуточного статуса
+
+        Returns:
+            Итоговое состояние (STATE_DONE/STATE_FAILED) и текст ответа
+        """
+        with log_context(job.job_id):
+            try:
+                result = await self.execute(job, on_status)
+                if isinstance(result, TranscriptionResult) and not result.is_success:
+                    logger.warning(f"Задача {job.job_id} завершилась ошибкой распознавания: {result.error}")
+                    return STATE_FAILED, format_result(job, result)
+                logger.info(f"Транскрибация завершена: job={job.job_id}, user_id={job.user_id}")
+                return STATE_DONE, format_result(job, result)
+
+            except DiskBudgetExceededError as e:
+                logger.warning(f"Задача {job.job_id} отклонена: {e}")
+                return STATE_FAILED, f"⏳ {e}"
+            except Exception as e:
+                logger.error(f"Ошибка обработки задачи {job.job_id}: {e}", exc_info=True)
+                return STATE_FAILED, f"❌ Произошла ошибка: {str(e)}"
+
+    async def _process_remote(self, job: MediaJob, resumed: bool = False) -> None:
+        """Передача задачи воркерам через брокер, ожидание итога и доставка."""
+        # Регистрируемся до первого await: итог может прийти сразу
+        future = self._remote_results.get(job.job_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._remote_results[job.job_id] = future
+        try:
+            async with self.admission(job.job_id):
+                await self._start(job, resumed)
+                await self.broker.put(job)
+            state, text = await future
+            await self._finish(job, state, text)
+        finally:
+            self._remote_results.pop(job.job_id, None)
+
+    async def consume_results(self, poll_interval: float = 0.5) -> None:
+        """
+        Получение итогов от воркеров (выполняется фоновой задачей фронтенда).
+
+        Итог передаётся ожидающей задаче, а итог задачи, которую этот
+        процесс не ждёт (фронтенд перезапускался), доставляется сразу.
+        С журналом итог сначала записывается в него и только потом
+        подтверждается брокеру, поэтому падение фронтенда его не теряет.
+
+        Args:
+            poll_interval: Интервал опроса брокера в секундах
+        """
+        while True:
+            try:
+                results = await self.broker.results()
+            except BrokerError as e:
+                logger.warning(f"Ошибка получения итогов от брокера: {e}")
+                results = []
+
+            for result in results:
+                job_id = result.job.job_id
+                if self.job_store is not None:
+                    await self.job_store.mark_finished(job_id, result.state, result.text)
+                await self.broker.ack(job_id)
+
+                future = self._remote_results.get(job_id)
+                if future is not None:
+                    if not future.done():
+                        future.set_result((result.state, result.text))
+                else:
+                    task = asyncio.create_task(self._finish(result.job, result.state, result.text))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+
+            if not results:
+                await asyncio.sleep(poll_interval)
+
+    async def _finish(self, job: MediaJob, state: str, text: str, skip_parts: int = 0) -> None:
+        """Фиксация итога в журнале и доставка ответа."""
+        JOBS_TOTAL.labels(kind=job.kind, outcome=state).inc()
+        if self.job_store is not None:
+            await self.job_store.mark_finished(job.job_id, state, text)
+
+        try:
+            if state == STATE_DONE:
+                await self.deliver_stage.run(self._deliver_result, job, text, skip_parts)
+            else:
+                await self.deliver_stage.run(self._edit, job, text)
+        except Exception as e:
+            # Ответ остаётся в журнале и будет доставлен после перезапуска
+            logger.error(f"Ошибка доставки ответа задачи {job.job_id}: {e}", exc_info=True)
+            if state == STATE_DONE:
+                await self.deliver_stage.run(
+                    self._edit, job, f"❌ Произошла ошибка: {str(e)}"
+                )
+            return
+
+        if self.job_store is not None:
+            await self.job_store.mark_delivered(job.job_id)
+
+    async def resume_pending(self, retention_days: int = 7) -> int:
+        """
+        Восстановление задач из журнала после перезапуска.
+
+        Готовые, но недоставленные ответы доставляются повторно;
+        незавершённые задачи запускаются заново в фоне. Задачи, которые
+        уже ``max_attempts`` раз не дошли до конца (например, роняли
+        процесс), завершаются с ошибкой.
+
+        Args:
+            retention_days: Срок хранения доставленных задач в журнале
+
+        Returns:
+            Количество восстановленных задач
+        """
+        if self.job_store is None:
+            return 0
+
+        purged = await self.job_store.purge(retention_days)
+        if purged:
+            logger.info(f"Удалено {purged} старых записей из журнала задач")
+
+        pending = await self.job_store.pending()
+        for stored in pending:
+            if stored.result_text is None and stored.attempts >= self.max_attempts:
+                logger.warning(f"Задача {stored.job.job_id} не завершилась за {stored.attempts} попыток")
+                stored.state = STATE_FAILED
+                stored.result_text = "❌ Не удалось обработать файл, попробуйте отправить его ещё раз"
+
+            if stored.result_text is not None:
+                coro = self._redeliver(stored)
+            else:
+                coro = self.submit(stored.job, resumed=True)
+
+            task = asyncio.create_task(coro)
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+        if pending:
+            logger.info(f"Восстановлено задач из журнала: {len(pending)}")
+        return len(pending)
+
+    async def _redeliver(self, stored: StoredJob) -> None:
+        """Повторная доставка ответа, сохранённого в журнале."""
+        job = stored.job
+        try:
+            if job.status_message_id is None:
+                status = await self.deliver_stage.run(self._send, job, "⏳ Восстанавливаю результат...")
+                job.status_message_id = status.message_id
+                await self.job_store.update_job(job)
+            await self._finish(job, stored.state, stored.result_text, stored.delivered_parts)
+        except Exception as e:
+            logger.error(f"Ошибка повторной доставки задачи {job.job_id}: {e}", exc_info=True)
+
+    async def execute(
+        self,
+        job: MediaJob,
+        on_status: Optional[StatusCallback] = None,
+        on_segment: Optional[SegmentCallback] = None
+    ) -> Union[TranscriptionResult, LongTranscriptionResult]:
+        """
+        Рабочая часть конвейера: fetch → decode → infer в рабочей директории задачи.
+
+        Args:
+            job: Задача на распознавание
+            on_status: Колбэк для промежуточного статуса
+            on_segment: Колбэк для частей длинной записи по мере распознавания
+
+        Returns:
+            Результат транскрибации
+        """
+        trace = JobTrace(job.job_id)
+        started_at = trace.started_at
+        workspaces = self.file_service.workspaces
+        workspace = await workspaces.acquire(
+            job.job_id,
+            reserve_bytes=workspaces.estimate_job_bytes(job.file_size, job.duration)
+        )
+        trace.record("wait:workspace", started_at, time.perf_counter())
+
+        try:
+            async with self.fetch_stage.slot(trace):
+                source_path = await self.fetch(job, workspace, trace)
+            async with self.decode_stage.slot(trace):
+                wav_path, duration = await self.decode(job, source_path, workspace, trace)
+            job.duration = duration
+
+            if on_status is not None:
+                if self.transcribe_service.is_ready:
+                    await on_status(f"⏳ Распознаю речь ({duration:.1f}с)...")
+                else:
+                    await on_status("⏳ Модель загружается, задача в очереди...")
+
+            async with self.infer_stage.slot(trace):
+                result = await self.infer(job, wav_path, workspace, on_segment, trace)
+            result.trace = trace
+            if duration > 0:
+                JOB_RTF.labels(kind=job.kind).observe((time.perf_counter() - started_at) / duration)
+                AUDIO_SECONDS.labels(kind=job.kind).inc(duration)
+            return result
+        finally:
+            await workspaces.release(workspace)
+            trace_logger.info(json.dumps({
+                **trace.to_dict(),
+                "kind": job.kind,
+                "audio_sec": job.duration,
+                "file_size": job.file_size,
+            }, ensure_ascii=False))
+
+    async def fetch(self, job: MediaJob, workspace: JobWorkspace, trace: Optional[JobTrace] = None) -> Path:
+        """Стадия fetch: скачивание файла из Telegram в рабочую директорию."""
+        if job.source_path is not None:
+            # Локальный файл обрабатывается на месте
+            return Path(job.source_path)
+
+        tg_file = await self.bot.get_file(job.file_id)
+
+        extension = job.extension or Path(tg_file.file_path).suffix.lstrip(".") or "bin"
+        destination = workspace.generate_temp_path(prefix=job.kind, extension=extension)
+
+        path = await self.file_service.download_file(
+            tg_file.file_path,
+            destination=destination,
+            bot_token=self.bot_token,
+            expected_size=tg_file.file_size,
+            trace=trace
+        )
+        DOWNLOAD_BYTES.inc(path.stat().st_size)
+        return path
+
+    async def decode(
+        self,
+        job: MediaJob,
+        source_path: Path,
+        workspace: JobWorkspace,
+        trace: Optional[JobTrace] = None
+    ) -> Tuple[Path, float]:
+        """Стадия decode: конвертация (или извлечение из видео) в WAV 16 кГц."""
+        keep_source = job.source_path is not None
+        if job.is_video:
+            return await self.audio_service.prepare_video_note(
+                source_path, job.user_id, job.message_id,
+                workspace=workspace, keep_source=keep_source, trace=trace
+            )
+        return await self.audio_service.prepare_audio_file(
+            source_path, job.user_id, job.message_id,
+            workspace=workspace, keep_source=keep_source, trace=trace
+        )
+
+    async def infer(
+        self,
+        job: MediaJob,
+        wav_path: Path,
+        workspace: JobWorkspace,
+        on_segment: Optional[SegmentCallback] = None,
+        trace: Optional[JobTrace] = None
+    ) -> Union[TranscriptionResult, LongTranscriptionResult]:
+        """
+        Стадия infer: распознавание речи моделью.
+
+        С журналом задач результаты частей длинной записи сохраняются,
+        и при ошибке распознавание повторяется только для недостающих частей.
+        """
+        checkpoints = self.job_store.checkpoints(job.job_id) if self.job_store is not None else None
+        attempts = self.max_attempts if checkpoints is not None else 1
+
+        for attempt in range(1, attempts + 1):
+            result = await self.transcribe_service.transcribe_auto(
+                wav_path,
+                hf_token=self.hf_token,
+                workspace=workspace,
+                checkpoints=checkpoints,
+                on_segment=on_segment,
+                duration=job.duration,
+                user_id=job.user_id,
+                message_id=job.message_id,
+                trace=trace
+            )
+            if not isinstance(result, TranscriptionResult) or result.is_success or attempt == attempts:
+                return result
+            logger.warning(
+                f"Ошибка распознавания задачи {job.job_id}: {result.error}, "
+                f"повтор {attempt + 1}/{attempts}"
+            )
+
+    async def _send(self, job: MediaJob, text: str):
+        """Отправка нового сообщения в чат задачи."""
+        return await self.delivery.send(job.chat_id, text)
+
+    async def _edit(self, job: MediaJob, text: str) -> None:
+        """Редактирование статусного сообщения задачи."""
+        await self.delivery.edit(job.chat_id, job.status_message_id, text)
+
+    async def _deliver_result(self, job: MediaJob, text: str, skip_parts: int = 0) -> None:
+        """Доставка итогового текста вместо статусного сообщения."""
+        on_part = None
+        if self.job_store is not None:
+            async def on_part(parts: int) -> None:
+                await self.job_store.mark_part_delivered(job.job_id, parts)
+
+        await self.delivery.deliver_result(
+            job.chat_id,
+            job.status_message_id,
+            text,
+            parse_mode="Markdown",
+            filename=f"transcript_{job.message_id}.txt",
+            skip_parts=skip_parts,
+            on_part=on_part
+        )
+
+
+def format_result(
+    job: MediaJob,
+    result: Union[TranscriptionResult, LongTranscriptionResult]
+) -> str:
+    """
+    Формирование текста ответа по результату транскрибации.
+
+    Args:
+        job: Задача на распознавание
+        result: Результат транскрибации
+
+    Returns:
+        Текст ответа (Markdown)
+    """
+    title = f"📝 *Распознанный текст ({job.file_name}):*" if job.file_name else "📝 *Распознанный текст:*"
+
+    if isinstance(result, TranscriptionResult):
+        if not result.is_success:
+            return f"❌ Ошибка распознавания: {result.error}"
+        return (
+            f"{title}\n\n"
+            f"{result.text}\n\n"
+            f"⏱ Время обработки: {result.processing_time_sec:.2f}с"
+        )
+
+    # LongTranscriptionResult
+    response_text = f"{title}\n\n"
+    for utterance in result.utterances:
+        response_text += f"{utterance}\n"
+    response_text += f"\n⏱ Общее время: {result.total_duration:.1f}с"
+    return response_text
+
+
+def result_text(result: Union[TranscriptionResult, LongTranscriptionResult]) -> str:
+    """Полный текст результата любого вида."""
+    if isinstance(result, LongTranscriptionResult):
+        return result.full_text
+    return result.text
+
+
+def result_segments(
+    result: Union[TranscriptionResult, LongTranscriptionResult],
+    duration: float
+) -> List[Utterance]:
+    """Реплики с таймкодами из результата любого вида."""
+    if isinstance(result, LongTranscriptionResult):
+        return result.utterances
+    if result.segments:
+        # Последняя часть короче остальных
+        segments = list(result.segments)
+        last = segments[-1]
+        segments[-1] = Utterance(last.text, last.start_time, min(last.end_time, duration))
+        return segments
+    if result.text:
+        return [Utterance(result.text, 0.0, duration)]
+    return []
@@ -0,0 +1,243 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilerBusyError(Exception):
+    """Профилирование уже выполняется."""
+
+
+@dataclass
+class ProfileReport:
+    """Итог профилирования."""
+    seconds: float
+    samples: int
+    summary: str
+    files: List[Path] = field(default_factory=list)
+
+
+class StackProfiler:
+    """
+    Сэмплирующий профайлер всех потоков процесса.
+
+    Фоновый поток с заданным интервалом снимает стеки всех остальных
+    потоков (event loop, пул потоков модели, ffmpeg-обёртки) через
+    ``sys._current_frames``. В отличие от cProfile, видит все потоки
+    сразу и почти не замедляет работу бота, поэтому подходит для
+    включения на работающем сервере.
+
+    Результат - файл свёрнутых стеков (формат flamegraph.pl / speedscope)
+    и текстовая сводка самых частых функций.
+    """
+
+    def __init__(self, output_dir: Path, interval_ms: float = 5.0, top_n: int = 20):
+        self.output_dir = output_dir
+        self.interval_sec = max(interval_ms, 1.0) / 1000
+        self.top_n = top_n
+        self._lock = asyncio.Lock()
+        self._signal_task: Optional[asyncio.Task] = None
+
+    @property
+    def busy(self) -> bool:
+        """Выполняется ли профилирование."""
+        return self._lock.locked()
+
+    async def capture(self, seconds: float) -> ProfileReport:
+        """
+        Профилирование в течение заданного времени.
+
+        Args:
+            seconds: Длительность профилирования
+
+        Returns:
+            Сводка и пути к файлам профиля
+
+        Raises:
+            ProfilerBusyError: Профилирование уже выполняется
+        """
+        if self._lock.locked():
+            raise ProfilerBusyError("Профилирование уже выполняется")
+
+        async with self._lock:
+            logger.info(f"Профилирование потоков: {seconds:.0f}с")
+            stacks, samples = await asyncio.to_thread(self._sample, seconds)
+            return await asyncio.to_thread(self._write, stacks, samples, seconds)
+
+    def schedule(self, loop: asyncio.AbstractEventLoop, seconds: float) -> None:
+        """
+        Запуск профилирования из обработчика сигнала.
+
+        Сводка пишется в лог, файлы профиля - в output_dir.
+
+        Args:
+            loop: Event loop бота
+            seconds: Длительность профилирования
+        """
+        def start():
+            if self.busy:
+                logger.warning("Профилирование уже выполняется, сигнал пропущен")
+                return
+            self._signal_task = loop.create_task(self._capture_and_log(seconds))
+
+        loop.call_soon_threadsafe(start)
+
+    async def _capture_and_log(self, seconds: float) -> None:
+        try:
+            report = await self.capture(seconds)
+            logger.info(f"Профиль по сигналу:\n{report.summary}")
+        except Exception as e:
+            logger.error(f"Ошибка профилирования: {e}")
+
+    def _sample(self, seconds: float) -> Tuple[Counter, int]:
+        """Сбор стеков (выполняется в отдельном потоке)."""
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        names = {}
+        samples = 0
+        deadline = time.perf_counter() + seconds
+
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                stacks[tuple(reversed(stack))] += 1
+            samples += 1
+            time.sleep(self.interval_sec)
+
+        return stacks, samples
+
+    def _write(self, stacks: Counter, samples: int, seconds: float) -> ProfileReport:
+        """Запись свёрнутых стеков и сводки."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        folded_path = self.output_dir / f"profile_{stamp}.folded"
+        summary_path = self.output_dir / f"profile_{stamp}.txt"
+
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(";".join(part.replace(";", ",") for part in stack) + f" {count}\n")
+
+        summary = self.summarize(stacks, samples, seconds)
+        summary_path.write_text(summary, encoding="utf-8")
+        logger.info(f"Профиль сохранён: {folded_path}")
+        return ProfileReport(seconds, samples, summary, [folded_path, summary_path])
+
+    def summarize(self, stacks: Counter, samples: int, seconds: float) -> str:
+        """
+        Текстовая сводка: доля потоков и самые частые функции.
+
+        «Собственное» время - функция на вершине стека, «общее» - функция
+        где-либо в стеке (с вызываемыми ею функциями).
+        """
+        threads: Counter = Counter()
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in stacks.items():
+            threads[stack[0]] += count
+            if len(stack) > 1:
+                own[stack[-1]] += count
+                for function in set(stack[1:]):
+                    total[function] += count
+
+        def share(count: int) -> str:
+            return f"{count / samples * 100:5.1f}%" if samples else "    -"
+
+        lines = [f"Профиль {seconds:.0f}с, снимков: {samples}", "", "Потоки:"]
+        lines += [f"{share(count)}  {name}" for name, count in threads.most_common(self.top_n)]
+        lines += ["", "Собственное время:"]
+        lines += [f"{share(count)}  {name}" for name, count in own.most_common(self.top_n)]
+        lines += ["", "Общее время:"]
+        lines += [f"{share(count)}  {name}" for name, count in total.most_common(self.top_n)]
+        return "\n".join(lines)
+
+
+class TorchProfiler:
+    """
+    Профилирование следующих N вызовов модели через torch.profiler.
+
+    Каждый профилированный вызов сохраняется как Chrome trace
+    (открывается в chrome://tracing или Perfetto) вместе с таблицей
+    самых затратных операторов.
+    """
+
+    def __init__(self, output_dir: Path, top_n: int = 20):
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self._remaining = 0
+        self._counter_lock = threading.Lock()
+        # Одновременно активен только один torch.profiler
+        self._profile_lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        """Сколько вызовов ещё будет профилировано."""
+        return self._remaining
+
+    def arm(self, count: int) -> None:
+        """Профилировать следующие ``count`` вызовов модели."""
+        with self._counter_lock:
+            self._remaining = max(0, count)
+
+    def run(self, func: Callable, *args):
+        """
+        Вызов модели (в потоке пула) с профилированием, если оно включено.
+
+        Args:
+            func: Метод модели
+            *args: Аргументы вызова
+
+        Returns:
+            Результат вызова
+        """
+        with self._counter_lock:
+            if self._remaining <= 0:
+                profile = False
+            else:
+                self._remaining -= 1
+                profile = True
+        if not profile:
+            return func(*args)
+
+        with self._profile_lock:
+            return self._profile(func, *args)
+
+    def _profile(self, func: Callable, *args):
+        import torch
+        from torch.profiler import ProfilerActivity, profile
+
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+
+        with profile(activities=activities, record_shapes=True) as prof:
+            result = func(*args)
+
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            trace_path = self.output_dir / f"torch_{stamp}.json"
+            prof.export_chrome_trace(str(trace_path))
+            table = prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=self.top_n)
+            trace_path.with_suffix(".txt").write_text(table, encoding="utf-8")
+            logger.info(f"Профиль torch сохранён: {trace_path}")
+        except Exception as e:
+            logger.error(f"Ошибка сохранения профиля torch: {e}")
+
+        return result
@@ -1,59 +1,440 @@
 import asyncio
+import functools
+import gc
+import math
 import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
 import time
+import wave
 from pathlib import Path
-from typing import Optional, Union, List, Dict
+from typing import Awaitable, Callable, Optional, Union, List, Dict, Tuple
 import logging
 
 from bot.models.audio import TranscriptionResult, AudioInfo
-from bot.models.transcribe import LongTranscriptionResult
+from bot.models.trace import JobTrace, trace_span
+from bot.models.transcribe import LongTranscriptionResult, Utterance
+from bot.services.asr_backend_service import create_backend
+from bot.services.job_store_service import ChunkCheckpoints
+from bot.services.model_cache_service import ModelCache
+from bot.services.workspace_service import JobWorkspace
+from bot.utils.memory import trim_heap
+from bot.utils.metrics import MODEL_LOADED, MODEL_UNLOADS_TOTAL
 
 logger = logging.getLogger(__name__)
 
+# Длительность части при разбиении длинного аудио
+CHUNK_DURATION_SEC = 20
+
+# Максимальный интервал проверки простоя модели
+IDLE_CHECK_INTERVAL_SEC = 10.0
+
+SegmentCallback = Callable[[Utterance], Awaitable[None]]
+
+
+def _uses_model(method):
+    """Вызов, использующий модель: пока он выполняется, модель не выгружается по простою."""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        self._in_use += 1
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            self._in_use -= 1
+            self._last_used = time.monotonic()
+    return wrapper
+
+
+class _Batcher:
+    """
+    Сборка записей из одновременных вызовов в батчи модели.
+
+    Батч уходит в модель, когда набрано ``batch_size`` записей или с
+    первой записи прошло ``wait_sec``; одновременно выполняется не больше
+    ``concurrency`` батчей. Если батч целиком завершился ошибкой, его
+    записи распознаются по одной, чтобы ошибка досталась только своему
+    вызову (например, "Too long" - для разбиения на части).
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[str]], List[str]],
+        batch_size: int,
+        wait_sec: float,
+        concurrency: int
+    ):
+        self.run_batch = run_batch
+        self.batch_size = batch_size
+        self.wait_sec = wait_sec
+        self._slots = asyncio.Semaphore(concurrency)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def submit(self, audio_path: str) -> str:
+        """Распознавание одной записи в составе батча."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((audio_path, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.wait_sec, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            items = self._pending[:self.batch_size]
+            self._pending = self._pending[self.batch_size:]
+            task = asyncio.ensure_future(self._run(items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: List[Tuple[str, asyncio.Future]]) -> None:
+        async with self._slots:
+            # Записи отменённых вызовов в модель не отправляем
+            items = [(path, future) for path, future in items if not future.done()]
+            if not items:
+                return
+            loop = asyncio.get_running_loop()
+            try:
+                texts = await loop.run_in_executor(None, self.run_batch, [path for path, _ in items])
+            except Exception as e:
+                if len(items) == 1:
+                    _set_exception(items[0][1], e)
+                    return
+                logger.warning(f"Ошибка батча из {len(items)} записей ({e}), распознаём по одной")
+                for path, future in items:
+                    try:
+                        text = (await loop.run_in_executor(None, self.run_batch, [path]))[0]
+                    except Exception as item_error:
+                        _set_exception(future, item_error)
+                    else:
+                        if not future.done():
+                            future.set_result(text)
+                return
+
+            for (_, future), text in zip(items, texts):
+                if not future.done():
+                    future.set_result(text)
+
+
+def _set_exception(future: asyncio.Future, error: Exception) -> None:
+    if not future.done():
+        future.set_exception(error)
+
 
 class TranscribeService:
-    """Сервис для транскрибации с использованием GigaAM."""
+    """
+    Сервис для транскрибации с использованием GigaAM.
+
+    Модель выполняет движок ``backend`` (см. asr_backend_service):
+    ``torch`` - PyTorch на CPU или CUDA, ``onnx`` - энкодер в ONNX Runtime
+    на CPU.
+
+    С ``load=False`` модель не загружается в конструкторе: её загружает
+    ``load()`` в фоновом потоке, а вызовы распознавания до окончания
+    загрузки ждут её.
+
+    Если задан ``model_cache``, собранная модель берётся из локального
+    кэша, а при его отсутствии сохраняется туда после загрузки.
+
+    С ``idle_unload_sec`` > 0 модель, не использовавшаяся это время,
+    выгружается из памяти (см. ``start_idle_unload``) и загружается
+    снова при следующем вызове распознавания; вызовы ждут загрузки и
+    повторного прогрева с параметрами последнего ``warmup``.
+
+    С ``batch_size`` > 1 и движком, поддерживающим батчи, короткие записи
+    одновременных вызовов и части длинных записей распознаются батчами
+    через ``transcribe_batch`` (не больше ``batch_concurrency`` батчей
+    одновременно, сбор батча - не дольше ``batch_wait_ms``).
+    """
     
-    def __init__(self, model_name: str = "v3_e2e_rnnt", device: str = "auto"):
+    def __init__(
+        self,
+        model_name: str = "v3_e2e_rnnt",
+        device: str = "auto",
+        scratch_dir: Optional[Path] = None,
+        load: bool = True,
+        model_cache: Optional[ModelCache] = None,
+        idle_unload_sec: float = 0,
+        backend: str = "torch",
+        onnx_dir: Optional[Path] = None,
+        onnx_threads: int = 0,
+        batch_size: int = 1,
+        batch_wait_ms: float = 20,
+        batch_concurrency: int = 1
+    ):
         self.model_name = model_name
-        self.device = self._get_device(device)
+        self.model_cache = model_cache
+        self.idle_unload_sec = idle_unload_sec
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.onnx_threads = onnx_threads
+        self.batch_size = max(1, batch_size)
+        self.batch_wait_sec = max(batch_wait_ms, 0) / 1000
+        self.batch_concurrency = max(1, batch_concurrency)
+        # "auto" определяется при загрузке: импорт torch - самая долгая часть запуска
+        self.device = device
+        self.scratch_dir = scratch_dir
+        # Загруженный движок распознавания (AsrBackend)
         self.model = None
-        self._load_model()
-    
-    def _get_device(self, device: str) -> str:
-        """Определение устройства."""
-        import torch
-        
-        if device == "auto":
-            return "cuda" if torch.cuda.is_available() else "cpu"
-        return device
+        self.load_time_sec: Optional[float] = None
+        # Прошёл ли прогрев (первые вызовы модели включают ленивую инициализацию)
+        self.is_warm = False
+        # Ошибка последнего прогрева (None - прогрев прошёл или не выполнялся)
+        self.warmup_error: Optional[str] = None
+        # Профайлер вызовов модели (включается командой /profile)
+        self.torch_profiler = None
+        # Модель выгружена по простою и загрузится при следующем вызове
+        self.idle_unloaded = False
+        # Параметры последнего прогрева: с ними модель прогревается после повторной загрузки
+        self._warmup_params: Optional[Dict[str, float]] = None
+        self._load_task: Optional[asyncio.Future] = None
+        self._idle_task: Optional[asyncio.Task] = None
+        self._in_use = 0
+        self._last_used = time.monotonic()
+        self._batcher: Optional[_Batcher] = None
+        MODEL_LOADED.set_function(lambda: 1 if self.model is not None else 0)
+        if load:
+            self._load_model()
+
+    @property
+    def is_ready(self) -> bool:
+        """Загружена ли модель."""
+        return self.model is not None
+
+    @property
+    def is_available(self) -> bool:
+        """Может ли сервис принимать задачи: модель загружена или выгружена по простою."""
+        return self.model is not None or self.idle_unloaded
+
+    @property
+    def is_warmed_up(self) -> bool:
+        """Прогрев пройден; выгруженная по простою модель прогреется при загрузке."""
+        return self.is_warm or (self.idle_unloaded and self.warmup_error is None)
+
+    async def load(self) -> None:
+        """
+        Загрузка модели в фоновом потоке.
+
+        Повторные и одновременные вызовы ждут ту же загрузку (вместе с
+        повторным прогревом); после ошибки следующий вызов пробует загрузить
+        модель заново.
+        """
+        if self._load_task is None:
+            if self.model is not None:
+                return
+            self._load_task = asyncio.ensure_future(self._load_and_warm())
+        task = self._load_task
+        try:
+            await asyncio.shield(task)
+        except Exception:
+            if self._load_task is task:
+                self._load_task = None
+            raise
     
+    async def _load_and_warm(self) -> None:
+        """Загрузка модели и, если она уже прогревалась до выгрузки, повторный прогрев."""
+        await asyncio.to_thread(self._load_model)
+        if self._warmup_params is not None:
+            await self._warm(**self._warmup_params)
+        self.idle_unloaded = False
+
     def _load_model(self):
         """Загрузка модели GigaAM."""
         try:
-            import gigaam
-            
-            logger.info(f"Загрузка модели GigaAM: {self.model_name} на {self.device}")
-            self.model = gigaam.load_model(
+            started = time.perf_counter()
+            backend = create_backend(
+                self.backend,
                 self.model_name,
-                device=self.device
+                self.device,
+                model_cache=self.model_cache,
+                onnx_dir=self.onnx_dir,
+                onnx_threads=self.onnx_threads
+            )
+            backend.load()
+            self.device = backend.device
+            self.model = backend
+            self._last_used = time.monotonic()
+            self.load_time_sec = time.perf_counter() - started
+            logger.info(
+                f"Модель GigaAM успешно загружена за {self.load_time_sec:.1f}с "
+                f"(движок {backend.capabilities.name}, {self.device})"
             )
-            logger.info(f"Модель GigaAM успешно загружена")
             
         except Exception as e:
             logger.error(f"Ошибка загрузки модели GigaAM: {e}")
             raise
+
+    async def unload(self) -> bool:
+        """
+        Выгрузка модели из памяти.
+
+        Следующий вызов распознавания загрузит и прогреет модель заново.
+        Сборка мусора и возврат памяти системе выполняются в потоке.
+
+        Returns:
+            True, если модель выгружена; False, если она не загружена или используется
+        """
+        if self.model is None or self._in_use:
+            return False
+
+        self.model = None
+        self._load_task = None
+        self.is_warm = False
+        await asyncio.to_thread(_release_memory)
+        return True
+
+    def start_idle_unload(self) -> None:
+        """Запуск фоновой выгрузки модели по простою (если задан idle_unload_sec)."""
+        if self.idle_unload_sec > 0 and self._idle_task is None:
+            self._idle_task = asyncio.create_task(self._idle_loop())
+
+    async def stop_idle_unload(self) -> None:
+        """Остановка фоновой выгрузки модели по простою."""
+        if self._idle_task is not None:
+            self._idle_task.cancel()
+            try:
+                await self._idle_task
+            except asyncio.CancelledError:
+                pass
+            self._idle_task = None
+
+    async def _idle_loop(self) -> None:
+        interval = min(self.idle_unload_sec, IDLE_CHECK_INTERVAL_SEC)
+        while True:
+            await asyncio.sleep(interval)
+            idle_sec = time.monotonic() - self._last_used
+            if idle_sec < self.idle_unload_sec or self._in_use:
+                continue
+            try:
+                if await self.unload():
+                    self.idle_unloaded = True
+                    MODEL_UNLOADS_TOTAL.inc()
+                    logger.info(f"Модель GigaAM выгружена после {idle_sec:.0f}с простоя")
+            except Exception as e:
+                logger.error(f"Ошибка выгрузки модели: {e}")
     
+    async def warmup(self, runs: int = 1, duration_sec: float = 3.0, concurrency: int = 1) -> float:
+        """
+        Прогрев модели синтетической записью.
+
+        Первые вызовы модели в каждом потоке пула включают ленивую
+        инициализацию torch и gigaam; прогрев переносит её на запуск.
+        Ошибка прогрева пишется в лог и в ``warmup_error``, а ``is_warm``
+        остаётся False: проверка готовности не проходит.
+
+        Args:
+            runs: Количество прогонов
+            duration_sec: Длительность синтетической записи
+            concurrency: Одновременных вызовов в прогоне (как PIPELINE_INFER_CONCURRENCY)
+
+        Returns:
+            Время прогрева в секундах
+        """
+        await self.load()
+        self._warmup_params = {"runs": runs, "duration_sec": duration_sec, "concurrency": concurrency}
+        return await self._warm(runs, duration_sec, concurrency)
+
+    @_uses_model
+    async def _warm(self, runs: int, duration_sec: float, concurrency: int) -> float:
+        """Прогрев уже загруженной модели (см. ``warmup``)."""
+        if runs <= 0:
+            self.is_warm = True
+            self.warmup_error = None
+            return 0.0
+
+        started = time.perf_counter()
+        directory = self.scratch_dir or Path(tempfile.gettempdir())
+        audio_path = directory / f"warmup_{os.getpid()}.wav"
+
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(_write_warmup_audio, audio_path, duration_sec)
+            loop = asyncio.get_running_loop()
+            for _ in range(max(runs, 0)):
+                await asyncio.gather(*(
+                    loop.run_in_executor(None, self.model.transcribe, str(audio_path))
+                    for _ in range(max(concurrency, 1))
+                ))
+        except Exception as e:
+            self.is_warm = False
+            self.warmup_error = str(e)
+            logger.error(f"Ошибка прогрева модели, модель не готова: {e}")
+            return time.perf_counter() - started
+        finally:
+            audio_path.unlink(missing_ok=True)
+
+        self.is_warm = True
+        self.warmup_error = None
+        elapsed = time.perf_counter() - started
+        logger.info(f"Прогрев модели завершён за {elapsed:.1f}с")
+        return elapsed
+
+    def _run_model(self, method: Callable, audio_path: Union[str, List[str]]):
+        """Вызов модели в потоке пула (с профилированием, если оно включено)."""
+        if self.torch_profiler is not None:
+            return self.torch_profiler.run(method, audio_path)
+        return method(audio_path)
+
+    @property
+    def batching(self) -> bool:
+        """Распознаются ли короткие записи батчами."""
+        return self.batch_size > 1 and self.model is not None and self.model.capabilities.batch
+
+    def _run_batch(self, audio_paths: List[str]) -> List[str]:
+        """Вызов модели на нескольких записях (в потоке пула)."""
+        if len(audio_paths) == 1:
+            return [self._run_model(self.model.transcribe, audio_paths[0])]
+        return self._run_model(self.model.transcribe_files, audio_paths)
+
+    async def _infer(self, audio_paths: List[str]) -> List[str]:
+        """
+        Распознавание записей не длиннее ``capabilities.max_audio_sec``.
+
+        Args:
+            audio_paths: Пути к записям
+
+        Returns:
+            Тексты в порядке записей
+        """
+        loop = asyncio.get_running_loop()
+        if not self.batching:
+            return [
+                await loop.run_in_executor(None, self._run_model, self.model.transcribe, audio_path)
+                for audio_path in audio_paths
+            ]
+        if self._batcher is None:
+            self._batcher = _Batcher(
+                self._run_batch, self.batch_size, self.batch_wait_sec, self.batch_concurrency
+            )
+        return list(await asyncio.gather(*(self._batcher.submit(path) for path in audio_paths)))
+
     def _set_hf_token(self, hf_token: Optional[str] = None):
         """Установка HF токена для длинных аудио."""
         if hf_token:
             os.environ["HF_TOKEN"] = hf_token
             logger.debug("HF токен установлен")
     
+    @_uses_model
     async def transcribe(
         self,
         audio_path: Path,
-        max_duration_sec: int = 300
+        max_duration_sec: int = 300,
+        workspace: Optional[JobWorkspace] = None,
+        checkpoints: Optional[ChunkCheckpoints] = None,
+        on_segment: Optional[SegmentCallback] = None,
+        duration: Optional[float] = None,
+        user_id: int = 0,
+        message_id: int = 0,
+        trace: Optional[JobTrace] = None
     ) -> TranscriptionResult:
         """
         Транскрибация аудио с автоматическим разбиением на части.
@@ -61,35 +442,44 @@ class TranscribeService:
         Args:
             audio_path: Путь к аудиофайлу
             max_duration_sec: Максимальная длительность аудио
+            workspace: Рабочая директория задачи (для чанков)
+            checkpoints: Хранилище результатов частей (для повторных попыток)
+            on_segment: Колбэк для каждой распознанной части длинного аудио
+            duration: Длительность аудио, если уже известна (иначе определяется ffprobe)
+            user_id: ID пользователя
+            message_id: ID сообщения
+            trace: Трассировка задачи (этапы inference, split)
 
         Returns:
             Результат транскрибации
         """
         from datetime import datetime
         from bot.utils import get_audio_duration
-        import shutil
+
+        if duration is None:
+            with trace_span(trace, "probe") as span:
+                duration = await get_audio_duration(audio_path)
+                span.audio_sec = duration
+
+        await self.load()
 
         audio_info = AudioInfo(
             file_path=str(audio_path),
-            duration=audio_path.stat().st_size,
+            duration=duration,
             format=audio_path.suffix,
             size_bytes=audio_path.stat().st_size,
             sample_rate=16000,
             channels=1,
-            user_id=0,
-            message_id=0,
+            user_id=user_id,
+            message_id=message_id,
             received_at=datetime.now()
         )
 
         start_time = time.time()
 
         try:
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
-                self.model.transcribe,
-                str(audio_path)
-            )
+            with trace_span(trace, "inference", audio_sec=duration):
+                result = (await self._infer([str(audio_path)]))[0]
 
             processing_time = time.time() - start_time
             logger.info(f"Транскрибация завершена за {processing_time:.2f}с")
@@ -99,13 +489,16 @@ class TranscribeService:
                 audio_info=audio_info,
                 processing_time_sec=processing_time,
                 model_name=self.model_name,
-                error=None
+                error=None,
+                trace=trace
             )
 
         except ValueError as e:
             if "Too long" in str(e):
                 logger.warning("Аудио слишком длинное, разбиваем на части")
-                return await self._transcribe_chunked(audio_path, audio_info, start_time)
+                return await self._transcribe_chunked(
+                    audio_path, audio_info, start_time, workspace, checkpoints, on_segment, trace
+                )
             raise
         except Exception as e:
             logger.error(f"Ошибка транскрибации: {e}")
@@ -114,39 +507,82 @@ class TranscribeService:
                 audio_info=audio_info,
                 processing_time_sec=time.time() - start_time,
                 model_name=self.model_name,
-                error=str(e)
+                error=str(e),
+                trace=trace
             )
 
     async def _transcribe_chunked(
         self,
         audio_path: Path,
         audio_info,
-        start_time: float
+        start_time: float,
+        workspace: Optional[JobWorkspace] = None,
+        checkpoints: Optional[ChunkCheckpoints] = None,
+        on_segment: Optional[SegmentCallback] = None,
+        trace: Optional[JobTrace] = None
     ) -> TranscriptionResult:
-        """Транскрибация длинного аудио с разбивкой на части."""
+        """
+        Транскрибация длинного аудио с разбивкой на части.
+
+        Результат каждой части сохраняется в ``checkpoints`` сразу после
+        распознавания, а уже сохранённые части повторно не распознаются.
+        Готовые части по порядку передаются в ``on_segment``.
+        """
         from bot.utils import split_audio
-        import tempfile
-        import shutil
 
-        chunk_dir = Path(tempfile.mkdtemp(prefix="chunks_"))
+        # Чанки кладём в рабочую директорию задачи или в scratch-директорию
+        if workspace is not None:
+            chunk_dir = Path(tempfile.mkdtemp(prefix="chunks_", dir=workspace.path))
+        else:
+            chunk_dir = Path(tempfile.mkdtemp(prefix="chunks_", dir=self.scratch_dir))
         all_text = []
+        segments = []
 
         try:
+            done = await checkpoints.load() if checkpoints is not None else {}
+
             # Разбиваем аудио на части по 20 секунд
-            chunks = await split_audio(audio_path, chunk_dir, chunk_duration_sec=20)
+            with trace_span(trace, "split", bytes=audio_path.stat().st_size):
+                chunks = await split_audio(audio_path, chunk_dir, chunk_duration_sec=CHUNK_DURATION_SEC)
             logger.info(f"Аудио разбито на {len(chunks)} частей")
+            if done:
+                logger.info(f"Восстановлено {len(done)} ранее распознанных частей")
 
-            # Транскрибируем каждую часть
-            for i, chunk_path in enumerate(chunks):
-                logger.info(f"Транскрибация части {i + 1}/{len(chunks)}")
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    None,
-                    self.model.transcribe,
-                    str(chunk_path)
-                )
-                if result:
-                    all_text.append(result)
+            # Транскрибируем части: по одной или окнами по batch_size
+            window = self.batch_size if self.batching else 1
+            for start in range(0, len(chunks), window):
+                indexes = range(start, min(start + window, len(chunks)))
+                todo = [i for i in indexes if float(i * CHUNK_DURATION_SEC) not in done]
+                if todo:
+                    if len(todo) == 1:
+                        logger.info(f"Транскрибация части {todo[0] + 1}/{len(chunks)}")
+                    else:
+                        logger.info(f"Транскрибация частей {todo[0] + 1}-{todo[-1] + 1}/{len(chunks)}")
+                    chunks_sec = sum(
+                        min(CHUNK_DURATION_SEC, max(audio_info.duration - i * CHUNK_DURATION_SEC, 0.0))
+                        for i in todo
+                    )
+                    with trace_span(trace, "inference", audio_sec=chunks_sec):
+                        texts = await self._infer([str(chunks[i]) for i in todo])
+                    for i, text in zip(todo, texts):
+                        offset = float(i * CHUNK_DURATION_SEC)
+                        done[offset] = text
+                        if checkpoints is not None:
+                            await checkpoints.save(offset, text or "")
+
+                for i in indexes:
+                    offset = float(i * CHUNK_DURATION_SEC)
+                    result = done[offset]
+                    if result:
+                        all_text.append(result)
+                        segment = Utterance(
+                            text=result,
+                            start_time=offset,
+                            end_time=offset + CHUNK_DURATION_SEC
+                        )
+                        segments.append(segment)
+                        if on_segment is not None:
+                            await on_segment(segment)
 
             processing_time = time.time() - start_time
             combined_text = " ".join(all_text)
@@ -158,7 +594,9 @@ class TranscribeService:
                 audio_info=audio_info,
                 processing_time_sec=processing_time,
                 model_name=self.model_name,
-                error=None
+                error=None,
+                segments=segments,
+                trace=trace
             )
 
         except Exception as e:
@@ -168,17 +606,20 @@ class TranscribeService:
                 audio_info=audio_info,
                 processing_time_sec=time.time() - start_time,
                 model_name=self.model_name,
-                error=str(e)
+                error=str(e),
+                trace=trace
             )
         finally:
             # Удаляем временную директорию с чанками
             shutil.rmtree(chunk_dir, ignore_errors=True)
     
+    @_uses_model
     async def transcribe_long(
         self,
         audio_path: Path,
         hf_token: Optional[str] = None,
-        max_duration_sec: int = 300
+        max_duration_sec: int = 300,
+        trace: Optional[JobTrace] = None
     ) -> LongTranscriptionResult:
         """
         Транскрибация длинного аудио с использованием VAD.
@@ -187,11 +628,13 @@ class TranscribeService:
             audio_path: Путь к аудиофайлу
             hf_token: Токен Hugging Face (требуется для pyannote.audio)
             max_duration_sec: Максимальная длительность аудио
+            trace: Трассировка задачи (этап inference)
         
         Returns:
             Результат транскрибации длинного аудио
         """
         self._set_hf_token(hf_token)
+        await self.load()
         
         start_time = time.time()
         
@@ -199,18 +642,22 @@ class TranscribeService:
             import asyncio
             
             # Запускаем транскрибацию в отдельном потоке
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
-                self.model.transcribe_longform,
-                str(audio_path)
-            )
+            with trace_span(trace, "inference"):
+                loop = asyncio.get_event_loop()
+                result = await loop.run_in_executor(
+                    None,
+                    self._run_model,
+                    self.model.transcribe_longform,
+                    str(audio_path)
+                )
             
             processing_time = time.time() - start_time
             
             logger.info(f"Длинная транскрибация завершена за {processing_time:.2f}с")
             
-            return LongTranscriptionResult.from_dict(result)
+            long_result = LongTranscriptionResult.from_dict(result)
+            long_result.trace = trace
+            return long_result
             
         except Exception as e:
             logger.error(f"Ошибка длинной транскрибации: {e}")
@@ -220,7 +667,14 @@ class TranscribeService:
         self,
         audio_path: Path,
         hf_token: Optional[str] = None,
-        max_duration_sec: int = 300
+        max_duration_sec: int = 300,
+        workspace: Optional[JobWorkspace] = None,
+        checkpoints: Optional[ChunkCheckpoints] = None,
+        on_segment: Optional[SegmentCallback] = None,
+        duration: Optional[float] = None,
+        user_id: int = 0,
+        message_id: int = 0,
+        trace: Optional[JobTrace] = None
     ) -> Union[TranscriptionResult, LongTranscriptionResult]:
         """
         Автоматический выбор метода транскрибации.
@@ -229,20 +683,62 @@ class TranscribeService:
             audio_path: Путь к аудиофайлу
             hf_token: Токен Hugging Face (для длинных аудио с VAD)
             max_duration_sec: Максимальная длительность аудио
+            workspace: Рабочая директория задачи (для промежуточных файлов)
+            checkpoints: Хранилище результатов частей (для повторных попыток)
+            on_segment: Колбэк для каждой распознанной части длинного аудио
+            duration: Длительность аудио, если уже известна (иначе определяется ffprobe)
+            user_id: ID пользователя
+            message_id: ID сообщения
+            trace: Трассировка задачи
 
         Returns:
             Результат транскрибации
         """
         from bot.utils import get_audio_duration
 
-        # Получаем длительность аудио
-        duration = await get_audio_duration(audio_path)
+        # Получаем длительность аудио (если конвейер её ещё не знает)
+        if duration is None:
+            with trace_span(trace, "probe") as span:
+                duration = await get_audio_duration(audio_path)
+                span.audio_sec = duration
 
-        # Используем longform только если есть HF токен
-        if hf_token:
+        # Используем longform только если есть HF токен и движок его поддерживает
+        await self.load()
+        if hf_token and self.model.capabilities.longform:
             logger.info(f"Используем длинную транскрибацию с VAD ({duration:.2f}с)")
-            return await self.transcribe_long(audio_path, hf_token, max_duration_sec)
+            return await self.transcribe_long(audio_path, hf_token, max_duration_sec, trace=trace)
         # Иначе используем обычную транскрибацию с авто-разбиением
         else:
             logger.info(f"Используем транскрибацию с авто-разбиением ({duration:.2f}с)")
-            return await self.transcribe(audio_path, max_duration_sec)
+            return await self.transcribe(
+                audio_path, max_duration_sec, workspace=workspace,
+                checkpoints=checkpoints, on_segment=on_segment,
+                duration=duration, user_id=user_id, message_id=message_id, trace=trace
+            )
+
+
+def _release_memory() -> None:
+    """Возврат памяти выгруженной модели (блокирующий вызов)."""
+    gc.collect()
+    # Кэш аллокатора CUDA держит память модели до явного освобождения
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    trim_heap()
+
+
+def _write_warmup_audio(path: Path, duration_sec: float, sample_rate: int = 16000) -> None:
+    """Синтетическая запись для прогрева: тон с плавающей частотой и шум (WAV 16 бит, моно)."""
+    rng = random.Random(0)
+    frames = bytearray()
+    for index in range(int(duration_sec * sample_rate)):
+        t = index / sample_rate
+        value = 0.3 * math.sin(2 * math.pi * (200 + 100 * math.sin(2 * math.pi * 3 * t)) * t)
+        value += 0.05 * rng.uniform(-1, 1)
+        frames += struct.pack("<h", int(value * 32767))
+
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
@@ -0,0 +1,295 @@
+import asyncio
+import os
+import shutil
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Префиксы директорий внутри временной директории
+WORKSPACE_PREFIX = "job_"
+TRASH_PREFIX = ".trash_"
+
+# Размер WAV 16 кГц, моно, 16 бит в секунду
+WAV_BYTES_PER_SEC = 16000 * 2
+
+# Как часто заново замерять свободное место и объём файлов задач
+DISK_REFRESH_SEC = 1.0
+
+
+class DiskBudgetExceededError(Exception):
+    """Недостаточно места во временной директории для новой задачи."""
+
+
+class JobWorkspace:
+    """Рабочая директория одной задачи."""
+
+    def __init__(self, job_id: str, path: Path, reserved_bytes: int, manager: "WorkspaceManager"):
+        self.job_id = job_id
+        self.path = path
+        self.reserved_bytes = reserved_bytes
+        self.manager = manager
+        self.created_at = time.time()
+
+    def generate_temp_path(self, prefix: str = "temp", extension: str = "tmp") -> Path:
+        """
+        Генерация пути к временному файлу внутри рабочей директории.
+
+        Args:
+            prefix: Префикс имени
+            extension: Расширение файла
+
+        Returns:
+            Путь к временному файлу
+        """
+        return self.path / f"{prefix}_{os.urandom(8).hex()}.{extension}"
+
+    def subdir(self, name: str) -> Path:
+        """Создание поддиректории (например, для чанков)."""
+        path = self.path / name
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def usage_bytes(self) -> int:
+        """Фактический объём файлов задачи на диске."""
+        return _directory_size(self.path)
+
+
+class WorkspaceManager:
+    """
+    Реестр рабочих директорий задач с общим бюджетом места.
+
+    Каждая задача получает собственную директорию ``job_<id>`` внутри
+    корневой директории. Пока задача жива, её файлы не трогает очистка.
+    Перед созданием директории резервируется оценка нужного места; если
+    бюджет исчерпан, задача ждёт освобождения места или отклоняется.
+
+    Если задан ``fallback``, задачи, не поместившиеся в бюджет, сразу
+    получают директорию у него (например, RAM-диск с откатом на обычный диск).
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        budget_mb: int = 0,
+        min_free_mb: int = 0,
+        policy: str = "wait",
+        wait_timeout_sec: int = 60,
+        fallback: Optional["WorkspaceManager"] = None
+    ):
+        if policy not in ("wait", "reject"):
+            raise ValueError(f"Неверная политика бюджета: {policy}")
+
+        self.root = root
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.min_free_bytes = min_free_mb * 1024 * 1024
+        self.policy = policy
+        self.wait_timeout_sec = wait_timeout_sec
+        self.fallback = fallback
+        self._live: Dict[str, JobWorkspace] = {}
+        self._condition = asyncio.Condition()
+        # Последний замер диска: свободно и ещё не записано по резервам
+        self._free_bytes = 0
+        self._pending_bytes = 0
+        self._measured_at: Optional[float] = None
+        root.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def reserved_bytes(self) -> int:
+        """Суммарный резерв всех живых задач."""
+        return sum(ws.reserved_bytes for ws in self._live.values())
+
+    @property
+    def live_count(self) -> int:
+        """Количество живых задач."""
+        return len(self._live)
+
+    @staticmethod
+    def estimate_job_bytes(file_size: Optional[int], duration=None) -> int:
+        """
+        Оценка места, нужного задаче.
+
+        Исходный файл + WAV + чанки того же объёма. Если длительность
+        неизвестна, считаем, что WAV в несколько раз больше сжатого исходника.
+
+        Args:
+            file_size: Размер исходного файла в байтах
+            duration: Длительность в секундах или timedelta (если известна)
+
+        Returns:
+            Оценка в байтах
+        """
+        file_size = file_size or 0
+        if hasattr(duration, "total_seconds"):
+            duration = duration.total_seconds()
+        if duration:
+            return file_size + 2 * int(duration * WAV_BYTES_PER_SEC)
+        return file_size * 4
+
+    def is_live(self, path: Path) -> bool:
+        """Принадлежит ли путь рабочей директории живой задачи."""
+        try:
+            resolved = path.resolve()
+        except OSError:
+            return False
+        # Вызывается и из потока очистки: итерируемся по снимку
+        for workspace in tuple(self._live.values()):
+            ws_path = workspace.path.resolve()
+            if resolved == ws_path or ws_path in resolved.parents:
+                return True
+        if self.fallback is not None:
+            return self.fallback.is_live(path)
+        return False
+
+    def _measure_disk(self) -> Tuple[int, int]:
+        """Свободное место и ещё не записанная часть резервов (выполняется в отдельном потоке)."""
+        free = shutil.disk_usage(self.root).free
+        # Уже выданные резервы ещё не записаны на диск целиком
+        pending = sum(
+            max(ws.reserved_bytes - ws.usage_bytes(), 0) for ws in tuple(self._live.values())
+        )
+        return free, pending
+
+    async def _refresh_disk(self, force: bool = False) -> None:
+        """Обновление замера диска, если он устарел (обход директорий - в отдельном потоке)."""
+        if not self.min_free_bytes:
+            return
+        now = time.monotonic()
+        if not force and self._measured_at is not None and now - self._measured_at < DISK_REFRESH_SEC:
+            return
+        self._measured_at = now
+        self._free_bytes, self._pending_bytes = await asyncio.to_thread(self._measure_disk)
+
+    def _fits(self, reserve_bytes: int) -> bool:
+        """Помещается ли новый резерв в бюджет и свободное место (по последнему замеру)."""
+        if self.budget_bytes and self.reserved_bytes + reserve_bytes > self.budget_bytes:
+            return False
+        if self.min_free_bytes:
+            if self._free_bytes - self._pending_bytes - reserve_bytes < self.min_free_bytes:
+                return False
+        return True
+
+    async def acquire(self, job_id: str, reserve_bytes: int = 0) -> JobWorkspace:
+        """
+        Создание рабочей директории задачи с резервированием места.
+
+        Args:
+            job_id: Идентификатор задачи
+            reserve_bytes: Оценка нужного места в байтах
+
+        Returns:
+            Рабочая директория
+
+        Raises:
+            DiskBudgetExceededError: Место не освободилось (или политика reject)
+        """
+        if self.budget_bytes and reserve_bytes > self.budget_bytes:
+            if self.fallback is not None:
+                return await self.fallback.acquire(job_id, reserve_bytes)
+            raise DiskBudgetExceededError("Файл слишком большой для обработки")
+
+        await self._refresh_disk()
+        async with self._condition:
+            if self.fallback is not None and not self._fits(reserve_bytes):
+                workspace = None
+            else:
+                await self._wait_for_space(job_id, reserve_bytes)
+                path = self.root / f"{WORKSPACE_PREFIX}{job_id}"
+                path.mkdir(parents=True, exist_ok=False)
+                workspace = JobWorkspace(job_id, path, reserve_bytes, self)
+                self._live[job_id] = workspace
+                # До следующего замера резерв новой задачи целиком не записан
+                self._pending_bytes += reserve_bytes
+
+        if workspace is None:
+            logger.debug(f"Задача {job_id} не помещается в {self.root}, используем {self.fallback.root}")
+            return await self.fallback.acquire(job_id, reserve_bytes)
+
+        logger.debug(f"Создана рабочая директория: {workspace.path}")
+        return workspace
+
+    async def _wait_for_space(self, job_id: str, reserve_bytes: int) -> None:
+        """Ожидание места под резерв (вызывается под блокировкой условия)."""
+        if self._fits(reserve_bytes):
+            return
+        if self.policy == "reject":
+            raise DiskBudgetExceededError("Сервер перегружен, попробуйте позже")
+
+        logger.info(
+            f"Задача {job_id} ждёт места во временной директории "
+            f"(резерв {reserve_bytes / (1024 * 1024):.1f} МБ)"
+        )
+        try:
+            await asyncio.wait_for(
+                self._condition.wait_for(lambda: self._fits(reserve_bytes)),
+                timeout=self.wait_timeout_sec
+            )
+        except asyncio.TimeoutError:
+            raise DiskBudgetExceededError("Сервер перегружен, попробуйте позже")
+
+    async def release(self, workspace: JobWorkspace) -> None:
+        """
+        Удаление рабочей директории задачи и освобождение резерва.
+
+        Директория сначала атомарно переименовывается, поэтому частично
+        удалённое состояние никогда не видно под именем задачи.
+
+        Args:
+            workspace: Рабочая директория
+        """
+        if workspace.manager is not self:
+            await workspace.manager.release(workspace)
+            return
+
+        trash_path = self.root / f"{TRASH_PREFIX}{workspace.job_id}_{os.urandom(4).hex()}"
+        try:
+            os.replace(workspace.path, trash_path)
+        except FileNotFoundError:
+            trash_path = None
+        except OSError as e:
+            logger.warning(f"Ошибка переименования {workspace.path}: {e}")
+            trash_path = workspace.path
+
+        async with self._condition:
+            self._live.pop(workspace.job_id, None)
+            self._condition.notify_all()
+
+        if trash_path is not None:
+            await asyncio.to_thread(shutil.rmtree, trash_path, True)
+            logger.debug(f"Рабочая директория удалена: {workspace.path}")
+
+        if self.min_free_bytes:
+            # Место на диске освободилось: ожидающие задачи проверяют новый замер
+            await self._refresh_disk(force=True)
+            async with self._condition:
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def job(self, job_id: str, reserve_bytes: int = 0) -> AsyncIterator[JobWorkspace]:
+        """Контекстный менеджер: рабочая директория на время задачи."""
+        workspace = await self.acquire(job_id, reserve_bytes)
+        try:
+            yield workspace
+        finally:
+            await self.release(workspace)
+
+
+def _directory_size(path: Path) -> int:
+    """Суммарный размер файлов в директории (рекурсивно)."""
+    total = 0
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        total += _directory_size(Path(entry.path))
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return total
@@ -1,15 +1,39 @@
-from .logger import setup_logger
-from .ffmpeg import convert_audio, get_audio_duration, extract_audio_from_video, split_audio
-from .helpers import format_duration, cleanup_old_files, generate_filename, periodic_cleanup
+from .logger import setup_logger, log_context, JsonFormatter
+from .ffmpeg import ensure_ffmpeg, convert_audio, get_audio_duration, extract_audio_from_video, split_audio
+from .memory import get_rss_bytes, get_peak_rss_bytes
+from .metrics import MetricsRegistry, metrics
+from .startup import StartupTimer
+from .helpers import (
+    format_duration,
+    format_timestamp,
+    format_srt,
+    format_vtt,
+    cleanup_old_files,
+    cleanup_old_files_async,
+    generate_filename,
+    periodic_cleanup,
+)
 
 __all__ = [
     "setup_logger",
+    "log_context",
+    "JsonFormatter",
+    "ensure_ffmpeg",
     "convert_audio",
     "get_audio_duration",
     "extract_audio_from_video",
     "split_audio",
+    "get_rss_bytes",
+    "get_peak_rss_bytes",
+    "MetricsRegistry",
+    "metrics",
+    "StartupTimer",
     "format_duration",
+    "format_timestamp",
+    "format_srt",
+    "format_vtt",
     "cleanup_old_files",
+    "cleanup_old_files_async",
     "generate_filename",
     "periodic_cleanup",
 ]
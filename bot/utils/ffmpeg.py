@@ -1,12 +1,91 @@
 import asyncio
+import os
 import subprocess
 from pathlib import Path
 from typing import Optional
 import logging
 
+from .metrics import track_process
+
 logger = logging.getLogger(__name__)
 
 
+def ensure_ffmpeg() -> None:
+    """
+    Проверка наличия ffmpeg.
+
+    Портативные бинарники из папки tools/ добавляются в PATH.
+
+    Raises:
+        RuntimeError: ffmpeg не найден
+    """
+    import shutil
+    import sys
+
+    # Сначала проверяем портативную версию в папке tools/
+    project_root = Path(__file__).parent.parent.parent.resolve()
+    tools_dir = project_root / "tools"
+
+    # Проверяем подпапки для Windows
+    if sys.platform == "win32":
+        ffmpeg_paths = [
+            tools_dir / "ffmpeg.exe",
+            tools_dir / "windows" / "ffmpeg.exe",
+        ]
+        ffprobe_paths = [
+            tools_dir / "ffprobe.exe",
+            tools_dir / "windows" / "ffprobe.exe",
+        ]
+    else:
+        ffmpeg_paths = [
+            tools_dir / "ffmpeg",
+            tools_dir / "linux" / "ffmpeg",
+        ]
+        ffprobe_paths = [
+            tools_dir / "ffprobe",
+            tools_dir / "linux" / "ffprobe",
+        ]
+
+    ffmpeg_portable = None
+    ffprobe_portable = None
+
+    for path in ffmpeg_paths:
+        if path.exists():
+            ffmpeg_portable = path
+            break
+
+    for path in ffprobe_paths:
+        if path.exists():
+            ffprobe_portable = path
+            break
+
+    if ffmpeg_portable:
+        # Добавляем папку с бинарниками в PATH
+        bin_dir = ffmpeg_portable.parent
+        os.environ["PATH"] = str(bin_dir) + os.pathsep + os.environ.get("PATH", "")
+        # На Linux/macOS делаем бинарники исполняемыми
+        if sys.platform != "win32":
+            try:
+                os.chmod(ffmpeg_portable, 0o755)
+                if ffprobe_portable:
+                    os.chmod(ffprobe_portable, 0o755)
+            except Exception:
+                pass
+        logger.info(f"[OK] Используется ffmpeg из {bin_dir}")
+    else:
+        # Проверяем ffmpeg в системном PATH
+        ffmpeg_path = shutil.which("ffmpeg")
+        if not ffmpeg_path:
+            logger.error(
+                "ffmpeg не найден! Установите ffmpeg или поместите "
+                "бинарники ffmpeg и ffprobe в папку tools/. "
+                "Подробнее: docs/02-environment-setup.md"
+            )
+            raise RuntimeError("ffmpeg не найден")
+
+        logger.info(f"[OK] ffmpeg найден: {ffmpeg_path}")
+
+
 async def convert_audio(
     input_path: Path,
     output_path: Path,
@@ -49,16 +128,17 @@ async def convert_audio(
     
     try:
         # Запускаем ffmpeg асинхронно
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        _, stderr = await asyncio.wait_for(
-            process.communicate(),
-            timeout=300  # 5 минут таймаут
-        )
+        with track_process("ffmpeg", "convert"):
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+
+            _, stderr = await asyncio.wait_for(
+                process.communicate(),
+                timeout=300  # 5 минут таймаут
+            )
         
         if process.returncode != 0:
             error_msg = stderr.decode('utf-8', errors='ignore')
@@ -95,13 +175,14 @@ async def get_audio_duration(file_path: Path) -> float:
     ]
     
     try:
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, _ = await process.communicate()
+        with track_process("ffprobe", "probe"):
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+
+            stdout, _ = await process.communicate()
         duration = float(stdout.decode('utf-8').strip())
         return duration
     except Exception as e:
@@ -140,16 +221,17 @@ async def split_audio(
     logger.debug(f"Разбиение аудио на части: {input_path}")
 
     try:
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        with track_process("ffmpeg", "split"):
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
 
-        _, stderr = await asyncio.wait_for(
-            process.communicate(),
-            timeout=300
-        )
+            _, stderr = await asyncio.wait_for(
+                process.communicate(),
+                timeout=300
+            )
 
         if process.returncode != 0:
             error_msg = stderr.decode('utf-8', errors='ignore')
@@ -200,16 +282,17 @@ async def extract_audio_from_video(
     logger.debug(f"Извлечение аудио из видео: {input_path} → {output_path}")
     
     try:
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        _, stderr = await asyncio.wait_for(
-            process.communicate(),
-            timeout=300
-        )
+        with track_process("ffmpeg", "extract"):
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+
+            _, stderr = await asyncio.wait_for(
+                process.communicate(),
+                timeout=300
+            )
         
         if process.returncode != 0:
             error_msg = stderr.decode('utf-8', errors='ignore')
@@ -1,12 +1,26 @@
+import fnmatch
 import os
+import shutil
+import time
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List
+from typing import Callable, Iterator, List, Optional, Tuple
 import logging
 import asyncio
 
+from bot.utils.metrics import (
+    CLEANUP_DELETED_TOTAL,
+    CLEANUP_ERRORS_TOTAL,
+    CLEANUP_RUNS_TOTAL,
+    CLEANUP_SCANNED_TOTAL,
+    CLEANUP_SECONDS,
+)
+
 logger = logging.getLogger(__name__)
 
+# Количество записей директории, обрабатываемых за одну порцию
+CLEANUP_BATCH_SIZE = 500
+
 
 def format_duration(seconds: float) -> str:
     """
@@ -23,6 +37,63 @@ def format_duration(seconds: float) -> str:
     return f"{minutes}:{secs:02d}"
 
 
+def format_timestamp(seconds: float, separator: str = ",") -> str:
+    """
+    Форматирование таймкода субтитров.
+
+    Args:
+        seconds: Время в секундах
+        separator: Разделитель миллисекунд ("," для SRT, "." для WebVTT)
+
+    Returns:
+        Строка вида "01:02:03,456"
+    """
+    millis = int(round(max(seconds, 0.0) * 1000))
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def format_srt(segments) -> str:
+    """
+    Формирование субтитров SRT.
+
+    Args:
+        segments: Реплики с полями text, start_time, end_time
+
+    Returns:
+        Текст в формате SRT
+    """
+    blocks = []
+    for index, segment in enumerate(segments, start=1):
+        blocks.append(
+            f"{index}\n"
+            f"{format_timestamp(segment.start_time)} --> {format_timestamp(segment.end_time)}\n"
+            f"{segment.text.strip()}\n"
+        )
+    return "\n".join(blocks)
+
+
+def format_vtt(segments) -> str:
+    """
+    Формирование субтитров WebVTT.
+
+    Args:
+        segments: Реплики с полями text, start_time, end_time
+
+    Returns:
+        Текст в формате WebVTT
+    """
+    blocks = ["WEBVTT\n"]
+    for segment in segments:
+        blocks.append(
+            f"{format_timestamp(segment.start_time, '.')} --> {format_timestamp(segment.end_time, '.')}\n"
+            f"{segment.text.strip()}\n"
+        )
+    return "\n".join(blocks)
+
+
 def generate_filename(prefix: str = "audio", extension: str = "wav") -> Path:
     """
     Генерация уникального имени файла.
@@ -40,10 +111,72 @@ def generate_filename(prefix: str = "audio", extension: str = "wav") -> Path:
     return Path(filename)
 
 
+def _cleanup_batch(
+    entries: Iterator[os.DirEntry],
+    cutoff_timestamp: float,
+    batch_size: int,
+    pattern: str,
+    include_dirs: bool,
+    is_protected: Optional[Callable[[Path], bool]]
+) -> Tuple[int, int, int, bool]:
+    """
+    Обработка очередной порции записей директории.
+
+    Args:
+        entries: Итератор os.scandir (продолжается с места остановки)
+        cutoff_timestamp: Записи с mtime раньше этого момента удаляются
+        batch_size: Максимум записей за вызов
+        pattern: Шаблон имен файлов
+        include_dirs: Удалять также старые поддиректории целиком
+        is_protected: Проверка, что путь используется живой задачей
+
+    Returns:
+        Кортеж (просмотрено, удалено, ошибок, директория закончилась)
+    """
+    scanned = deleted = errors = 0
+
+    while True:
+        # Граница порции до чтения записи: пропущенные записи тоже считаются
+        if scanned >= batch_size:
+            return scanned, deleted, errors, False
+        entry = next(entries, None)
+        if entry is None:
+            return scanned, deleted, errors, True
+
+        scanned += 1
+        try:
+            if not fnmatch.fnmatch(entry.name, pattern):
+                continue
+
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir and not include_dirs:
+                continue
+            if not is_dir and not entry.is_file(follow_symlinks=False):
+                continue
+            if is_protected is not None and is_protected(Path(entry.path)):
+                continue
+
+            if entry.stat(follow_symlinks=False).st_mtime < cutoff_timestamp:
+                if is_dir:
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+                deleted += 1
+                logger.debug(f"Удален старый файл: {entry.path}")
+        except FileNotFoundError:
+            # Файл уже удалён задачей или другой очисткой
+            pass
+        except Exception as e:
+            errors += 1
+            logger.warning(f"Ошибка удаления {entry.path}: {e}")
+
+
 def cleanup_old_files(
     directory: Path,
     max_age_hours: int = 1,
-    pattern: str = "*"
+    pattern: str = "*",
+    include_dirs: bool = False,
+    is_protected: Optional[Callable[[Path], bool]] = None
 ) -> int:
     """
     Очистка старых файлов из директории.
@@ -52,6 +185,8 @@ def cleanup_old_files(
         directory: Директория для очистки
         max_age_hours: Максимальный возраст файла в часах
         pattern: Шаблон имен файлов
+        include_dirs: Удалять также старые поддиректории целиком
+        is_protected: Проверка, что путь используется живой задачей
     
     Returns:
         Количество удаленных файлов
@@ -59,20 +194,18 @@ def cleanup_old_files(
     if not directory.exists():
         return 0
     
-    cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
+    cutoff_timestamp = (datetime.now() - timedelta(hours=max_age_hours)).timestamp()
     deleted_count = 0
     
     try:
-        for file_path in directory.glob(pattern):
-            if file_path.is_file():
-                file_mtime = datetime.fromtimestamp(file_path.stat().st_mtime)
-                if file_mtime < cutoff_time:
-                    try:
-                        file_path.unlink()
-                        deleted_count += 1
-                        logger.debug(f"Удален старый файл: {file_path}")
-                    except Exception as e:
-                        logger.warning(f"Ошибка удаления {file_path}: {e}")
+        with os.scandir(directory) as entries:
+            done = False
+            while not done:
+                _, deleted, _, done = _cleanup_batch(
+                    entries, cutoff_timestamp, CLEANUP_BATCH_SIZE,
+                    pattern, include_dirs, is_protected
+                )
+                deleted_count += deleted
     except Exception as e:
         logger.error(f"Ошибка очистки директории {directory}: {e}")
     
@@ -82,10 +215,70 @@ def cleanup_old_files(
     return deleted_count
 
 
-async def cleanup_old_logs(
-    log_dir: Path,
-    retention_days: int
+async def cleanup_old_files_async(
+    directory: Path,
+    max_age_hours: int = 1,
+    pattern: str = "*",
+    include_dirs: bool = False,
+    is_protected: Optional[Callable[[Path], bool]] = None,
+    batch_size: int = CLEANUP_BATCH_SIZE
 ) -> int:
+    """
+    Очистка старых файлов без блокировки event loop.
+
+    Обход директории и удаление выполняются в рабочем потоке порциями
+    по ``batch_size`` записей; между порциями управление возвращается
+    в event loop.
+
+    Args:
+        directory: Директория для очистки
+        max_age_hours: Максимальный возраст файла в часах
+        pattern: Шаблон имен файлов
+        include_dirs: Удалять также старые поддиректории целиком
+        is_protected: Проверка, что путь используется живой задачей
+        batch_size: Максимум записей за одну порцию
+
+    Returns:
+        Количество удаленных файлов
+    """
+    cutoff_timestamp = (datetime.now() - timedelta(hours=max_age_hours)).timestamp()
+    deleted_count = 0
+
+    try:
+        entries = await asyncio.to_thread(os.scandir, directory)
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        logger.error(f"Ошибка очистки директории {directory}: {e}")
+        CLEANUP_ERRORS_TOTAL.inc()
+        return 0
+
+    try:
+        done = False
+        while not done:
+            scanned, deleted, errors, done = await asyncio.to_thread(
+                _cleanup_batch, entries, cutoff_timestamp, batch_size,
+                pattern, include_dirs, is_protected
+            )
+            deleted_count += deleted
+            CLEANUP_SCANNED_TOTAL.inc(scanned)
+            CLEANUP_DELETED_TOTAL.inc(deleted)
+            CLEANUP_ERRORS_TOTAL.inc(errors)
+            # Отдаём управление обработке обновлений между порциями
+            await asyncio.sleep(0)
+    except Exception as e:
+        logger.error(f"Ошибка очистки директории {directory}: {e}")
+        CLEANUP_ERRORS_TOTAL.inc()
+    finally:
+        entries.close()
+
+    if deleted_count > 0:
+        logger.info(f"Удалено {deleted_count} старых файлов из {directory}")
+
+    return deleted_count
+
+
+async def cleanup_old_logs(log_dir: Path, retention_days: int) -> int:
     """
     Очистка старых логов.
     
@@ -96,14 +289,21 @@ async def cleanup_old_logs(
     Returns:
         Количество удаленных файлов
     """
-    return cleanup_old_files(log_dir, max_age_hours=retention_days * 24, pattern="*.log*")
+    return await cleanup_old_files_async(
+        log_dir,
+        max_age_hours=retention_days * 24,
+        pattern="*.log*"
+    )
 
 
 async def periodic_cleanup(
     temp_dir: Path,
     log_dir: Path,
     retention_days: int,
-    check_interval: int = 3600  # 1 час
+    check_interval: int = 3600,  # 1 час
+    is_protected: Optional[Callable[[Path], bool]] = None,
+    batch_size: int = CLEANUP_BATCH_SIZE,
+    scratch_dir: Optional[Path] = None
 ):
     """
     Периодическая очистка старых файлов.
@@ -113,16 +313,39 @@ async def periodic_cleanup(
         log_dir: Директория логов
         retention_days: Количество дней хранения логов
         check_interval: Интервал проверки в секундах
+        is_protected: Проверка, что путь используется живой задачей
+        batch_size: Максимум записей за одну порцию
+        scratch_dir: Отдельная директория промежуточных файлов (RAM-диск)
     """
+    temp_dirs = [temp_dir]
+    if scratch_dir is not None and scratch_dir != temp_dir:
+        temp_dirs.append(scratch_dir)
+
     while True:
+        started = time.perf_counter()
+        deleted = 0
+
         try:
             # Очистка временных файлов (старше 1 часа)
-            cleanup_old_files(temp_dir, max_age_hours=1)
+            for directory in temp_dirs:
+                deleted += await cleanup_old_files_async(
+                    directory,
+                    max_age_hours=1,
+                    include_dirs=True,
+                    is_protected=is_protected,
+                    batch_size=batch_size
+                )
             
             # Очистка старых логов
-            await cleanup_old_logs(log_dir, retention_days)
+            deleted += await cleanup_old_logs(log_dir, retention_days)
             
         except Exception as e:
+            CLEANUP_ERRORS_TOTAL.inc()
             logger.error(f"Ошибка периодической очистки: {e}")
+
+        duration = time.perf_counter() - started
+        CLEANUP_RUNS_TOTAL.inc()
+        CLEANUP_SECONDS.observe(duration)
+        logger.debug(f"Периодическая очистка: удалено {deleted} за {duration:.3f}с")
         
         await asyncio.sleep(check_interval)
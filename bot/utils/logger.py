@@ -1,9 +1,98 @@
+import atexit
+import json
 import logging
+import queue
 import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from logging.handlers import TimedRotatingFileHandler
-from datetime import datetime
-from typing import Optional
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+# Идентификатор задачи, в контексте которой пишется лог
+job_id_var: ContextVar[Optional[str]] = ContextVar("job_id", default=None)
+
+# Фоновые потоки записи логов по именам логгеров
+_listeners: Dict[str, QueueListener] = {}
+
+
+@contextmanager
+def log_context(job_id: str) -> Iterator[None]:
+    """
+    Привязка записей лога к задаче на время блока ``with``.
+
+    Контекст наследуют задачи asyncio, созданные внутри блока.
+
+    Args:
+        job_id: Идентификатор задачи
+    """
+    token = job_id_var.set(job_id)
+    try:
+        yield
+    finally:
+        job_id_var.reset(token)
+
+
+class JobIdFilter(logging.Filter):
+    """Добавляет в запись поле ``job_id`` из контекста."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "job_id"):
+            record.job_id = job_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        job_id = getattr(record, "job_id", None)
+        if job_id is not None:
+            entry["job_id"] = job_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _AsyncQueueHandler(QueueHandler):
+    """
+    Постановка записи в очередь без форматирования.
+
+    Стандартный QueueHandler форматирует сообщение вместе с трассировкой
+    в поток вызова; здесь сохраняется только текст сообщения и трассировки,
+    а итоговый формат (текст или JSON) применяют хендлеры в потоке записи.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _stop_listener(name: str) -> None:
+    listener = _listeners.pop(name, None)
+    if listener is not None:
+        listener.stop()
+
+
+@atexit.register
+def _stop_listeners() -> None:
+    """Запись оставшихся в очереди сообщений при завершении процесса."""
+    for name in list(_listeners):
+        _stop_listener(name)
 
 
 def setup_logger(
@@ -11,35 +100,45 @@ def setup_logger(
     log_dir: Path,
     level: str = "INFO",
     retention_days: int = 30,
-    console_output: bool = True
+    console_output: bool = True,
+    json_format: bool = False,
+    use_queue: bool = True
 ) -> logging.Logger:
     """
     Настройка логирования с ротацией по времени.
-    
+
     Args:
         name: Имя логгера
         log_dir: Директория для хранения логов
         level: Уровень логирования
         retention_days: Количество дней хранения логов
         console_output: Вывод в консоль
-    
+        json_format: Записи в формате JSON (с job_id) вместо текста
+        use_queue: Запись в файлы и консоль в отдельном потоке,
+            чтобы медленный диск не задерживал event loop
+
     Returns:
         Настроенный логгер
     """
     # Создаем директорию для логов
     log_dir.mkdir(parents=True, exist_ok=True)
-    
+
     # Создаем логгер
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level.upper()))
+    _stop_listener(name)
     logger.handlers.clear()  # Очищаем существующие хендлеры
-    
+
     # Форматтер
-    formatter = logging.Formatter(
-        fmt="%(asctime)s [%(levelname)-8s] %(name)s: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    
+    if json_format:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            fmt="%(asctime)s [%(levelname)-8s] %(name)s: %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
+    handlers = []
+
     # Файловый хендлер с ротацией по дням
     log_file = log_dir / f"bot_{datetime.now().strftime('%Y-%m-%d')}.log"
     file_handler = TimedRotatingFileHandler(
@@ -52,8 +151,8 @@ def setup_logger(
     file_handler.suffix = "%Y-%m-%d"
     file_handler.setFormatter(formatter)
     file_handler.setLevel(logging.DEBUG)
-    logger.addHandler(file_handler)
-    
+    handlers.append(file_handler)
+
     # Отдельный хендлер для ошибок
     error_file = log_dir / f"error_{datetime.now().strftime('%Y-%m-%d')}.log"
     error_handler = TimedRotatingFileHandler(
@@ -66,13 +165,28 @@ def setup_logger(
     error_handler.suffix = "%Y-%m-%d"
     error_handler.setFormatter(formatter)
     error_handler.setLevel(logging.ERROR)
-    logger.addHandler(error_handler)
-    
+    handlers.append(error_handler)
+
     # Консольный хендлер
     if console_output:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(formatter)
         console_handler.setLevel(getattr(logging, level.upper()))
-        logger.addHandler(console_handler)
-    
+        handlers.append(console_handler)
+
+    if use_queue:
+        # Хендлеры работают в потоке QueueListener, event loop только кладёт запись в очередь
+        log_queue = queue.SimpleQueue()
+        queue_handler = _AsyncQueueHandler(log_queue)
+        queue_handler.addFilter(JobIdFilter())
+        logger.addHandler(queue_handler)
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners[name] = listener
+    else:
+        for handler in handlers:
+            handler.addFilter(JobIdFilter())
+            logger.addHandler(handler)
+
     return logger
+
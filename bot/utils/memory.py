@@ -0,0 +1,69 @@
+import ctypes
+import ctypes.util
+import os
+import sys
+from typing import Optional
+
+
+def get_rss_bytes() -> Optional[int]:
+    """
+    Текущий объём резидентной памяти процесса (RSS).
+
+    Использует psutil, если он установлен, иначе /proc/self/statm (Linux).
+
+    Returns:
+        Размер в байтах или None, если определить не удалось
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def get_peak_rss_bytes() -> Optional[int]:
+    """
+    Максимальный RSS процесса за всё время работы.
+
+    Returns:
+        Размер в байтах или None, если определить не удалось
+    """
+    try:
+        import resource
+    except ImportError:
+        # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset
+        except (ImportError, AttributeError):
+            return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # На macOS значение в байтах, на Linux - в килобайтах
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def trim_heap() -> bool:
+    """
+    Возврат освобождённой памяти кучи операционной системе (glibc malloc_trim).
+
+    После удаления крупных объектов (например, модели) glibc оставляет
+    свободные страницы за процессом, и RSS не уменьшается.
+
+    Returns:
+        True, если память возвращена (только Linux с glibc)
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+        return bool(libc.malloc_trim(0))
+    except (OSError, AttributeError):
+        return False
@@ -0,0 +1,370 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Границы корзин гистограмм времени (секунды)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Границы корзин коэффициента реального времени
+RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    """Базовый класс метрики с метками."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        """Значение метрики для конкретного набора меток."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _unlabeled(self):
+        if self.labelnames:
+            raise ValueError(f"Метрика {self.name} требует метки {self.labelnames}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Удалить значения всех наборов меток."""
+        with self._lock:
+            self._children.clear()
+
+    def _label_text(self, key: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def collect(self) -> List[str]:
+        """Строки метрики в текстовом формате Prometheus."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            lines.extend(self._collect_child(key, child))
+        return lines
+
+    def _collect_child(self, key, child) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_format_value(child.get())}"]
+
+
+class _CounterValue:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Счётчик не может уменьшаться")
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabeled().inc(amount)
+
+
+class _GaugeValue:
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Значение вычисляется при каждом сборе метрик."""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+
+class Gauge(_Metric):
+    """Текущее значение (может расти и уменьшаться)."""
+
+    type_name = "gauge"
+
+    def _new_child(self) -> _GaugeValue:
+        return _GaugeValue()
+
+    def set(self, value: float) -> None:
+        self._unlabeled().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._unlabeled().set_function(function)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Наблюдение длительности блока ``with``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Histogram(_Metric):
+    """Распределение значений по корзинам."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        buckets = sorted(buckets)
+        if not buckets or buckets[-1] != math.inf:
+            buckets.append(math.inf)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._unlabeled().observe(value)
+
+    def time(self):
+        return self._unlabeled().time()
+
+    def _collect_child(self, key, child: _HistogramValue) -> List[str]:
+        counts, total, count = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = self._label_text(key, {"le": _format_value(bound)})
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса.
+
+    Метрики создаются один раз (повторный вызов с тем же именем
+    возвращает существующую) и выводятся в текстовом формате Prometheus.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Метрика {name} уже зарегистрирована с другим типом")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Счётчик."""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Текущее значение."""
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Гистограмма."""
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+# Глобальный реестр
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "stt_stage_duration_seconds", "Время работы стадии конвейера", ["stage"]
+)
+STAGE_WAIT_SECONDS = metrics.histogram(
+    "stt_stage_wait_seconds", "Время ожидания места в стадии конвейера", ["stage"]
+)
+STAGE_WAITING = metrics.gauge(
+    "stt_stage_waiting", "Задач в очереди стадии конвейера", ["stage"]
+)
+STAGE_ACTIVE = metrics.gauge(
+    "stt_stage_active", "Задач, выполняемых стадией конвейера", ["stage"]
+)
+STAGE_CAPACITY = metrics.gauge(
+    "stt_stage_capacity", "Лимит параллельности стадии конвейера", ["stage"]
+)
+JOBS_TOTAL = metrics.counter(
+    "stt_jobs_total", "Завершённые задачи по типу медиа и итогу", ["kind", "outcome"]
+)
+JOB_RTF = metrics.histogram(
+    "stt_job_realtime_factor", "Время обработки задачи, делённое на длительность записи",
+    ["kind"], buckets=RTF_BUCKETS
+)
+AUDIO_SECONDS = metrics.counter(
+    "stt_audio_seconds_total", "Длительность обработанных записей", ["kind"]
+)
+DOWNLOAD_BYTES = metrics.counter(
+    "stt_download_bytes_total", "Скачано байт медиафайлов"
+)
+FFMPEG_PROCESSES = metrics.gauge(
+    "stt_ffmpeg_processes", "Запущенных процессов ffmpeg/ffprobe", ["tool"]
+)
+FFMPEG_SECONDS = metrics.histogram(
+    "stt_ffmpeg_duration_seconds", "Время вызова ffmpeg/ffprobe", ["operation"]
+)
+PROCESS_RSS_BYTES = metrics.gauge(
+    "stt_process_rss_bytes", "Резидентная память процесса"
+)
+PROCESS_PEAK_RSS_BYTES = metrics.gauge(
+    "stt_process_peak_rss_bytes", "Максимальная резидентная память процесса"
+)
+TORCH_MEMORY_BYTES = metrics.gauge(
+    "stt_torch_memory_bytes", "Память аллокатора torch на устройстве", ["device", "kind"]
+)
+TRACEMALLOC_BYTES = metrics.gauge(
+    "stt_tracemalloc_bytes", "Крупнейшие места выделения памяти Python (tracemalloc)", ["location"]
+)
+MEMORY_HIGH_WATER_BYTES = metrics.gauge(
+    "stt_memory_high_water_bytes", "Порог памяти, выше которого новые задачи не запускаются"
+)
+MEMORY_PRESSURE = metrics.gauge(
+    "stt_memory_pressure", "Память процесса выше порога (1) или нет (0)"
+)
+MEMORY_SHED_TOTAL = metrics.counter(
+    "stt_memory_shed_total", "Задачи, отложенные или отклонённые из-за памяти", ["action"]
+)
+CLEANUP_RUNS_TOTAL = metrics.counter(
+    "stt_cleanup_runs_total", "Проходов периодической очистки"
+)
+CLEANUP_SCANNED_TOTAL = metrics.counter(
+    "stt_cleanup_scanned_total", "Просмотрено записей при очистке"
+)
+CLEANUP_DELETED_TOTAL = metrics.counter(
+    "stt_cleanup_deleted_total", "Удалено старых файлов и директорий"
+)
+CLEANUP_ERRORS_TOTAL = metrics.counter(
+    "stt_cleanup_errors_total", "Ошибок удаления при очистке"
+)
+CLEANUP_SECONDS = metrics.histogram(
+    "stt_cleanup_duration_seconds", "Время прохода периодической очистки"
+)
+MODEL_LOADED = metrics.gauge(
+    "stt_model_loaded", "Модель загружена в память (1) или нет (0)"
+)
+MODEL_UNLOADS_TOTAL = metrics.counter(
+    "stt_model_unloads_total", "Выгрузок модели из памяти по простою"
+)
+STARTUP_PHASE_SECONDS = metrics.gauge(
+    "stt_startup_phase_seconds", "Длительность этапов запуска процесса", ["phase"]
+)
+
+
+@contextmanager
+def track_process(tool: str, operation: str) -> Iterator[None]:
+    """
+    Учёт внешнего процесса: число запущенных и время вызова.
+
+    Args:
+        tool: Программа (ffmpeg, ffprobe)
+        operation: Операция (convert, probe, split, extract)
+    """
+    gauge = FFMPEG_PROCESSES.labels(tool=tool)
+    gauge.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        gauge.dec()
+        FFMPEG_SECONDS.labels(operation=operation).observe(time.perf_counter() - started)
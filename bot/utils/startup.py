@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from .metrics import STARTUP_PHASE_SECONDS
+
+
+class StartupTimer:
+    """
+    Время этапов запуска процесса.
+
+    Каждый этап публикуется в метрике ``stt_startup_phase_seconds``,
+    а ``report()`` даёт строку для лога.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    def record(self, phase: str, seconds: float) -> None:
+        """Записать длительность этапа."""
+        self.phases.append((phase, seconds))
+        STARTUP_PHASE_SECONDS.labels(phase=phase).set(seconds)
+
+    @contextmanager
+    def phase(self, phase: str) -> Iterator[None]:
+        """Замер этапа на время блока ``with``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    @property
+    def elapsed_sec(self) -> float:
+        """Время с начала запуска."""
+        return time.perf_counter() - self.started_at
+
+    def report(self) -> str:
+        """Этапы запуска одной строкой."""
+        phases = ", ".join(f"{phase} {seconds:.2f}с" for phase, seconds in self.phases)
+        return f"{phases} (всего {self.elapsed_sec:.2f}с)"
@@ -0,0 +1,325 @@
+import asyncio
+import os
+import signal
+import socket
+import sys
+from pathlib import Path
+from typing import Optional, Set
+
+from telegram import Bot
+
+from bot.config import Config
+from bot.models.job import MediaJob
+from bot.services import (
+    FileService,
+    AudioService,
+    TranscribeService,
+    MediaPipeline,
+    JobStore,
+    WorkerBroker,
+    create_broker,
+    StackProfiler,
+    TorchProfiler,
+    MemoryMonitor,
+)
+from bot.services.broker_service import BrokerError
+from bot.services.job_store_service import STATE_DONE
+from bot.server import HttpServer, MetricsEndpoint, HealthEndpoint
+from bot.utils import setup_logger, periodic_cleanup, ensure_ffmpeg, metrics
+
+
+# Настройка логирования
+logger = setup_logger(
+    name="bot",
+    log_dir=Config.LOG_DIR,
+    level=Config.LOG_LEVEL,
+    retention_days=Config.LOG_RETENTION_DAYS,
+    json_format=Config.LOG_FORMAT == "json",
+    use_queue=Config.LOG_QUEUE
+)
+
+
+class TranscriptionWorker:
+    """
+    Воркер распознавания.
+
+    Берёт задачи из брокера, скачивает файл из Telegram, конвертирует
+    и распознаёт его тем же конвейером, что и бот, и сдаёт готовый
+    текст ответа обратно. С Telegram-чатами не общается: статусы и
+    доставку выполняет фронтенд.
+    """
+
+    def __init__(self):
+        Config.validate()
+        ensure_ffmpeg()
+
+        self.worker_id = Config.WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = max(1, Config.WORKER_CONCURRENCY)
+
+        self.workspace_manager = Config.get_workspace_manager()
+        file_service = FileService(
+            Config.TEMP_DIR,
+            connections=Config.DOWNLOAD_CONNECTIONS,
+            parallel_min_mb=Config.DOWNLOAD_PARALLEL_MIN_MB,
+            block_size_kb=Config.DOWNLOAD_BLOCK_SIZE_KB,
+            workspaces=self.workspace_manager,
+            file_base_url=Config.TELEGRAM_FILE_BASE_URL
+        )
+        audio_service = AudioService(file_service, Config.TEMP_DIR, Config.MAX_FILE_SIZE_MB)
+        transcribe_service = TranscribeService(
+            model_name=Config.GIGAAM_MODEL,
+            device=Config.GIGAAM_DEVICE,
+            scratch_dir=Config.get_scratch_dir(),
+            load=False,
+            model_cache=Config.get_model_cache(),
+            idle_unload_sec=Config.MODEL_IDLE_UNLOAD_SEC,
+            backend=Config.ASR_BACKEND,
+            onnx_dir=Config.ONNX_DIR,
+            onnx_threads=Config.ONNX_THREADS,
+            batch_size=Config.ASR_BATCH_SIZE,
+            batch_wait_ms=Config.ASR_BATCH_WAIT_MS,
+            batch_concurrency=Config.PIPELINE_INFER_CONCURRENCY
+        )
+        self.transcribe_service = transcribe_service
+
+        # Профилирование по сигналу SIGUSR1
+        self.stack_profiler = StackProfiler(
+            Config.get_profile_dir(),
+            interval_ms=Config.PROFILE_INTERVAL_MS,
+            top_n=Config.PROFILE_TOP_N
+        )
+        self.torch_profiler = TorchProfiler(Config.get_profile_dir(), top_n=Config.PROFILE_TOP_N)
+        transcribe_service.torch_profiler = self.torch_profiler
+
+        # Журнал воркера хранит только чекпоинты частей длинных записей
+        self.job_store = JobStore(Path(Config.JOB_STORE_PATH)) if Config.JOB_STORE_PATH else None
+
+        # Бот нужен только для получения ссылок на файлы
+        self.bot = Bot(
+            Config.TELEGRAM_BOT_TOKEN,
+            base_url=Config.TELEGRAM_API_BASE_URL,
+            base_file_url=Config.TELEGRAM_FILE_BASE_URL
+        )
+        # Политику памяти воркер не применяет: при превышении порога
+        # он просто не берёт новые задачи, их выполнят другие воркеры
+        self.memory_monitor = MemoryMonitor(
+            high_water_mb=Config.MEMORY_HIGH_WATER_MB,
+            interval_sec=Config.MEMORY_SAMPLE_INTERVAL_SEC,
+            tracemalloc_top=Config.MEMORY_TRACEMALLOC_TOP
+        )
+        self.pipeline = MediaPipeline(
+            audio_service,
+            transcribe_service,
+            bot=self.bot,
+            bot_token=Config.TELEGRAM_BOT_TOKEN,
+            hf_token=Config.HF_TOKEN,
+            max_jobs=self.concurrency,
+            fetch_concurrency=Config.PIPELINE_FETCH_CONCURRENCY,
+            decode_concurrency=Config.PIPELINE_DECODE_CONCURRENCY,
+            infer_concurrency=Config.PIPELINE_INFER_CONCURRENCY,
+            job_store=self.job_store,
+            max_attempts=Config.JOB_MAX_ATTEMPTS
+        )
+        self.broker: WorkerBroker = create_broker(
+            Config.BROKER_URL,
+            token=Config.BROKER_TOKEN,
+            lease_sec=Config.BROKER_LEASE_SEC,
+            max_attempts=Config.JOB_MAX_ATTEMPTS
+        )
+
+        self._tasks: Set[asyncio.Task] = set()
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+
+    async def _startup_cleanup(self) -> None:
+        """Очистка временных файлов, оставшихся от прошлого запуска."""
+        from bot.utils.helpers import cleanup_old_files_async
+        deleted = 0
+        for temp_dir in {Config.TEMP_DIR, Config.get_scratch_dir()}:
+            deleted += await cleanup_old_files_async(
+                temp_dir,
+                max_age_hours=1,
+                include_dirs=True,
+                batch_size=Config.CLEANUP_BATCH_SIZE
+            )
+        if deleted > 0:
+            logger.info(f"Удалено {deleted} старых файлов из temp/")
+
+    async def _stop_cleanup_task(self) -> None:
+        """Остановка задачи периодической очистки."""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _handle(self, job: MediaJob) -> None:
+        """Выполнение одной задачи с продлением аренды."""
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            state, text = await self.pipeline.run(job)
+        finally:
+            heartbeat.cancel()
+
+        try:
+            accepted = await self.broker.complete(job.job_id, self.worker_id, state, text)
+        except BrokerError as e:
+            # Аренда истечёт, и задачу выполнит другой воркер
+            logger.error(f"Не удалось сдать итог задачи {job.job_id}: {e}")
+            return
+        if not accepted:
+            logger.warning(f"Итог задачи {job.job_id} не принят: аренда перешла к другому воркеру")
+            return
+
+        if state == STATE_DONE and self.job_store is not None:
+            await self.job_store.delete_chunks(job.job_id)
+
+    async def _heartbeat(self, job: MediaJob) -> None:
+        """Продление аренды задачи, пока она выполняется."""
+        interval = max(Config.BROKER_LEASE_SEC / 3, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self.broker.heartbeat(job.job_id, self.worker_id):
+                    logger.warning(f"Аренда задачи {job.job_id} потеряна")
+            except BrokerError as e:
+                logger.warning(f"Ошибка продления аренды задачи {job.job_id}: {e}")
+
+    async def _run(self):
+        """Цикл получения задач."""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        slots = asyncio.Semaphore(self.concurrency)
+
+        # Метрики и проверки воркера; задач по HTTP воркер не принимает
+        http_server = None
+        if Config.METRICS_ENABLED or Config.HEALTH_ENABLED:
+            http_server = HttpServer(Config.HTTP_HOST, Config.HTTP_PORT)
+            if Config.METRICS_ENABLED:
+                MetricsEndpoint(metrics, Config.METRICS_PATH).register(http_server)
+            if Config.HEALTH_ENABLED:
+                HealthEndpoint(
+                    lambda: {
+                        "model": self.transcribe_service.is_available,
+                        "warmup": self.transcribe_service.is_warmed_up,
+                    },
+                    live_path=Config.HEALTH_LIVE_PATH,
+                    ready_path=Config.HEALTH_READY_PATH
+                ).register(http_server)
+            await http_server.start()
+
+        await self.bot.initialize()
+        self.memory_monitor.start()
+        await self._startup_cleanup()
+        self._cleanup_task = asyncio.create_task(
+            periodic_cleanup(
+                temp_dir=Config.TEMP_DIR,
+                log_dir=Config.LOG_DIR,
+                scratch_dir=Config.get_scratch_dir(),
+                retention_days=Config.LOG_RETENTION_DAYS,
+                check_interval=Config.CLEANUP_INTERVAL_SEC,
+                is_protected=self.workspace_manager.is_live,
+                batch_size=Config.CLEANUP_BATCH_SIZE
+            )
+        )
+
+        try:
+            # Метрики уже доступны; задачи берём только с загруженной и прогретой моделью
+            await self.transcribe_service.load()
+            await self.transcribe_service.warmup(
+                runs=Config.WARMUP_RUNS,
+                duration_sec=Config.WARMUP_AUDIO_SEC,
+                concurrency=Config.PIPELINE_INFER_CONCURRENCY
+            )
+            self.transcribe_service.start_idle_unload()
+            logger.info(f"Воркер {self.worker_id} запущен (параллельно задач: {self.concurrency})")
+
+            while not self._stop_event.is_set():
+                await slots.acquire()
+                if self.memory_monitor.under_pressure:
+                    job = None
+                else:
+                    try:
+                        job = await self.broker.claim(self.worker_id)
+                    except BrokerError as e:
+                        logger.warning(f"Ошибка получения задачи: {e}")
+                        job = None
+
+                if job is None:
+                    slots.release()
+                    try:
+                        await asyncio.wait_for(
+                            self._stop_event.wait(), timeout=Config.BROKER_POLL_INTERVAL_SEC
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                logger.info(f"Воркер взял задачу {job.job_id}")
+                task = asyncio.create_task(self._handle(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            # Незавершённые задачи вернутся в очередь по истечении аренды
+            for task in tuple(self._tasks):
+                task.cancel()
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self._stop_cleanup_task()
+            await self.memory_monitor.stop()
+            await self.transcribe_service.stop_idle_unload()
+            await self.broker.close()
+            await self.bot.shutdown()
+            if http_server is not None:
+                await http_server.stop()
+            if self.job_store is not None:
+                self.job_store.close()
+
+    def run(self):
+        """Запуск воркера."""
+        logger.info("=" * 50)
+        logger.info("Запуск воркера распознавания")
+        logger.info(f"Модель: {Config.GIGAAM_MODEL}")
+        logger.info(f"Брокер: {Config.BROKER_URL}")
+        logger.info(f"Промежуточные файлы: {Config.SCRATCH_BACKEND} ({Config.get_scratch_dir()})")
+        logger.info("=" * 50)
+
+        def signal_handler(signum, frame):
+            logger.info(f"Получен сигнал {signum}, остановка...")
+            self.stop()
+
+        def profile_handler(signum, frame):
+            if self._loop is None:
+                return
+            logger.info(f"Получен сигнал {signum}, профилирование {Config.PROFILE_SIGNAL_SEC}с")
+            if Config.PROFILE_SIGNAL_INFERENCES > 0:
+                self.torch_profiler.arm(Config.PROFILE_SIGNAL_INFERENCES)
+            self.stack_profiler.schedule(self._loop, Config.PROFILE_SIGNAL_SEC)
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, profile_handler)
+
+        asyncio.run(self._run())
+
+    def stop(self):
+        """Остановка воркера."""
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+
+def main():
+    """Точка входа."""
+    try:
+        TranscriptionWorker().run()
+    except Exception as e:
+        logger.critical(f"Ошибка запуска воркера: {e}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()